@@ -0,0 +1,193 @@
+# coding: utf-8
+"""
+    benchmarks.corpus
+    ~~~~~~~~~~~~~~~~~
+
+    Generates reproducible synthetic corpora of Python modules, each of which
+    stresses a different aspect of the analysis.
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import os
+import io
+import random
+from collections import OrderedDict
+
+
+NAMES = [
+    u'foo', u'bar', u'baz', u'spam', u'eggs', u'result', u'value', u'item',
+    u'index', u'count', u'data', u'key'
+]
+
+
+def generate_name(rng):
+    return u'{}_{}'.format(rng.choice(NAMES), rng.randint(0, 99))
+
+
+def generate_expression(rng, depth=0):
+    kind = rng.randint(0, 6 if depth < 3 else 1)
+    if kind == 0:
+        return generate_name(rng)
+    elif kind == 1:
+        return str(rng.randint(0, 1000))
+    elif kind == 2:
+        return u'{} {} {}'.format(
+            generate_expression(rng, depth + 1), rng.choice(u'+-*%'),
+            generate_expression(rng, depth + 1)
+        )
+    elif kind == 3:
+        return u'{}({})'.format(generate_name(rng), u', '.join(
+            generate_expression(rng, depth + 1)
+            for _ in range(rng.randint(0, 3))
+        ))
+    elif kind == 4:
+        return u'[{}]'.format(u', '.join(
+            generate_expression(rng, depth + 1)
+            for _ in range(rng.randint(0, 4))
+        ))
+    elif kind == 5:
+        return u'{{{}}}'.format(u', '.join(
+            u'{!r}: {}'.format(
+                str(generate_name(rng)), generate_expression(rng, depth + 1)
+            )
+            for _ in range(rng.randint(0, 3))
+        ))
+    return u'{}[{}:{}]'.format(
+        generate_name(rng), rng.randint(0, 9), rng.randint(10, 20)
+    )
+
+
+def generate_block(rng, indentation, statements):
+    lines = []
+    for _ in range(statements):
+        kind = rng.randint(0, 5)
+        if kind == 0 and indentation < 12:
+            lines.append(u'{}if {}:'.format(
+                u' ' * indentation, generate_expression(rng)
+            ))
+            lines.extend(generate_block(rng, indentation + 4, 2))
+        elif kind == 1 and indentation < 12:
+            lines.append(u'{}for {} in {}:'.format(
+                u' ' * indentation, generate_name(rng),
+                generate_expression(rng)
+            ))
+            lines.extend(generate_block(rng, indentation + 4, 2))
+        elif kind == 2:
+            lines.append(u'{}return {}'.format(
+                u' ' * indentation, generate_expression(rng)
+            ))
+        else:
+            lines.append(u'{}{} = {}'.format(
+                u' ' * indentation, generate_name(rng),
+                generate_expression(rng)
+            ))
+    return lines
+
+
+def generate_module(rng, definitions):
+    """
+    Returns a typical module with imports and the given number of function
+    and class `definitions`.
+    """
+    lines = [u'import os', u'import sys', u'']
+    for _ in range(definitions):
+        lines.append(u'')
+        if rng.random() < 0.2:
+            lines.append(u'class {}(object):'.format(
+                generate_name(rng).title()
+            ))
+            lines.append(u'    def method(self, {}):'.format(
+                generate_name(rng)
+            ))
+            lines.extend(generate_block(rng, 8, rng.randint(2, 6)))
+        else:
+            lines.append(u'def {}({}, {}=1):'.format(
+                generate_name(rng), generate_name(rng), generate_name(rng)
+            ))
+            lines.extend(generate_block(rng, 4, rng.randint(2, 8)))
+        lines.append(u'')
+    return u'\n'.join(lines) + u'\n'
+
+
+def generate_small(rng):
+    return generate_module(rng, rng.randint(2, 5))
+
+
+def generate_huge(rng):
+    return generate_module(rng, 1000)
+
+
+def generate_nested(rng):
+    lines = []
+    depth = 40
+    for level in range(depth):
+        lines.append(u'{}if {}:'.format(
+            u'    ' * level, generate_expression(rng)
+        ))
+    lines.extend(generate_block(rng, depth * 4, 5))
+    brackets = rng.randint(20, 40)
+    lines.append(u'{} = {}{}{}'.format(
+        generate_name(rng), u'[' * brackets, generate_expression(rng),
+        u']' * brackets
+    ))
+    return u'\n'.join(lines) + u'\n'
+
+
+def generate_long_lines(rng):
+    lines = []
+    for _ in range(rng.randint(20, 50)):
+        lines.append(u'{} = [{}]'.format(generate_name(rng), u', '.join(
+            generate_expression(rng) for _ in range(rng.randint(10, 100))
+        )))
+    return u'\n'.join(lines) + u'\n'
+
+
+def generate_whitespace(rng):
+    lines = []
+    for _ in range(rng.randint(50, 100)):
+        kind = rng.randint(0, 4)
+        name = generate_name(rng)
+        if kind == 0:
+            lines.append(u'{} = [ 1 , 2 ]'.format(name))
+        elif kind == 1:
+            lines.append(u'{} = {{ 1 : 2 }}'.format(name))
+        elif kind == 2:
+            lines.append(u'{} ( {} )'.format(name, generate_name(rng)))
+        elif kind == 3:
+            lines.append(u'{} = {} [ 1 : 2 ]'.format(name, generate_name(rng)))
+        else:
+            lines.append(u'if {}:'.format(name))
+            lines.append(u'  {} = ( 1, 2 )'.format(generate_name(rng)))
+    lines.append(u'import os, sys')
+    return u'\n'.join(lines) + u'\n'
+
+
+#: Maps the names of the corpora to the number of modules and a function
+#: generating a module, given a :class:`random.Random` instance.
+CORPORA = OrderedDict([
+    ('small', (200, generate_small)),
+    ('huge', (2, generate_huge)),
+    ('nested', (30, generate_nested)),
+    ('long_lines', (20, generate_long_lines)),
+    ('whitespace', (100, generate_whitespace))
+])
+
+
+def write_corpus(directory, name, seed=0):
+    """
+    Writes the corpus with the given `name` to `directory` and returns a list
+    of the paths of the modules in it. The same `seed` always produces the
+    same corpus.
+    """
+    count, generate = CORPORA[name]
+    rng = random.Random(u'{}-{}'.format(name, seed))
+    corpus_directory = os.path.join(directory, name)
+    os.makedirs(corpus_directory)
+    paths = []
+    for i in range(count):
+        path = os.path.join(corpus_directory, 'module{}.py'.format(i))
+        with io.open(path, 'w', encoding='utf-8') as module:
+            module.write(generate(rng))
+        paths.append(path)
+    return paths
@@ -0,0 +1,114 @@
+# coding: utf-8
+"""
+    benchmarks.dispatch
+    ~~~~~~~~~~~~~~~~~~~
+
+    Measures the overhead per token and node of dispatching to the receivers
+    connected to analyser signals, comparing the dispatch tables used by the
+    analysers with looking up and sending signals by name.
+
+    Run with ``python -m benchmarks.dispatch``.
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+from __future__ import print_function
+import ast
+import token
+import timeit
+import textwrap
+
+from pyalysis.source import Source
+from pyalysis.analysers import TokenAnalyser, CSTAnalyser, ASTAnalyser
+from pyalysis.analysers.cst import NODE_NAMES
+
+
+MODULE = textwrap.dedent(u"""\
+    import os
+    import sys
+
+
+    def function(a, b=1, *args, **kwargs):
+        if a > b:
+            return [a, b, {'a': a, 'b': b}]
+        for i in range(a):
+            try:
+                sys.stdout.write(os.path.join('foo', str(i)))
+            except ValueError:
+                pass
+        return (a, b)
+
+
+    class Class(object):
+        def method(self, x):
+            return function(x, x * 2)[0:1]
+""") * 50
+
+
+def dispatch_by_name(analyser, items, get_name, argument):
+    for item in items:
+        signal = getattr(analyser, 'on_' + get_name(item))
+        signal.send(analyser, **{argument: item})
+
+
+def dispatch_by_table(analyser, items, signals, get_key, argument):
+    get_receivers = analyser.create_dispatch_table(signals).get
+    for item in items:
+        receivers = get_receivers(get_key(item))
+        if receivers is not None:
+            for receiver in receivers:
+                receiver(analyser, **{argument: item})
+
+
+def measure(name, analyser_class, source, get_items, signals, get_name,
+            get_key, argument, repeat):
+    analyser = analyser_class(source)
+    analyser.on_analyse.send(analyser)
+    items = list(get_items(analyser))
+
+    def run(dispatch, *args):
+        analyser.warnings = []
+        dispatch(analyser, items, *args)
+
+    by_name = min(timeit.repeat(
+        lambda: run(dispatch_by_name, get_name, argument),
+        number=1, repeat=repeat
+    ))
+    by_table = min(timeit.repeat(
+        lambda: run(dispatch_by_table, signals, get_key, argument),
+        number=1, repeat=repeat
+    ))
+    print(
+        u'{:<6} {:>7} items {:>8.0f} ns/item by name {:>8.0f} ns/item '
+        u'by table'.format(
+            name, len(items),
+            by_name / len(items) * 1e9, by_table / len(items) * 1e9
+        )
+    )
+
+
+def main(repeat=5):
+    source = Source('<benchmark>', MODULE.encode('utf-8'))
+    measure(
+        u'token', TokenAnalyser, source, lambda analyser: source.tokens,
+        TokenAnalyser.token_signals,
+        lambda tok: token.tok_name[tok.type], lambda tok: tok.type,
+        u'tok', repeat
+    )
+    measure(
+        u'ast', ASTAnalyser, source, lambda analyser: ast.walk(analyser.ast),
+        ASTAnalyser.node_signals,
+        lambda node: node.__class__.__name__, lambda node: node.__class__,
+        u'node', repeat
+    )
+    measure(
+        u'cst', CSTAnalyser, source,
+        lambda analyser: analyser.cst.post_order(),
+        CSTAnalyser.node_signals,
+        lambda node: NODE_NAMES[node.type], lambda node: node.type,
+        u'node', repeat
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+# coding: utf-8
+"""
+    benchmarks.suite
+    ~~~~~~~~~~~~~~~~
+
+    Measures the throughput of Pyalysis on the synthetic corpora generated by
+    :mod:`benchmarks.corpus`, analysing each corpus as a whole and with each
+    analyser individually, as well as the throughput of loading and
+    evaluating ignore files and of the formatters.
+
+    Run with ``python -m benchmarks.suite [--save path] [--compare path]
+    [names...]``. Each benchmark runs in a separate process, so that the peak
+    resident set size reported is that of the benchmark alone.
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+from __future__ import print_function, division
+import io
+import os
+import sys
+import json
+import shutil
+import resource
+import tempfile
+import multiprocessing
+from collections import OrderedDict
+
+from argvard import Argvard
+
+from pyalysis.application import Pyalysis
+from pyalysis.analysers import (
+    LineAnalyser, TokenAnalyser, CSTAnalyser, ASTAnalyser
+)
+from pyalysis.formatters import TextFormatter, JSONFormatter
+from pyalysis.ignore import load_ignore_filter
+from pyalysis.profiling import timer
+from pyalysis.source import Source
+from pyalysis.warnings import WARNINGS
+from pyalysis._compat import text_type
+from benchmarks.corpus import CORPORA, write_corpus
+
+
+class NullOutput(object):
+    """
+    Discards everything written to it, counting the lines.
+    """
+    def __init__(self):
+        self.lines = 0
+
+    def write(self, string):
+        self.lines += string.count(u'\n')
+
+
+def iter_sources(paths):
+    for path in paths:
+        with open(path, 'rb') as module:
+            yield Source(path, module.read())
+
+
+def analyse(paths):
+    pyalysis = Pyalysis()
+    pyalysis.ignore_file_path = os.devnull
+    pyalysis.output = NullOutput()
+    try:
+        pyalysis.analyse(paths)
+    except SystemExit:
+        pass
+    return count_lines(paths)
+
+
+def analyse_with(analyser_class):
+    def analyse(paths):
+        for source in iter_sources(paths):
+            analyser_class(source).analyse()
+        return count_lines(paths)
+    return analyse
+
+
+def count_lines(paths):
+    lines = 0
+    for path in paths:
+        with open(path, 'rb') as module:
+            lines += module.read().count(b'\n')
+    return lines
+
+
+#: The warnings emitted for the corpora, which are filtered by attributes in
+#: :data:`IGNORE_FILE`. Ignoring their base class pep8 would ignore them
+#: regardless of those.
+FILTERED_WARNINGS = [
+    'extraneous-whitespace', 'line-too-long', 'multiple-imports',
+    'wrong-number-of-indentation-spaces'
+]
+
+IGNORE_FILE = u''.join(
+    u'{}\n'.format(name) for name in sorted(WARNINGS)
+    if name not in FILTERED_WARNINGS and name != 'pep8'
+) + u''.join(
+    u'{0}\n'
+    u'  file = "foo.py"\n'
+    u'  message = "{0}"\n'
+    u'\n'
+    u'{0}\n'
+    u'  file = "bar.py"\n'
+    u'\n'
+    .format(name) for name in FILTERED_WARNINGS
+)
+
+
+def load_ignore_filters(paths):
+    for _ in paths:
+        ignore_file = io.StringIO(IGNORE_FILE)
+        ignore_file.name = '.pyalysis.ignore'
+        load_ignore_filter(ignore_file)
+    return IGNORE_FILE.count(u'\n') * len(paths)
+
+
+def load_ignore_filter_and_warnings(paths):
+    ignore_file = io.StringIO(IGNORE_FILE)
+    ignore_file.name = '.pyalysis.ignore'
+    filter, _ = load_ignore_filter(ignore_file)
+    return filter, collect_warnings(paths)
+
+
+def evaluate_ignore_filter(arguments):
+    filter, warnings = arguments
+    for warning in warnings:
+        filter(warning)
+    return len(warnings)
+
+
+def collect_warnings(paths):
+    warnings = []
+    for source in iter_sources(paths):
+        for analyser_class in [
+            LineAnalyser, TokenAnalyser, CSTAnalyser, ASTAnalyser
+        ]:
+            warnings.extend(analyser_class(source).analyse())
+    return warnings
+
+
+def format_with(formatter_class):
+    def format(warnings):
+        output = NullOutput()
+        formatter = formatter_class(output)
+        for warning in warnings:
+            formatter.format(warning)
+        return output.lines
+    return format
+
+
+def create_benchmarks():
+    """
+    Returns an ordered dictionary, that maps the names of benchmarks to a
+    tuple of the name of the corpus the benchmark is run on, a setup function
+    and the function being timed.
+
+    The function being timed is called with the paths of the modules in the
+    corpus. If there is a setup function, it is called with the paths instead
+    and the timed function with whatever the setup function returns. The
+    timed function returns the number of lines it processed, such as lines of
+    code analysed or lines of output written, or the number of warnings.
+    """
+    benchmarks = OrderedDict()
+    for corpus in CORPORA:
+        benchmarks['analyse/' + corpus] = (corpus, None, analyse)
+        for analyser_class in [
+            LineAnalyser, TokenAnalyser, CSTAnalyser, ASTAnalyser
+        ]:
+            benchmarks[analyser_class.__name__ + '/' + corpus] = (
+                corpus, None, analyse_with(analyser_class)
+            )
+    benchmarks['load_ignore_filter'] = ('small', None, load_ignore_filters)
+    benchmarks['evaluate_ignore_filter'] = (
+        'whitespace', load_ignore_filter_and_warnings, evaluate_ignore_filter
+    )
+    for formatter_class in [TextFormatter, JSONFormatter]:
+        benchmarks[formatter_class.__name__] = (
+            'whitespace', collect_warnings, format_with(formatter_class)
+        )
+    return benchmarks
+
+
+def get_peak_rss():
+    """
+    Returns the peak resident set size of the current process in bytes.
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak_rss
+    return peak_rss * 1024
+
+
+def run_benchmark(arguments):
+    name, paths, repeat = arguments
+    _, setup, function = create_benchmarks()[name]
+    argument = paths if setup is None else setup(paths)
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        lines = function(argument)
+        times.append(timer() - start)
+    seconds = min(times)
+    return {
+        'seconds': seconds,
+        'files': len(paths),
+        'lines': lines,
+        'files_per_second': len(paths) / seconds,
+        'lines_per_second': lines / seconds,
+        'peak_rss': get_peak_rss()
+    }
+
+
+def print_header():
+    print(u'{:<28} {:>10} {:>12} {:>10} {:>9} {:>9}'.format(
+        u'benchmark', u'files/s', u'lines/s', u'peak MiB', u'seconds',
+        u'change'
+    ))
+
+
+def print_result(name, result, baseline=None):
+    """
+    Prints a row with the `result` of the benchmark with the given `name` and
+    the change of the time taken compared to the results in `baseline`, if
+    given.
+    """
+    if baseline is not None and name in baseline:
+        change = u'{:+.1f}%'.format(
+            (result['seconds'] / baseline[name]['seconds'] - 1) * 100
+        )
+    else:
+        change = u''
+    print(u'{:<28} {:>10.1f} {:>12.1f} {:>10.1f} {:>9.3f} {:>9}'.format(
+        name, result['files_per_second'], result['lines_per_second'],
+        result['peak_rss'] / 2 ** 20, result['seconds'], change
+    ))
+    sys.stdout.flush()
+
+
+application = Argvard(defaults={
+    'save': None,
+    'compare': None,
+    'repeat': u'3',
+    'seed': u'0'
+})
+
+
+@application.option('--save path')
+def save(context, path):
+    """
+    Write the results as JSON to path.
+    """
+    context['save'] = path
+
+
+@application.option('--compare path')
+def compare(context, path):
+    """
+    Compare the results to those saved in path.
+    """
+    context['compare'] = path
+
+
+@application.option('--repeat n')
+def repeat(context, n):
+    """
+    Run each benchmark n times and report the fastest run.
+    """
+    context['repeat'] = n
+
+
+@application.option('--seed n')
+def seed(context, n):
+    """
+    Generate the corpora with the seed n.
+    """
+    context['seed'] = n
+
+
+@application.main('[names...]')
+def main(context, names=None):
+    benchmarks = create_benchmarks()
+    if names is None:
+        names = list(benchmarks)
+    baseline = None
+    if context['compare'] is not None:
+        with io.open(context['compare'], 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+    print_header()
+    directory = tempfile.mkdtemp()
+    try:
+        corpora = {}
+        results = OrderedDict()
+        for name in names:
+            corpus = benchmarks[name][0]
+            if corpus not in corpora:
+                corpora[corpus] = write_corpus(
+                    directory, corpus, int(context['seed'])
+                )
+            pool = multiprocessing.Pool(1)
+            try:
+                results[name] = pool.apply(
+                    run_benchmark,
+                    ((name, corpora[corpus], int(context['repeat'])), )
+                )
+            finally:
+                pool.terminate()
+                pool.join()
+            print_result(name, results[name], baseline)
+    finally:
+        shutil.rmtree(directory)
+    if context['save'] is not None:
+        with io.open(context['save'], 'w', encoding='utf-8') as file:
+            file.write(
+                text_type(json.dumps(results, indent=4, sort_keys=True))
+            )
+
+
+if __name__ == '__main__':
+    application()
@@ -6,12 +6,39 @@
     :copyright: 2014 by Daniel Neuhäuser and Contributors
     :license: BSD, see LICENSE.rst
 """
-import pkg_resources
+import sys
 
 
-try:
-    __version__ = pkg_resources.get_distribution('Pyalysis').version
-    __version_info__ = tuple(map(int, __version__.split('-')[0].split('.')))
-except pkg_resources.DistributionNotFound:
-    __version__ = 'development'
-    __version_info__ = (0, 0, 0)
+def _get_version():
+    # Looking up the distribution imports a lot of modules, so this is only
+    # done once the version is needed.
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        from pkg_resources import (
+            get_distribution, DistributionNotFound as PackageNotFoundError
+        )
+
+        def version(name):
+            return get_distribution(name).version
+    try:
+        version = version('Pyalysis')
+        version_info = tuple(map(int, version.split('-')[0].split('.')))
+    except PackageNotFoundError:
+        version = 'development'
+        version_info = (0, 0, 0)
+    return version, version_info
+
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name not in ('__version__', '__version_info__'):
+            raise AttributeError(
+                'module {!r} has no attribute {!r}'.format(__name__, name)
+            )
+        globals()['__version__'], globals()['__version_info__'] = (
+            _get_version()
+        )
+        return globals()[name]
+else:
+    __version__, __version_info__ = _get_version()
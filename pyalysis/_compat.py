@@ -5,6 +5,7 @@
 
     :copyright: 2014 by Daniel Neuhäuser and Contributors
 """
+import os
 import sys
 import codecs
 try:
@@ -43,6 +44,30 @@ else:
     stderr = sys.stderr
 
 
+try:
+    from os import scandir
+except ImportError:  # Python < 3.5
+    try:
+        from scandir import scandir
+    except ImportError:
+        class _DirEntry(object):
+            def __init__(self, directory, name):
+                self.name = name
+                self.path = os.path.join(directory, name)
+
+            def is_dir(self):
+                return os.path.isdir(self.path)
+
+            def is_file(self):
+                return os.path.isfile(self.path)
+
+            def is_symlink(self):
+                return os.path.islink(self.path)
+
+        def scandir(path):
+            return [_DirEntry(path, name) for name in os.listdir(path)]
+
+
 # copied from Flask: flask/_compat.py
 #                    copyright 2014 by Armin Ronacher
 #                    licensed under BSD
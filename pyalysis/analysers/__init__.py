@@ -6,10 +6,13 @@
     :copyright: 2014 by Daniel Neuhäuser and Contributors
     :license: BSD, see LICENSE.rst for details
 """
+from pyalysis.analysers.base import emits
 from pyalysis.analysers.raw import LineAnalyser
 from pyalysis.analysers.token import TokenAnalyser
 from pyalysis.analysers.cst import CSTAnalyser
 from pyalysis.analysers.ast import ASTAnalyser
 
 
-__all__ = ['LineAnalyser', 'TokenAnalyser', 'CSTAnalyser', 'ASTAnalyser']
+__all__ = [
+    'LineAnalyser', 'TokenAnalyser', 'CSTAnalyser', 'ASTAnalyser', 'emits'
+]
@@ -10,34 +10,54 @@ from __future__ import absolute_import
 import ast
 import inspect
 
-from blinker import Signal
-
 from pyalysis.warnings import (
     MultipleImports, StarImport, IndiscriminateExcept, GlobalKeyword,
-    PrintStatement, DivStatement
+    PrintStatement, DivStatement, ASTWarning
 )
-from pyalysis.analysers.base import AnalyserBase
+from pyalysis.analysers.base import AnalyserBase, LazySignalsMeta, emits
 from pyalysis.utils import Location
 from pyalysis._compat import PY2, with_metaclass
 
 
-class ASTAnalyserMeta(type):
+class ASTAnalyserMeta(LazySignalsMeta):
     def __init__(self, name, bases, attributes):
-        type.__init__(self, name, bases, attributes)
-        for name in dir(ast):
-            attribute = getattr(ast, name)
-            if inspect.isclass(attribute) and issubclass(attribute, ast.AST):
-                setattr(self, 'on_' + name, Signal())
+        LazySignalsMeta.__init__(self, name, bases, attributes)
+        #: A dictionary mapping node classes to the signal emitted after the
+        #: children of a node have been analysed.
+        self.node_signals = {}
+        #: A dictionary mapping node classes to the signal emitted before the
+        #: children of a node are analysed.
+        self.enter_node_signals = {}
+
+    def get_signal_key(self, name):
+        if name.startswith('on_enter_'):
+            signals, node_name = self.enter_node_signals, name[9:]
+        elif name.startswith('on_'):
+            signals, node_name = self.node_signals, name[3:]
+        else:
+            return None
+        node_class = getattr(ast, node_name, None)
+        if inspect.isclass(node_class) and issubclass(node_class, ast.AST):
+            return signals, node_class
 
 
 class ASTAnalyser(with_metaclass(ASTAnalyserMeta, AnalyserBase)):
     """
     AST-level analyser of Python source code.
+
+    For each node class in :mod:`ast` there are two signals, both are sent
+    with the node (`node`) as argument. ``on_enter_<name>`` is sent before
+    the children of a node are analysed and ``on_<name>`` afterwards.
     """
+    warning_class = ASTWarning
+
     def __init__(self, module):
         AnalyserBase.__init__(self, module)
 
-        self.ast = ast.parse(module.read(), module.name)
+        self.ast = ast.parse(self.source.bytes, self.source.name)
+
+        self._dispatch_table = {}
+        self._enter_dispatch_table = {}
 
     def emit(self, warning_cls, message, node):
         """
@@ -54,20 +74,45 @@ class ASTAnalyser(with_metaclass(ASTAnalyserMeta, AnalyserBase)):
         Analyses the module passed to the instance and returns a list of
         :class:`pyalysis.warnings.ASTWarning` instances.
         """
-        self.on_analyse.send(self)
+        for receiver in self.get_receivers(self.on_analyse):
+            receiver(self)
+        self._dispatch_table = self.create_dispatch_table(self.node_signals)
+        self._enter_dispatch_table = self.create_dispatch_table(
+            self.enter_node_signals
+        )
         self.analyse_node(self.ast)
         return self.warnings
 
     def analyse_node(self, node):
-        for child in ast.iter_child_nodes(node):
-            self.analyse_node(child)
-        name = node.__class__.__name__
-        signal_name = 'on_' + name
-        signal = getattr(self, signal_name)
-        signal.send(self, node=node)
+        """
+        Analyses `node` and its descendants in depth-first order.
+
+        The tree is traversed with an explicit stack instead of recursion, so
+        that deeply nested code doesn't exceed the recursion limit.
+        """
+        get_enter_receivers = self._enter_dispatch_table.get
+        get_receivers = self._dispatch_table.get
+        iter_child_nodes = ast.iter_child_nodes
+        # Each element is a node and a flag indicating whether the children of
+        # the node have been analysed already.
+        stack = [(node, False)]
+        while stack:
+            node, children_analysed = stack.pop()
+            if children_analysed:
+                receivers = get_receivers(node.__class__)
+            else:
+                stack.append((node, True))
+                children = list(iter_child_nodes(node))
+                children.reverse()
+                stack.extend((child, False) for child in children)
+                receivers = get_enter_receivers(node.__class__)
+            if receivers is not None:
+                for receiver in receivers:
+                    receiver(self, node=node)
 
 
 @ASTAnalyser.on_Import.connect
+@emits(MultipleImports)
 def check_multi_import(analyser, node):
     if len(node.names) > 1:
         analyser.emit(
@@ -78,6 +123,7 @@ def check_multi_import(analyser, node):
 
 
 @ASTAnalyser.on_ImportFrom.connect
+@emits(StarImport)
 def check_star_import(analyser, node):
     if len(node.names) == 1 and node.names[0].name == u'*':
         analyser.emit(
@@ -88,6 +134,7 @@ def check_star_import(analyser, node):
 
 
 @ASTAnalyser.on_Global.connect
+@emits(GlobalKeyword)
 def check_global(analyser, node):
     analyser.emit(
         GlobalKeyword,
@@ -98,6 +145,7 @@ def check_global(analyser, node):
 
 if PY2:
     @ASTAnalyser.on_Print.connect
+    @emits(PrintStatement)
     def check_print(analyser, node):
         analyser.emit(
             PrintStatement,
@@ -107,6 +155,7 @@ if PY2:
         )
 
 
+@emits(IndiscriminateExcept)
 def check_indiscriminate_except(analyser, node):
     if len(node.handlers) == 1 and node.handlers[0].type is None:
         analyser.emit(
@@ -121,6 +170,7 @@ else:
 
 
 @ASTAnalyser.on_analyse.connect
+@emits(DivStatement)
 def check_ambiguous(analyser):
     # PY2 hack: should use nonlocal
     div_is_ambiguous = [PY2]
@@ -7,103 +7,265 @@
     :license: BSD, see LICENSE.rst for details
 """
 from __future__ import absolute_import
-import tokenize
 
 from blinker import Signal
 
-from pyalysis.utils import PerClassAttribute, retain_file_position
-from pyalysis._compat import PY2
+from pyalysis.source import Source
+from pyalysis.warnings import AnalyserWarning
+from pyalysis.utils import (
+    PerClassAttribute, iter_subclasses, iter_signals, iter_receivers
+)
+
+
+def emits(*warning_classes):
+    """
+    Returns a decorator for receivers, that declares the `warning_classes`
+    the receiver emits.
+
+    Receivers whose warnings are all ignored entirely are neither called nor,
+    if they are receivers of :attr:`AnalyserBase.on_analyse`, given the
+    chance to connect further receivers. Receivers without such a declaration
+    are always called.
+    """
+    def decorator(receiver):
+        receiver.warning_classes = warning_classes
+        return receiver
+    return decorator
+
+
+def is_ignored(receiver, ignores):
+    """
+    Returns `True`, if `ignores` returns `True` for all warning classes the
+    given `receiver` is declared to emit with :func:`emits`. `ignores` may be
+    `None`, in which case nothing is ignored.
+    """
+    warning_classes = getattr(receiver, 'warning_classes', None)
+    return (
+        ignores is not None and bool(warning_classes) and
+        all(map(ignores, warning_classes))
+    )
+
+
+class LazySignalsMeta(type):
+    """
+    A metaclass for analysers with a signal for each of a large number of
+    keys, such as token types or node classes.
+
+    Signals are created, when they are accessed for the first time, instead of
+    creating all of them together with the class. Like those created by
+    :class:`~pyalysis.utils.PerClassAttribute`, signals are never shared with
+    subclasses.
+
+    Metaclasses derived from this one implement :meth:`get_signal_key`.
+    """
+    def __init__(self, name, bases, attributes):
+        type.__init__(self, name, bases, attributes)
+        self._signals = {}
+
+    def get_signal_key(self, name):
+        """
+        Returns a tuple of a dictionary and a key, if `name` is the name of a
+        signal, or `None`. Once the signal is created, it is added to the
+        dictionary under that key.
+        """
+        return None
+
+    def __getattr__(self, name):
+        signals = self.__dict__.get('_signals')
+        if signals is None:
+            raise AttributeError(name)
+        try:
+            return signals[name]
+        except KeyError:
+            pass
+        signal_key = self.get_signal_key(name)
+        if signal_key is None:
+            raise AttributeError(name)
+        signals_by_key, key = signal_key
+        signal = signals[name] = signals_by_key[key] = Signal()
+        return signal
+
+    def __dir__(self):
+        names = set(self.__dict__.get('_signals', ()))
+        for cls in self.__mro__:
+            names.update(cls.__dict__)
+        return sorted(names)
 
 
 class AnalyserBase(object):
     """
     A base class for analysers. To implement an analyser you should subclass
     this class and implement :meth:`analyse`.
+
+    `module` is either a :class:`pyalysis.source.Source` instance or a
+    file-like object opened in read-only bytes mode. Passing the same
+    :class:`~pyalysis.source.Source` to several analysers avoids reading and
+    tokenizing the module repeatedly.
     """
     #: :class:`blinker.Signal` instance that will be called by :meth:`analyse`,
     #: with the :class:`AnalyserBase` instance as sender.
     on_analyse = PerClassAttribute(Signal)
 
+    #: The base class of all warnings the analyser emits.
+    warning_class = AnalyserWarning
+
+    @classmethod
+    def get_warning_classes(cls):
+        """
+        Returns a list of the warning classes the analyser can emit, those are
+        all subclasses of :attr:`warning_class` with a type.
+        """
+        return [
+            warning_cls for warning_cls in iter_subclasses(cls.warning_class)
+            if hasattr(warning_cls, 'type')
+        ]
+
+    @classmethod
+    def has_receivers(cls, ignores=None):
+        """
+        Returns `True`, if any receivers are connected to the signals of the
+        analyser. Receivers emitting only warnings for whose class `ignores`
+        returns `True` are not taken into account.
+        """
+        return any(
+            not is_ignored(receiver, ignores)
+            for _, signal in iter_signals(cls)
+            for receiver in iter_receivers(signal)
+        )
+
+    def __getattr__(self, name):
+        # Analysers whose class has lazily created signals can't find those
+        # through the class.
+        if name.startswith('on_'):
+            return getattr(self.__class__, name)
+        raise AttributeError(name)
+
     def __init__(self, module):
-        #: The module being analysed as a file-like object opened in read-only
-        #: bytes mode.
+        #: The module being analysed.
         self.module = module
 
-        #: A list with the lines in the module.
-        with retain_file_position(self.module):
-            self.physical_lines = [line.rstrip() for line in self.module]
-
-        with retain_file_position(self.module):
-            #: A list with the logical lines in the module.
-            self.logical_lines = []
-            self.logical_line_linenos = []
-            self._index2logical_line_index = []
-            for logical_line_index, (start, end, line) in enumerate(
-                get_logical_lines(self.module)
-            ):
-                for _ in range(end - start + 1):
-                    self._index2logical_line_index.append(logical_line_index)
-                self.logical_line_linenos.append((start, end))
-                self.logical_lines.append(line)
+        if isinstance(module, Source):
+            source = module
+        else:
+            source = Source.from_file(module)
+        #: The :class:`pyalysis.source.Source` of the module being analysed.
+        self.source = source
+
+        #: A list with the logical lines in the module.
+        self.logical_lines = source.logical_lines
 
         #: A list of warnings generated by the analyser.
         self.warnings = []
 
+        #: A callable, that is called with each warning as soon as it is
+        #: emitted, or `None`. If a sink is given, warnings are not added to
+        #: :attr:`warnings`.
+        self.sink = None
+
+        #: A callable, that is called with a warning class and returns `True`,
+        #: if warnings of that class are ignored entirely, or `None`. Such
+        #: warnings are never created and receivers, that only emit those,
+        #: are not called.
+        self.ignores = None
+
+        #: A :class:`pyalysis.profiling.Profile` used to time the receivers
+        #: connected to the signals or `None`.
+        self.profile = None
+
+    @property
+    def physical_lines(self):
+        """
+        A list with the lines in the module.
+        """
+        return self.source.physical_lines
+
+    @property
+    def logical_line_linenos(self):
+        """
+        A list of tuples with the first and last line number of each logical
+        line.
+        """
+        return self.source.logical_line_linenos
+
+    def create_dispatch_table(self, signals):
+        """
+        Takes a dictionary mapping keys, such as token types, to signals and
+        returns a dictionary mapping those keys to a tuple of the receivers
+        connected for this analyser. Keys of signals without any receivers are
+        left out.
+
+        Analysers dispatch through such a table instead of looking up and
+        sending signals for every token or node. Receivers should therefore be
+        connected before the table is created, in a receiver of
+        :attr:`on_analyse` at the latest.
+
+        If there is a :attr:`profile`, the receivers in the table are wrapped,
+        so that they are timed.
+        """
+        table = {}
+        for key, signal in signals.items():
+            if signal.receivers:
+                receivers = self.get_receivers(signal)
+                if receivers:
+                    if self.profile is not None:
+                        receivers = tuple(map(self.profile.wrap, receivers))
+                    table[key] = receivers
+        return table
+
+    def get_receivers(self, signal):
+        """
+        Returns a tuple of the receivers connected to `signal` for this
+        analyser, leaving out those whose warnings are all ignored according
+        to :attr:`ignores`.
+        """
+        ignores = self.ignores
+        return tuple(
+            receiver for receiver in signal.receivers_for(self)
+            if not is_ignored(receiver, ignores)
+        )
+
     def get_logical_lines(self, start, end):
         """
         Returns an iterator of the logical lines between the given `start` and
         `end` location.
         """
-        if start.line == end.line:
-            logical_line_indices = [
-                self._index2logical_line_index[start.line - 1]
-            ]
-        else:
-            logical_line_indices = sorted({
-                self._index2logical_line_index[lineno - 1]
-                for lineno in range(start.line, end.line)
-            })
-        for index in logical_line_indices:
-            yield self.logical_lines[index]
+        return self.source.get_logical_lines(start, end)
 
     def get_logical_line_range(self, lineno):
         """
         Returns a tuple containing the first and last line number of the
         logical line in which the given `lineno` is contained.
         """
-        logical_line_index = self._index2logical_line_index[lineno - 1]
-        return self.logical_line_linenos[logical_line_index]
+        return self.source.get_logical_line_range(lineno)
 
     def emit(self, warning_cls, message, start, end):
         """
-        Adds an instance of `warning_cls` to :attr:`warnings`.
+        Adds an instance of `warning_cls` to :attr:`warnings` or passes it to
+        the :attr:`sink`, if there is one.
 
         `warning_cls` will be called with the warning `message`, the name of
         the module in which the warning occurred, the `start` and `end`
-        location of the code being warned about and a list of logical lines
-        corresponding to the given locations.
-        """
-        self.warnings.append(
-            warning_cls(
-                message, self.module.name, start, end,
-                list(self.get_logical_lines(start, end))
-            )
+        location of the code being warned about and the
+        :class:`pyalysis.source.LineStore` of the module, from which the
+        logical lines corresponding to the given locations are taken, if they
+        are needed.
+
+        Nothing happens, if warnings of `warning_cls` are ignored according to
+        :attr:`ignores`.
+        """
+        if self.ignores is not None and self.ignores(warning_cls):
+            return
+        warning = warning_cls(
+            message, self.source.name, start, end,
+            line_store=self.source.line_store
         )
+        if self.sink is None:
+            self.warnings.append(warning)
+        else:
+            self.sink(warning)
 
     def analyse(self):
         """
         Analyses the module and returns :attr:`warnings` for convenience.
         """
         return self.warnings
-
-
-def get_logical_lines(file):
-    if PY2:
-        generate_tokens = tokenize.generate_tokens
-    else:
-        generate_tokens = tokenize.tokenize
-    seen = 0
-    for _, _, start, end, logical_line in generate_tokens(file.readline):
-        if start[0] > seen:
-            yield start[0], end[0], logical_line.rstrip()
-            seen = end[0]
@@ -6,18 +6,22 @@
     :copyright: 2014 by Daniel Neuhäuser and Contributors
     :license: BSD, see LICENSE.rst for details
 """
-import codecs
+from __future__ import absolute_import
+import token
+import tokenize
 from lib2to3 import pygram, pytree
 from lib2to3.refactor import _detect_future_features
+from lib2to3.pgen2 import token as lib2to3_token
+from lib2to3.pgen2.grammar import opmap
+from lib2to3.pgen2.parse import ParseError
 from lib2to3.pgen2.driver import Driver
+from lib2to3.pytree import Node, Leaf
 from lib2to3.pgen2.token import tok_name as TOKEN_NAMES
 
-from blinker import Signal
-
-from pyalysis.warnings import ExtraneousWhitespace
-from pyalysis.utils import detect_encoding, Location
-from pyalysis.analysers.base import AnalyserBase
-from pyalysis._compat import with_metaclass
+from pyalysis.warnings import ExtraneousWhitespace, CSTWarning
+from pyalysis.utils import Location
+from pyalysis.analysers.base import AnalyserBase, LazySignalsMeta, emits
+from pyalysis._compat import PY2, with_metaclass
 
 
 SYMBOL_NAMES = {
@@ -38,35 +42,368 @@ nodes = _Namespace()
 nodes.__dict__.update({name: value for value, name in NODE_NAMES.items()})
 
 
-def parse(file):
-    encoding = detect_encoding(file)
-    file = codecs.lookup(encoding).streamreader(file)
-    source = file.read()
-    source += u'\n'  # necessary to fix weird parsing error
-    features = _detect_future_features(source)
+def get_grammar(features):
+    """
+    Returns the lib2to3 grammar for a module importing the given `features`
+    from :mod:`__future__`.
+    """
     if u'print_function' in features:
-        grammar = pygram.python_grammar_no_print_statement
-    else:
-        grammar = pygram.python_grammar
-    driver = Driver(grammar, convert=pytree.convert)
-    return driver.parse_string(source)
+        return pygram.python_grammar_no_print_statement
+    return pygram.python_grammar
+
+
+# Maps grammars to the driver used to parse modules with it.
+_drivers = {}
+
+
+def get_driver(grammar):
+    """
+    Returns a :class:`lib2to3.pgen2.driver.Driver` for the given `grammar`.
+
+    Drivers keep no state between parses, so only one is created per grammar
+    and process.
+    """
+    try:
+        return _drivers[grammar]
+    except KeyError:
+        driver = _drivers[grammar] = Driver(grammar, convert=pytree.convert)
+        return driver
+
+
+_NON_CODE_TOKEN_TYPES = frozenset(
+    getattr(tokenize, name)
+    for name in ['NEWLINE', 'NL', 'COMMENT', 'ENCODING']
+    if hasattr(tokenize, name)
+)
+
+
+def detect_future_features(tokens):
+    """
+    Returns a frozenset of the features imported from :mod:`__future__`,
+    given the :mod:`tokenize` `tokens` of a module.
+
+    This works like the detection lib2to3 uses, without having to tokenize
+    the module again.
+    """
+    features = set()
+    have_docstring = False
+    tokens = (tok for tok in tokens if tok.type not in _NON_CODE_TOKEN_TYPES)
+    for tok in tokens:
+        if tok.type == token.STRING:
+            if have_docstring:
+                break
+            have_docstring = True
+        elif tok.type == token.NAME and tok.lexeme == u'from':
+            lexemes = [
+                getattr(next(tokens, None), 'lexeme', None) for _ in range(2)
+            ]
+            if lexemes != [u'__future__', u'import']:
+                break
+            tok = next(tokens, None)
+            if tok is not None and tok.lexeme == u'(':
+                tok = next(tokens, None)
+            while tok is not None and tok.type == token.NAME:
+                features.add(tok.lexeme)
+                tok = next(tokens, None)
+                if tok is None or tok.lexeme != u',':
+                    break
+                tok = next(tokens, None)
+        else:
+            break
+    return frozenset(features)
+
+
+def parse(source, features=None):
+    """
+    Parses the given decoded `source` and returns the concrete syntax tree.
+
+    If the `features` imported from :mod:`__future__` are not given, they are
+    detected by tokenizing the source.
+    """
+    source += u'\n'  # necessary to fix weird parsing error
+    if features is None:
+        features = _detect_future_features(source)
+    return get_driver(get_grammar(features)).parse_string(source)
+
+
+class CSTBackend(object):
+    """
+    A base class for backends creating a concrete syntax tree, consisting of
+    :mod:`lib2to3.pytree` nodes, for a :class:`pyalysis.source.Source`.
+    """
+    def parse(self, source):
+        """
+        Returns the concrete syntax tree for the given `source`.
+        """
+        raise NotImplementedError()
+
+
+class Lib2to3Backend(CSTBackend):
+    """
+    Parses the decoded source, tokenizing it with the lib2to3 tokenizer.
+    """
+    def parse(self, source):
+        return parse(source.text, detect_future_features(source.tokens))
+
+
+class TokenStreamBackend(CSTBackend):
+    """
+    Parses the tokens in :attr:`pyalysis.source.Source.tokens`, which have
+    been created by :mod:`tokenize` already, instead of tokenizing the source
+    again with the slower lib2to3 tokenizer.
+
+    The resulting tree is the same as the one created by the lib2to3
+    tokenizer, including the whitespace and comments in the `prefix` of
+    nodes. If the tokens cannot be parsed, for example because they include
+    tokens unknown to lib2to3, the `fallback` backend is used instead. This is
+    also the case on Python 2.x, where :mod:`tokenize` produces byte strings.
+    """
+    def __init__(self, fallback=None):
+        if fallback is None:
+            fallback = Lib2to3Backend()
+        self.fallback = fallback
+
+    def parse(self, source):
+        if PY2:
+            return self.fallback.parse(source)
+        grammar = get_grammar(detect_future_features(source.tokens))
+        try:
+            return parse_tokens(grammar, iter_lib2to3_tokens(source))
+        except (ParseError, KeyError):
+            return self.fallback.parse(source)
+
+
+_SHIFT, _PUSH, _POP, _ERROR = range(4)
+
+# Maps grammars to a dictionary, that maps a nonterminal, a state of its DFA
+# and a label to the transition the parser makes.
+_transitions = {}
+
+
+def _find_transition(grammar, nonterminal, state, ilabel):
+    # This is the search lib2to3.pgen2.parse.Parser.addtoken performs for
+    # every token.
+    arcs = grammar.dfas[nonterminal][0][state]
+    for i, newstate in arcs:
+        if i == ilabel:
+            return _SHIFT, newstate
+        t = grammar.labels[i][0]
+        if t >= 256 and ilabel in grammar.dfas[t][1]:
+            return _PUSH, t, newstate
+    if (0, state) in arcs:
+        return _POP,
+    return _ERROR,
+
+
+def parse_tokens(grammar, tokens):
+    """
+    Parses the given iterable of lib2to3 `tokens` with `grammar` and returns
+    the concrete syntax tree.
+
+    This produces the same tree as :meth:`lib2to3.pgen2.driver.Driver.\
+    parse_tokens` with :func:`lib2to3.pytree.convert`. However the transitions
+    of the parser are looked up in a table, that is filled as transitions are
+    found, instead of searching the arcs of the current state for every
+    token.
+    """
+    transitions = _transitions.setdefault(grammar, {})
+    dfas = grammar.dfas
+    keywords = grammar.keywords
+    token_labels = grammar.tokens
+    used_names = set()
+    # Each stack entry is a list of the nonterminal, the state of its DFA, the
+    # context and the children.
+    stack = [[grammar.start, 0, None, []]]
+
+    lineno = 1
+    column = 0
+    type = value = start = None
+    prefix = u''
+    for type, value, start, end, line_text in tokens:
+        if start != (lineno, column):
+            s_lineno, s_column = start
+            if lineno < s_lineno:
+                prefix += u'\n' * (s_lineno - lineno)
+                lineno = s_lineno
+                column = 0
+            if column < s_column:
+                prefix += line_text[column:s_column]
+                column = s_column
+        if type == lib2to3_token.COMMENT or type == lib2to3_token.NL:
+            prefix += value
+            lineno, column = end
+            if value.endswith(u'\n'):
+                lineno += 1
+                column = 0
+            continue
+        if type == lib2to3_token.OP:
+            type = opmap[value]
+        context = prefix, start
+
+        ilabel = None
+        if type == lib2to3_token.NAME:
+            used_names.add(value)
+            ilabel = keywords.get(value)
+        if ilabel is None:
+            ilabel = token_labels.get(type)
+            if ilabel is None:
+                raise ParseError(u'bad token', type, value, context)
+
+        while True:
+            entry = stack[-1]
+            key = entry[0], entry[1], ilabel
+            transition = transitions.get(key)
+            if transition is None:
+                transition = transitions[key] = _find_transition(
+                    grammar, entry[0], entry[1], ilabel
+                )
+            action = transition[0]
+            if action == _SHIFT:
+                entry[3].append(Leaf(type, value, context=context))
+                entry[1] = transition[1]
+                break
+            elif action == _PUSH:
+                entry[1] = transition[2]
+                stack.append([transition[1], 0, context, []])
+            elif action == _POP:
+                node = _pop(stack)
+                if not stack:
+                    raise ParseError(u'too much input', type, value, context)
+                stack[-1][3].append(node)
+            else:
+                raise ParseError(u'bad input', type, value, context)
+
+        # Pop while we are in an accept-only state.
+        while True:
+            nonterminal, state = stack[-1][:2]
+            states = dfas[nonterminal][0]
+            if states[state] != [(0, state)]:
+                break
+            node = _pop(stack)
+            if not stack:
+                node.used_names = used_names
+                return node
+            stack[-1][3].append(node)
+
+        prefix = u''
+        lineno, column = end
+        if value.endswith(u'\n'):
+            lineno += 1
+            column = 0
+    raise ParseError(u'incomplete input', type, value, (prefix, start))
+
+
+def _pop(stack):
+    nonterminal, _, context, children = stack.pop()
+    if len(children) == 1:
+        return children[0]
+    return Node(nonterminal, children, context=context)
+
+
+#: Maps :mod:`token` types to :mod:`lib2to3.pgen2.token` types.
+LIB2TO3_TOKEN_TYPES = {
+    token_type: getattr(lib2to3_token, name)
+    for token_type, name in token.tok_name.items()
+    if hasattr(lib2to3_token, name)
+}
 
 
-class CSTAnalyserMeta(type):
+def iter_lib2to3_tokens(source):
+    """
+    Yields the tokens of the given `source` as tuples, like those produced by
+    the lib2to3 tokenizer.
+    """
+    tokens = source.tokens
+    previous_type = token.NEWLINE
+    previous_end = Location(1, 0)
+    # lib2to3 treats async and await as keywords within async functions, the
+    # stack contains the indentation depth of the async functions we are in.
+    depth = 0
+    async_depths = []
+    at_line_start = True
+    for index, tok in enumerate(tokens):
+        type, lexeme, start, end, line = tok
+        if type == token.ENCODING:
+            continue
+        elif type == token.INDENT:
+            depth += 1
+        elif type == token.DEDENT:
+            depth -= 1
+        elif type not in (token.NL, token.COMMENT):
+            if at_line_start:
+                while async_depths and depth <= async_depths[-1]:
+                    async_depths.pop()
+                at_line_start = False
+            if type == token.NEWLINE:
+                at_line_start = True
+        if (
+            start.line > previous_end.line and
+            previous_type not in (token.NEWLINE, token.NL, token.COMMENT) and
+            type not in (token.DEDENT, token.ENDMARKER)
+        ):
+            # lib2to3 includes backslash continuations in the prefix, the
+            # tokenize module doesn't produce a token for those.
+            previous_line = source.lines[previous_end.line - 1]
+            rest = previous_line[previous_end.column:]
+            yield (
+                lib2to3_token.NL, rest, tuple(previous_end),
+                (previous_end.line, len(previous_line)), previous_line
+            )
+        if type == token.OP and lexeme == u'...':
+            # The lib2to3 grammar expects an ellipsis to be three dots.
+            for column in range(start.column, end.column):
+                yield (
+                    lib2to3_token.OP, u'.', (start.line, column),
+                    (start.line, column + 1), line
+                )
+        elif type == token.NAME and lexeme in (u'async', u'await'):
+            next_lexeme = tokens[index + 1].lexeme
+            if lexeme == u'async' and next_lexeme == u'def':
+                async_depths.append(depth)
+                type = lib2to3_token.ASYNC
+            elif lexeme == u'async' and next_lexeme == u'for':
+                type = lib2to3_token.ASYNC
+            elif async_depths:
+                if lexeme == u'async':
+                    type = lib2to3_token.ASYNC
+                else:
+                    type = lib2to3_token.AWAIT
+            else:
+                type = lib2to3_token.NAME
+            yield type, lexeme, tuple(start), tuple(end), line
+        else:
+            yield (
+                LIB2TO3_TOKEN_TYPES[type], lexeme, tuple(start), tuple(end),
+                line
+            )
+        previous_type = tok.type
+        previous_end = end
+
+
+class CSTAnalyserMeta(LazySignalsMeta):
     def __init__(self, name, bases, attributes):
-        type.__init__(self, name, bases, attributes)
-        for name in NODE_NAMES.values():
-            setattr(self, 'on_' + name, Signal())
+        LazySignalsMeta.__init__(self, name, bases, attributes)
+        #: A dictionary mapping node types to the corresponding signal.
+        self.node_signals = {}
+
+    def get_signal_key(self, name):
+        if name.startswith('on_') and name[3:] in nodes.__dict__:
+            return self.node_signals, nodes.__dict__[name[3:]]
 
 
 class CSTAnalyser(with_metaclass(CSTAnalyserMeta, AnalyserBase)):
     """
     CST-level analyser of Python source code.
     """
+    warning_class = CSTWarning
+
+    #: The :class:`CSTBackend` used to create the concrete syntax tree.
+    backend = TokenStreamBackend()
+
     def __init__(self, module):
         AnalyserBase.__init__(self, module)
 
-        self.cst = parse(module)
+        self.cst = self.backend.parse(self.source)
 
     def emit(self, warning_cls, message, node):
         AnalyserBase.emit(
@@ -89,15 +426,17 @@ class CSTAnalyser(with_metaclass(CSTAnalyserMeta, AnalyserBase)):
 
     def analyse(self):
         self.warnings = []
+        get_receivers = self.create_dispatch_table(self.node_signals).get
         for node in self.cst.post_order():
-            type_name = NODE_NAMES[node.type]
-            signal_name = 'on_' + type_name
-            signal = getattr(self, signal_name)
-            signal.send(self, node=node)
+            receivers = get_receivers(node.type)
+            if receivers is not None:
+                for receiver in receivers:
+                    receiver(self, node=node)
         return self.warnings
 
 
 @CSTAnalyser.on_atom.connect
+@emits(ExtraneousWhitespace)
 def check_extraneous_whitespace_inside_list(analyser, node):
     is_empty_list = (
         len(node.children) == 2 and
@@ -140,6 +479,7 @@ def check_extraneous_whitespace_inside_list(analyser, node):
 
 
 @CSTAnalyser.on_power.connect
+@emits(ExtraneousWhitespace)
 def check_extraneous_whitespace_slicing_or_indexing(analyser, node):
     is_slicing_or_indexing = (
         len(node.children) == 2 and
@@ -190,6 +530,7 @@ def check_extraneous_whitespace_slicing_or_indexing(analyser, node):
 
 
 @CSTAnalyser.on_atom.connect
+@emits(ExtraneousWhitespace)
 def check_extraneous_whitespace_inside_dict(analyser, node):
     is_empty_dict = (
         len(node.children) == 2 and
@@ -233,6 +574,7 @@ def check_extraneous_whitespace_inside_dict(analyser, node):
 
 
 @CSTAnalyser.on_atom.connect
+@emits(ExtraneousWhitespace)
 def check_extraneous_whitespace_inside_set(analyser, node):
     is_single_element_set = (
         len(node.children) == 3 and
@@ -270,6 +612,7 @@ def check_extraneous_whitespace_inside_set(analyser, node):
 
 
 @CSTAnalyser.on_atom.connect
+@emits(ExtraneousWhitespace)
 def check_extraneous_whitespace_inside_tuple(analyser, node):
     is_tuple = (
         len(node.children) == 3 and
@@ -300,6 +643,7 @@ def check_extraneous_whitespace_inside_tuple(analyser, node):
 
 
 @CSTAnalyser.on_power.connect
+@emits(ExtraneousWhitespace)
 def check_extraneous_whitespace_function_call(analyser, node):
     is_function_call = (
         len(node.children) == 2 and
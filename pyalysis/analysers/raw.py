@@ -6,13 +6,14 @@
     :copyright: 2014 by Daniel Neuhäuser and Contributors
     :license: BSD, see LICENSE.rst for details
 """
-import codecs
+import re
+from itertools import chain
 
 from blinker import Signal
 
-from pyalysis.utils import detect_encoding, Location
-from pyalysis.warnings import LineTooLong
-from pyalysis.analysers.base import AnalyserBase
+from pyalysis.utils import Location
+from pyalysis.warnings import LineTooLong, LineWarning
+from pyalysis.analysers.base import AnalyserBase, emits
 
 
 class LineAnalyser(AnalyserBase):
@@ -20,6 +21,15 @@ class LineAnalyser(AnalyserBase):
     Line-level analyser of Python source code.
     """
 
+    warning_class = LineWarning
+
+    #: :class:`blinker.Signal` instance that will be emitted once with the
+    #: decoded `text` of the module as argument. Checks that can find the
+    #: lines they warn about in the text as a whole, for example with a
+    #: regular expression, should be connected to this signal instead of
+    #: :attr:`on_line`, it's much faster than looking at each line in Python.
+    on_text = Signal()
+
     #: :class:`blinker.Signal` instance that will be emitted for each line in
     #: the module with the line number (`lineno`) and `line` as argument.
     on_line = Signal()
@@ -27,33 +37,83 @@ class LineAnalyser(AnalyserBase):
     def __init__(self, module):
         AnalyserBase.__init__(self, module)
 
-        self.encoding = detect_encoding(module)
+        self.encoding = self.source.encoding
 
-    def emit(self, warning_cls, message):
+    def emit(self, warning_cls, message, lineno=None, line=None):
         """
         Adds an instance of `warning_cls` to :attr:`warnings`.
 
         `warning_cls` will be called as described in :meth:`AnalyserBase.emit`.
+        The warning is about the line with the given `lineno` or the line
+        currently being analysed, if `lineno` is `None`.
         """
-        start = Location(self.lineno, 0)
-        end = Location(self.lineno, len(self.line))
+        if lineno is None:
+            lineno = self.lineno
+            line = self.line
+        start = Location(lineno, 0)
+        end = Location(lineno, len(line))
         AnalyserBase.emit(self, warning_cls, message, start, end)
 
     def analyse(self):
-        self.on_analyse.send(self)
-        reader = codecs.lookup(self.encoding).streamreader(self.module)
-        for i, line in enumerate(reader, 1):
-            self.lineno = i
-            self.line = line
-            self.on_line.send(self, lineno=i, line=line)
+        for receiver in self.get_receivers(self.on_analyse):
+            receiver(self)
+        table = self.create_dispatch_table({
+            'text': self.on_text,
+            'line': self.on_line
+        })
+        for receiver in table.get('text', ()):
+            receiver(self, text=self.source.text)
+        receivers = table.get('line', ())
+        if receivers:
+            for i, line in enumerate(self.source.lines, 1):
+                self.lineno = i
+                self.line = line
+                for receiver in receivers:
+                    receiver(self, lineno=i, line=line)
         return self.warnings
 
 
-@LineAnalyser.on_line.connect
-def check_line_length(analyser, lineno, line):
-    if len(line.rstrip()) > 79:
-        analyser.emit(
-            LineTooLong,
-            u'Line is longer than 79 characters. '
-            u'You should keep it below that',
-        )
+def iter_matching_lines(regex, text):
+    """
+    Yields the line number and the line, including the line ending, in which
+    each match of `regex` in the given `text` ends. The regular expression is
+    expected to match at most once per line.
+    """
+    lineno = 1
+    position = 0
+    for match in regex.finditer(text):
+        start = text.rfind(u'\n', 0, match.end()) + 1
+        lineno += text.count(u'\n', position, start)
+        position = start
+        end = text.find(u'\n', match.end())
+        end = len(text) if end == -1 else end + 1
+        yield lineno, text[start:end]
+
+
+# Matches the beginning of lines with more than 79 characters, including the
+# newline preceding them. Matching at the start of each line instead, would
+# prevent the regular expression engine from skipping ahead to the next
+# newline. Trailing whitespace is counted, so a line with a match is not
+# necessarily too long.
+_long_line_re = re.compile(u'\n[^\n]{80}')
+
+
+@LineAnalyser.on_text.connect
+@emits(LineTooLong)
+def check_line_length(analyser, text):
+    # The first line is not preceded by a newline, so we have to look at it
+    # separately.
+    first_line_end = text.find(u'\n')
+    if first_line_end == -1:
+        first_line_end = len(text)
+    long_lines = iter_matching_lines(_long_line_re, text)
+    if first_line_end >= 80:
+        long_lines = chain([(1, text[:first_line_end + 1])], long_lines)
+    for lineno, line in long_lines:
+        if len(line.rstrip()) > 79:
+            analyser.emit(
+                LineTooLong,
+                u'Line is longer than 79 characters. '
+                u'You should keep it below that',
+                lineno, line
+            )
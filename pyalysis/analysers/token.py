@@ -8,40 +8,42 @@
 """
 from __future__ import absolute_import
 import token
-import tokenize
-from collections import namedtuple
-
-from blinker import Signal
 
 from pyalysis.warnings import (
-    WrongNumberOfIndentationSpaces, MixedTabsAndSpaces
+    WrongNumberOfIndentationSpaces, MixedTabsAndSpaces, TokenWarning
 )
+from pyalysis.source import Token
 from pyalysis.utils import Location
-from pyalysis.analysers.base import AnalyserBase
-from pyalysis._compat import PY2, with_metaclass
+from pyalysis.analysers.base import AnalyserBase, LazySignalsMeta, emits
+from pyalysis._compat import with_metaclass
 
 
-Token = namedtuple('Token', ['type', 'lexeme', 'start', 'end', 'logical_line'])
+#: A dictionary mapping token names to token types.
+TOKEN_TYPES = {
+    token_name: token_type for token_type, token_name in token.tok_name.items()
+}
 
 
-class TokenAnalyserMeta(type):
+class TokenAnalyserMeta(LazySignalsMeta):
     def __init__(self, name, bases, attributes):
-        type.__init__(self, name, bases, attributes)
-        for token_name in token.tok_name.values():
-            setattr(
-                self,
-                'on_' + token_name,
-                Signal("""
-                :class:`blinker.Signal` instance that will be emitted for each
-                {0} token in the module with the token (`tok`) as argument.
-                """)
-            )
+        LazySignalsMeta.__init__(self, name, bases, attributes)
+        #: A dictionary mapping token types to the corresponding signal.
+        self.token_signals = {}
+
+    def get_signal_key(self, name):
+        if name.startswith('on_') and name[3:] in TOKEN_TYPES:
+            return self.token_signals, TOKEN_TYPES[name[3:]]
 
 
 class TokenAnalyser(with_metaclass(TokenAnalyserMeta, AnalyserBase)):
     """
     Token-level analyser of Python source code.
+
+    For each token type there is a signal ``on_<name>``, that is sent for
+    each token of that type in the module with the token (`tok`) as argument.
     """
+    warning_class = TokenWarning
+
     def __init__(self, module):
         AnalyserBase.__init__(self, module)
 
@@ -58,40 +60,24 @@ class TokenAnalyser(with_metaclass(TokenAnalyserMeta, AnalyserBase)):
         """
         AnalyserBase.emit(self, warning_cls, message, tok.start, tok.end)
 
-    def _generate_tokens(self):
-        """
-        Generates tokens similar to :func:`tokenize.generate_tokens` but uses
-        namedtuples, see :class:`Token` and :class:`Location`.
-        """
-        # tokenize.generate_tokens in Python 3.x does not work with bytes so we
-        # have to use tokenize.tokenize instead which works exactly like
-        # tokenize.generate_tokens does.
-        if PY2:
-            generate_tokens = tokenize.generate_tokens
-        else:
-            generate_tokens = tokenize.tokenize
-        for tok in generate_tokens(self.module.readline):
-            type, lexeme, start, end, logical_line = tok
-            start = Location(*start)
-            end = Location(*end)
-            tok = Token(type, lexeme, start, end, logical_line)
-            yield tok
-
     def analyse(self):
         """
         Analyses the module passed to the instance and returns a list of
         :class:`pyalysis.warnings.TokenWarning` instances.
         """
-        self.on_analyse.send(self)
-        for tok in self._generate_tokens():
-            name = token.tok_name[tok.type]
-            signal_name = 'on_' + name
-            signal = getattr(self, signal_name)
-            signal.send(self, tok=tok)
+        for receiver in self.get_receivers(self.on_analyse):
+            receiver(self)
+        get_receivers = self.create_dispatch_table(self.token_signals).get
+        for tok in self.source.tokens:
+            receivers = get_receivers(tok.type)
+            if receivers is not None:
+                for receiver in receivers:
+                    receiver(self, tok=tok)
         return self.warnings
 
 
 @TokenAnalyser.on_analyse.connect
+@emits(WrongNumberOfIndentationSpaces)
 def analyse_indentation(analyser):
     indentation_stack = []
 
@@ -118,6 +104,7 @@ def analyse_indentation(analyser):
 
 
 @TokenAnalyser.on_NEWLINE.connect
+@emits(MixedTabsAndSpaces)
 def analyse_newline(analyser, tok):
     indentation = tok.logical_line[:-len(tok.logical_line.lstrip())]
     if u' ' in indentation and u'\t' in indentation:
@@ -128,3 +115,6 @@ def analyse_newline(analyser, tok):
             u'preferably spaces.',
             tok
         )
+
+
+__all__ = ['TokenAnalyser', 'Token', 'Location']
@@ -8,17 +8,34 @@
 """
 import sys
 import codecs
+import multiprocessing
 
 from pyalysis.analysers import (
     LineAnalyser, TokenAnalyser, CSTAnalyser, ASTAnalyser
 )
 from pyalysis.formatters import TextFormatter
 from pyalysis.ignore import load_ignore_filter
+from pyalysis.ignore.compiler import compile
+from pyalysis.source import Source
+from pyalysis.results import merge_results
+from pyalysis.cache import ResultCache
+from pyalysis.profiling import Profile, measure
+from pyalysis.vcs import touches
 from pyalysis._compat import stdout, stderr
 
 
+#: The number of files handed to a worker process at once, if files are
+#: analysed in parallel.
+CHUNKSIZE = 8
+
+
+class _WarningLimitReached(Exception):
+    pass
+
+
 class Pyalysis(object):
-    def __init__(self):
+    def __init__(self, jobs=1, cache_directory=None, max_warnings=None,
+                 profile=None):
         self.analyser_classes = [
             LineAnalyser, TokenAnalyser, CSTAnalyser, ASTAnalyser
         ]
@@ -27,38 +44,335 @@ class Pyalysis(object):
         self.output = stdout
         self.warned = False
 
+        #: The number of processes used to analyse files.
+        self.jobs = jobs
+
+        #: The directory in which the results for each file are cached or
+        #: `None`, if results should not be cached.
+        self.cache_directory = cache_directory
+
+        #: The maximum number of warnings reported for a single file or
+        #: `None`, if all warnings should be reported.
+        self.max_warnings = max_warnings
+
+        #: A :class:`pyalysis.profiling.Profile` collecting timings of the
+        #: analysis or `None`.
+        self.profile = profile
+
+        #: A dictionary mapping file paths to a list of tuples with the first
+        #: and last line of ranges of lines, as returned by
+        #: :func:`pyalysis.vcs.get_changed_lines`, or `None`. If given, only
+        #: warnings touching those lines are reported.
+        self.changed_lines = None
+
         self._should_emit = None
+        self._active_analyser_classes = None
+        self._cache = None
+        self._formatter = None
 
     @property
     def should_emit(self):
         if self._should_emit is None:
-            try:
-                with codecs.open(
-                    self.ignore_file_path, 'r', encoding='utf-8'
-                ) as ignore_file:
-                    self._should_emit, warnings = load_ignore_filter(
-                        ignore_file
-                    )
-            except IOError:
-                self._should_emit = lambda _: True
-            else:
-                formatter = TextFormatter(stderr)
-                for warning in warnings:
-                    formatter.format(warning)
+            self._should_emit, warnings = self.load_ignore_filter()
+            formatter = TextFormatter(stderr)
+            formatter.begin()
+            for warning in warnings:
+                formatter.format(warning)
+            formatter.end()
         return self._should_emit
 
+    def load_ignore_filter(self):
+        """
+        Returns the ignore filter loaded from :attr:`ignore_file_path` and a
+        list of warnings about the ignore file.
+        """
+        try:
+            with codecs.open(
+                self.ignore_file_path, 'r', encoding='utf-8'
+            ) as ignore_file:
+                return load_ignore_filter(ignore_file)
+        except IOError:
+            return compile([]), []
+
+    @property
+    def active_analyser_classes(self):
+        """
+        A list of those :attr:`analyser_classes` that can emit warnings, which
+        are not ignored. Analysers without any receivers connected to their
+        signals, whose receivers emit only ignored warnings or whose warnings
+        are all ignored are left out, so that they are never instantiated.
+        """
+        if self._active_analyser_classes is None:
+            self._active_analyser_classes = [
+                analyser_class for analyser_class in self.analyser_classes
+                if self._is_active(analyser_class)
+            ]
+        return self._active_analyser_classes
+
+    def _is_active(self, analyser_class):
+        ignores = self.should_emit.ignores
+        if not analyser_class.has_receivers(ignores):
+            return False
+        warning_classes = analyser_class.get_warning_classes()
+        # If we don't know which warnings an analyser emits, we have to assume
+        # that it emits something that isn't ignored.
+        return not warning_classes or not all(map(ignores, warning_classes))
+
+    @property
+    def cache(self):
+        """
+        The :class:`pyalysis.cache.ResultCache` used or `None`, if
+        :attr:`cache_directory` is `None`.
+        """
+        if self._cache is None and self.cache_directory is not None:
+            self._cache = ResultCache(
+                self.cache_directory, self.active_analyser_classes,
+                self.should_emit.ignores
+            )
+        return self._cache
+
+    def reset(self):
+        """
+        Discards the ignore filter, the :attr:`active_analyser_classes` and
+        the :attr:`cache`, so that they are created again when needed, for
+        example after the ignore file has changed.
+
+        The :attr:`formatter` is kept, so that warnings can still be reported
+        to it.
+        """
+        self._should_emit = None
+        self._active_analyser_classes = None
+        self._cache = None
+
+    def get_warnings(self, file_path):
+        """
+        Returns a list of the warnings found in the file at the given
+        `file_path`, that would be reported. At most :attr:`max_warnings`
+        warnings are returned.
+        """
+        warnings = []
+        self.check_file(file_path, warnings.append)
+        return warnings
+
+    def check_file(self, file_path, sink):
+        """
+        Analyses the file at the given `file_path` and calls `sink` with each
+        warning, that passes the ignore filter and touches the
+        :attr:`changed_lines`, as soon as it is found.
+
+        Unless results are cached, warnings are not collected, so the memory
+        needed doesn't grow with the number of warnings. Analysis of the file
+        stops, once another warning is found after :attr:`max_warnings`
+        warnings have been passed to the `sink`. Returns `True`, if the file
+        has been analysed completely.
+        """
+        profile = self.profile
+        with measure(profile, file_path, 'read'):
+            with open(file_path, 'rb') as file:
+                bytes = file.read()
+        emit = self._filter(sink)
+        cache = self.cache
+        if cache is not None:
+            key = cache.get_key(bytes)
+            warnings = cache.get(key, file_path)
+            if warnings is not None:
+                try:
+                    for warning in warnings:
+                        emit(warning)
+                except _WarningLimitReached:
+                    return False
+                return True
+            # The cache stores all warnings, that are not ignored entirely,
+            # regardless of the rest of the ignore filter.
+            found = []
+            emit = self._collect(found, emit)
+        with measure(profile, file_path, 'tokenize'):
+            source = Source(file_path, bytes)
+        # Warnings of classes that are ignored entirely are never created,
+        # only the remaining ones have to pass the ignore filter.
+        ignores = self.should_emit.ignores
+        try:
+            for analyser_class in self.active_analyser_classes:
+                with measure(profile, file_path, 'parse'):
+                    analyser = analyser_class(source)
+                analyser.sink = emit
+                analyser.ignores = ignores
+                analyser.profile = profile
+                with measure(profile, file_path, 'dispatch'):
+                    analyser.analyse()
+        except _WarningLimitReached:
+            # We have not found all warnings, so there is nothing we could
+            # cache.
+            return False
+        if cache is not None:
+            cache.set(key, found)
+        return True
+
+    def _collect(self, warnings, sink):
+        def collecting_sink(warning):
+            warnings.append(warning)
+            sink(warning)
+        return collecting_sink
+
+    def _filter(self, sink):
+        should_emit = self.should_emit
+        max_warnings = self.max_warnings
+        changed_lines = self.changed_lines
+        # Python 2.x has no nonlocal
+        count = [0]
+
+        def limited_sink(warning):
+            if should_emit(warning) and (
+                changed_lines is None or
+                touches(warning, changed_lines.get(warning.file, []))
+            ):
+                # Files with exactly max_warnings warnings are complete.
+                if max_warnings is not None and count[0] >= max_warnings:
+                    raise _WarningLimitReached()
+                sink(warning)
+                count[0] += 1
+        return limited_sink
+
+    @property
+    def formatter(self):
+        """
+        The instance of :attr:`formatter_class` writing to :attr:`output`,
+        which is used to report all warnings.
+        """
+        if self._formatter is None:
+            self._formatter = self.formatter_class(self.output)
+        return self._formatter
+
+    def create_reporter(self):
+        """
+        Returns a function, that formats the warning it is called with.
+        """
+        formatter = self.formatter
+        profile = self.profile
+
+        def report(warning):
+            self.warned = True
+            with measure(profile, warning.file, 'format'):
+                formatter.format(warning)
+        return report
+
+    def report(self, warnings):
+        """
+        Formats the given `warnings`.
+        """
+        report = self.create_reporter()
+        for warning in warnings:
+            report(warning)
+
+    def report_limit_reached(self, file_path):
+        # The warnings found so far should appear before the message.
+        self.formatter.flush()
+        stderr.write(
+            u'{}: Stopped after {} warnings.\n'.format(
+                file_path, self.max_warnings
+            )
+        )
+
     def analyse_file(self, file_path):
-        formatter = self.formatter_class(self.output)
-        with open(file_path, 'rb') as file:
-            for analyser_class in self.analyser_classes:
-                analyser = analyser_class(file)
-                for warning in filter(self.should_emit, analyser.analyse()):
-                    self.warned = True
-                    formatter.format(warning)
-                file.seek(0)
+        # Warnings are reported as they are found, instead of collecting them
+        # first.
+        if not self.check_file(file_path, self.create_reporter()):
+            self.report_limit_reached(file_path)
 
     def analyse(self, files):
-        for file in files:
-            self.analyse_file(file)
+        formatter = self.formatter
+        formatter.begin()
+        try:
+            if self.jobs > 1:
+                self._analyse_parallel(files)
+            else:
+                for file in files:
+                    self.analyse_file(file)
+        finally:
+            formatter.end()
         if self.warned:
             sys.exit(1)
+
+    def merge(self, result_paths):
+        """
+        Reports the warnings in the result files at the given `result_paths`,
+        as written by :class:`pyalysis.formatters.BinaryFormatter`, for
+        example by several runs analysing different shards of the same files,
+        in the order in which a single run would have reported them.
+
+        Like :meth:`analyse` this exits, if there are any warnings. Raises
+        :exc:`pyalysis.results.ResultFormatError`, if a file is not a valid
+        result file.
+        """
+        formatter = self.formatter
+        formatter.begin()
+        result_files = []
+        try:
+            for result_path in result_paths:
+                result_files.append(open(result_path, 'rb'))
+            self.report(merge_results(result_files))
+        finally:
+            for result_file in result_files:
+                result_file.close()
+            formatter.end()
+        if self.warned:
+            sys.exit(1)
+
+    def _analyse_parallel(self, files):
+        # The active analysers are determined in the parent, this loads the
+        # ignore filter and ensures that warnings about the ignore file are
+        # only reported once and before anything else.
+        pool = multiprocessing.Pool(
+            self.jobs, _initialize_worker,
+            (
+                self.active_analyser_classes, self.cache_directory,
+                self.max_warnings, self.profile is not None,
+                self.changed_lines
+            )
+        )
+        try:
+            # imap returns the results in the order of `files`, the output is
+            # therefore the same as if the files were analysed serially.
+            results = pool.imap(_check_file, files, CHUNKSIZE)
+            for file_path, warnings, complete, profile in results:
+                if profile is not None:
+                    self.profile.merge(profile)
+                self.report(warnings)
+                if not complete:
+                    self.report_limit_reached(file_path)
+        finally:
+            # Once all results have been received the workers are idle, so
+            # terminating them is safe and also covers the error case.
+            pool.terminate()
+            pool.join()
+
+
+#: The state of a worker process, set by :func:`_initialize_worker`.
+_worker_state = {}
+
+
+def _initialize_worker(active_analyser_classes, cache_directory,
+                       max_warnings, profile, changed_lines):
+    worker = Pyalysis(
+        cache_directory=cache_directory, max_warnings=max_warnings
+    )
+    worker.changed_lines = changed_lines
+    worker.analyser_classes = active_analyser_classes
+    worker._active_analyser_classes = active_analyser_classes
+    # Warnings are filtered in the worker, so that only those that are
+    # reported count towards the limit. The parent already reported any
+    # warnings about the ignore file.
+    worker._should_emit, _ = worker.load_ignore_filter()
+    _worker_state['pyalysis'] = worker
+    _worker_state['profile'] = profile
+
+
+def _check_file(file_path):
+    worker = _worker_state['pyalysis']
+    if _worker_state['profile']:
+        # Each file gets a new profile, which is merged into the profile of
+        # the parent together with the results.
+        worker.profile = Profile()
+    warnings = []
+    complete = worker.check_file(file_path, warnings.append)
+    return file_path, warnings, complete, worker.profile
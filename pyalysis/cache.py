@@ -0,0 +1,167 @@
+# coding: utf-8
+"""
+    pyalysis.cache
+    ~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import os
+import sys
+import json
+import errno
+import types
+import codecs
+import hashlib
+import tempfile
+
+from pyalysis import __version__
+from pyalysis.warnings import WARNINGS
+from pyalysis.profiling import get_check_name
+from pyalysis.utils import Location, iter_signals, iter_receivers
+
+
+class ResultCache(object):
+    """
+    Stores the warnings found in modules on disk in the given `directory`.
+
+    Entries are keyed by a hash of the contents of a module, the Pyalysis and
+    Python version, the checks connected to the signals of the given
+    `analyser_classes` as well as the warning classes ignored entirely
+    according to `ignores`, which are not emitted and therefore not stored.
+    Changing any of these invalidates the cache.
+    """
+    def __init__(self, directory, analyser_classes, ignores=None):
+        self.directory = directory
+        self.fingerprint = get_fingerprint(analyser_classes, ignores)
+
+    def get_key(self, bytes):
+        """
+        Returns the key under which the warnings for a module with the given
+        contents are stored.
+        """
+        hash = hashlib.sha1(self.fingerprint)
+        hash.update(bytes)
+        return hash.hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:] + '.json')
+
+    def get(self, key, file_path):
+        """
+        Returns the list of warnings stored under `key` as they would be
+        produced for the module at `file_path` or `None`, if there is no such
+        entry.
+        """
+        try:
+            with codecs.open(
+                self.get_path(key), 'r', encoding='utf-8'
+            ) as entry_file:
+                entries = json.load(entry_file)
+            return [
+                WARNINGS[entry['type']](
+                    entry['message'], file_path,
+                    Location(*entry['start']), Location(*entry['end']),
+                    entry['lines']
+                )
+                for entry in entries
+            ]
+        except (IOError, ValueError, KeyError, TypeError):
+            return None
+
+    def set(self, key, warnings):
+        """
+        Stores `warnings` under `key`. Nothing is stored if a warning has no
+        type, as it could not be restored later.
+        """
+        if not all(hasattr(warning, 'type') for warning in warnings):
+            return
+        entries = [
+            {
+                'type': warning.type,
+                'message': warning.message,
+                'start': warning.start,
+                'end': warning.end,
+                'lines': warning.lines
+            }
+            for warning in warnings
+        ]
+        path = self.get_path(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+        # Entries are written to a temporary file first and renamed, so that
+        # concurrent writers or interrupted runs never leave a partial entry
+        # behind.
+        entry_file = tempfile.NamedTemporaryFile(
+            'wb', dir=directory, delete=False
+        )
+        with entry_file:
+            entry_file.write(
+                json.dumps(entries, ensure_ascii=False).encode('utf-8')
+            )
+        try:
+            os.rename(entry_file.name, path)
+        except OSError:
+            os.remove(entry_file.name)
+
+
+def get_fingerprint(analyser_classes, ignores=None):
+    """
+    Returns a byte string identifying the Pyalysis and Python version, the
+    checks connected to the signals of the given `analyser_classes` and the
+    warning classes of those for which `ignores` returns `True`.
+    """
+    hash = hashlib.sha1()
+    hash.update(__version__.encode('utf-8'))
+    hash.update(repr(sys.version_info[:2]).encode('utf-8'))
+    for analyser_class in analyser_classes:
+        hash.update(get_check_name(analyser_class).encode('utf-8'))
+        for name, signal in iter_signals(analyser_class):
+            receivers = sorted(
+                get_check_name(receiver).encode('utf-8') + _get_code(receiver)
+                for receiver in iter_receivers(signal)
+            )
+            if receivers:
+                hash.update(name.encode('utf-8'))
+                for receiver in receivers:
+                    hash.update(receiver)
+        if ignores is not None:
+            for warning_type in sorted(
+                warning_class.type
+                for warning_class in analyser_class.get_warning_classes()
+                if ignores(warning_class)
+            ):
+                hash.update(warning_type.encode('utf-8'))
+    return hash.hexdigest().encode('ascii')
+
+
+def _get_code(function):
+    code = getattr(function, '__code__', None)
+    if code is None:
+        return b''
+    return _encode_code(code)
+
+
+def _encode_code(code):
+    # Changing a constant, like a limit or a message, or a name leaves the
+    # bytecode itself unchanged.
+    return b''.join(
+        [code.co_code, repr(code.co_names).encode('utf-8')] +
+        [_encode_constant(constant) for constant in code.co_consts]
+    )
+
+
+def _encode_constant(constant):
+    if isinstance(constant, types.CodeType):
+        # The repr of code objects includes their address.
+        return _encode_code(constant)
+    elif isinstance(constant, tuple):
+        return b'(' + b','.join(map(_encode_constant, constant)) + b')'
+    elif isinstance(constant, frozenset):
+        # The order of sets may change between processes.
+        return b'{' + b','.join(sorted(map(_encode_constant, constant))) + b'}'
+    return repr(constant).encode('utf-8')
@@ -0,0 +1,299 @@
+# coding: utf-8
+"""
+    pyalysis.discovery
+    ~~~~~~~~~~~~~~~~~~
+
+    Finds the Python modules within directories, skipping directories that
+    should not be analysed like version control metadata, virtualenvs, build
+    output and anything ignored in ``.gitignore`` files.
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import os
+import re
+import heapq
+import codecs
+
+from pyalysis._compat import scandir
+
+
+#: Patterns of files and directories, that are excluded by default.
+DEFAULT_EXCLUDES = [
+    '.git/', '.hg/', '.svn/', '.bzr/', '.tox/', '.nox/', '.eggs/',
+    '*.egg-info/', '__pycache__/', 'node_modules/', '.pyalysis_cache/',
+    '/build/', '/dist/'
+]
+
+
+def translate(pattern):
+    """
+    Translates the given ``.gitignore``-style glob `pattern` into a regular
+    expression.
+    """
+    parts = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and pattern.find(']', i + 2) != -1:
+            end = pattern.find(']', i + 2)
+            characters = pattern[i + 1:end]
+            if characters.startswith('!'):
+                characters = '^' + characters[1:]
+            parts.append('[' + characters.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < n:
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return '(?:{})\\Z'.format(''.join(parts))
+
+
+class Pattern(object):
+    """
+    A ``.gitignore``-style pattern, that matches paths within the directory
+    `base`.
+
+    Patterns without a slash match the name of a file or directory anywhere
+    within `base`, other patterns match the path relative to `base`. A
+    trailing slash restricts a pattern to directories and a leading ``!``
+    negates it, including paths excluded by previous patterns again.
+    """
+    def __init__(self, pattern, base):
+        self.pattern = pattern
+        self.base = base
+        self.negated = pattern.startswith('!')
+        if self.negated:
+            pattern = pattern[1:]
+        self.directory_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        self.anchored = '/' in pattern
+        self.regex = re.compile(translate(pattern.lstrip('/')))
+
+    def matches(self, path, is_directory):
+        """
+        Returns `True`, if the given absolute `path` matches this pattern.
+        """
+        if self.directory_only and not is_directory:
+            return False
+        if not self.anchored:
+            return self.regex.match(os.path.basename(path)) is not None
+        prefix = self.base.rstrip(os.sep) + os.sep
+        if not path.startswith(prefix):
+            return False
+        relative_path = path[len(prefix):]
+        if os.sep != '/':
+            relative_path = relative_path.replace(os.sep, '/')
+        return self.regex.match(relative_path) is not None
+
+    def __repr__(self):
+        return '{}({!r}, {!r})'.format(
+            self.__class__.__name__, self.pattern, self.base
+        )
+
+
+def is_excluded(patterns, path, is_directory):
+    """
+    Returns `True`, if the absolute `path` is excluded by the given
+    `patterns`. Later patterns take precedence over earlier ones.
+    """
+    excluded = False
+    for pattern in patterns:
+        if pattern.negated == excluded and pattern.matches(path, is_directory):
+            excluded = not excluded
+    return excluded
+
+
+def load_gitignore(path, base):
+    """
+    Returns a list of the patterns in the ``.gitignore`` file at `path`,
+    which apply within the directory `base`.
+    """
+    patterns = []
+    try:
+        with codecs.open(path, 'r', encoding='utf-8') as gitignore:
+            for line in gitignore:
+                line = line.rstrip('\r\n')
+                if not line.endswith('\\ '):
+                    line = line.rstrip(' ')
+                if line and not line.startswith('#'):
+                    patterns.append(Pattern(line, base))
+    except (IOError, UnicodeDecodeError):
+        pass
+    return patterns
+
+
+def load_parent_gitignores(directory):
+    """
+    Returns a list of the patterns in the ``.gitignore`` files of the
+    repository containing the absolute `directory`, that apply to it but are
+    not in the `directory` itself.
+    """
+    gitignores = []
+    parent = os.path.dirname(directory)
+    while True:
+        if os.path.exists(os.path.join(directory, '.git')):
+            break
+        if parent == directory:
+            # We are not within a repository, gitignores found in any
+            # directories above don't apply.
+            return []
+        gitignores.append(os.path.join(parent, '.gitignore'))
+        directory, parent = parent, os.path.dirname(parent)
+    patterns = []
+    for gitignore in reversed(gitignores):
+        if os.path.isfile(gitignore):
+            patterns.extend(
+                load_gitignore(gitignore, os.path.dirname(gitignore))
+            )
+    return patterns
+
+
+class Finder(object):
+    """
+    Finds the Python modules within directories, skipping files and
+    directories matching one of the `excludes` patterns and, if
+    `use_gitignore` is `True`, those ignored by ``.gitignore`` files.
+
+    Virtualenvs are always skipped. Symbolic links are followed, but every
+    directory is only visited once.
+    """
+    def __init__(self, excludes=DEFAULT_EXCLUDES, use_gitignore=True):
+        base = os.path.abspath(os.curdir)
+        self.excludes = [Pattern(pattern, base) for pattern in excludes]
+        self.use_gitignore = use_gitignore
+
+    def find(self, paths):
+        """
+        Yields the paths of the Python modules within `paths`, as they are
+        found. Files in `paths` are yielded as they are, even if they would be
+        excluded. Every file is yielded only once, even if `paths` overlap.
+        """
+        for path, is_directory in self.walk(paths):
+            if not is_directory:
+                yield path
+
+    def walk(self, paths):
+        """
+        Like :meth:`find` but also yields the paths of the directories
+        visited. Yields tuples of a path and whether it's a directory.
+        """
+        seen_files = set()
+        seen_directories = set()
+        for path in paths:
+            if os.path.isdir(path):
+                for result in self._walk_directory(
+                    path, seen_files, seen_directories
+                ):
+                    yield result
+            else:
+                absolute_path = os.path.abspath(path)
+                if absolute_path not in seen_files:
+                    seen_files.add(absolute_path)
+                    yield path, False
+
+    def _walk_directory(self, root, seen_files, seen_directories):
+        absolute_root = os.path.abspath(root)
+        patterns = list(self.excludes)
+        if self.use_gitignore:
+            patterns.extend(load_parent_gitignores(absolute_root))
+        stack = [(root, absolute_root, patterns)]
+        while stack:
+            path, absolute_path, patterns = stack.pop()
+            try:
+                stat = os.stat(path)
+                entries = sorted(scandir(path), key=lambda entry: entry.name)
+            except OSError:
+                continue
+            # Symbolic links may point to directories we have already seen
+            # or create loops.
+            key = stat.st_dev, stat.st_ino
+            if key in seen_directories:
+                continue
+            seen_directories.add(key)
+            names = set(entry.name for entry in entries)
+            if path != root and 'pyvenv.cfg' in names:
+                # Virtualenvs can be detected but not excluded by a pattern.
+                continue
+            if self.use_gitignore and '.gitignore' in names:
+                patterns = patterns + load_gitignore(
+                    os.path.join(path, '.gitignore'), absolute_path
+                )
+            yield path, True
+            directories = []
+            for entry in entries:
+                absolute_entry_path = os.path.join(absolute_path, entry.name)
+                try:
+                    is_directory = entry.is_dir()
+                    is_module = (
+                        not is_directory and entry.name.endswith('.py') and
+                        entry.is_file()
+                    )
+                except OSError:
+                    continue
+                if not (is_directory or is_module) or is_excluded(
+                    patterns, absolute_entry_path, is_directory
+                ):
+                    continue
+                if is_directory:
+                    directories.append(
+                        (entry.path, absolute_entry_path, patterns)
+                    )
+                elif absolute_entry_path not in seen_files:
+                    seen_files.add(absolute_entry_path)
+                    yield entry.path, False
+            # Directories are visited in order, after the files in their
+            # parent.
+            stack.extend(reversed(directories))
+
+
+def find_files(paths, excludes=DEFAULT_EXCLUDES, use_gitignore=True):
+    """
+    Yields the Python modules within `paths`. See :class:`Finder`.
+    """
+    return Finder(excludes, use_gitignore).find(paths)
+
+
+def partition(paths, count):
+    """
+    Partitions the files at the given `paths` into `count` lists, whose
+    files have roughly the same total size, and returns a list of those.
+
+    The partition only depends on the paths and sizes of the files, not on
+    the order of `paths`, so that processes on different machines, that
+    find the same files, arrive at the same partition. Within each list the
+    files are in the order in which they appear in `paths`.
+    """
+    paths = list(paths)
+    sizes = {}
+    for path in paths:
+        try:
+            sizes[path] = os.path.getsize(path)
+        except OSError:
+            sizes[path] = 0
+    # Each file is added to the list with the smallest total size so far,
+    # starting with the largest file.
+    totals = [(0, index) for index in range(count)]
+    indices = {}
+    for path in sorted(paths, key=lambda path: (-sizes[path], path)):
+        total, index = heapq.heappop(totals)
+        indices[path] = index
+        heapq.heappush(totals, (total + sizes[path], index))
+    partitions = [[] for _ in range(count)]
+    for path in paths:
+        partitions[indices[path]].append(path)
+    return partitions
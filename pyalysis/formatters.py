@@ -6,21 +6,109 @@
     :copyright: 2014 by Daniel Neuhäuser and Contributors
     :license: BSD, see LICENSE.rst for details
 """
+import os
+import re
 import json
 import textwrap
+try:
+    from urllib.parse import quote
+except ImportError:  # Python 2
+    from urllib import quote
 
+from pyalysis.warnings import WARNINGS, Warning, AbstractWarning
+from pyalysis.results import HEADER, ResultEncoder
 from pyalysis.utils import count_digits
 from pyalysis._compat import PYPY, text_type
 
 
-class JSONFormatter(object):
+#: The templates used by :class:`TextFormatter` for warnings with and without
+#: lines.
+TEXT_TEMPLATE_WITH_LINES = textwrap.dedent(u"""\
+    File "{file}", {location}
+    {lines}
+    {message}
+
+""")
+TEXT_TEMPLATE = textwrap.dedent(u"""\
+    File "{file}", {location}
+    {message}
+
+""")
+
+
+class Formatter(object):
+    """
+    Base class for formatters, that write formatted warnings to the file-like
+    `output`.
+
+    A formatter is used for an entire run, :meth:`begin` is called before the
+    first warning is formatted, :meth:`format` for each warning and
+    :meth:`end` after the last one. The formatted warnings are collected and
+    written to `output` in large chunks, once :attr:`buffer_size` characters
+    are buffered or :meth:`flush` is called.
+    """
+    #: The number of characters, that are buffered before they are written.
+    buffer_size = 64 * 1024
+
+    #: `True`, if the formatter writes bytes instead of text to
+    #: :attr:`output`.
+    binary = False
+
+    def __init__(self, output):
+        self.output = output
+
+        self._buffer = []
+        self._buffered = 0
+
+    def begin(self):
+        """
+        Called once before the first warning is formatted.
+        """
+
+    def format(self, warning):
+        """
+        Formats a single `warning`.
+        """
+        raise NotImplementedError()
+
+    def write(self, string):
+        """
+        Buffers `string` to be written to :attr:`output`.
+        """
+        self._buffer.append(string)
+        self._buffered += len(string)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes everything buffered to :attr:`output` and flushes it.
+        """
+        if self._buffer:
+            self.output.write(
+                (b'' if self.binary else u'').join(self._buffer)
+            )
+            del self._buffer[:]
+            self._buffered = 0
+        flush = getattr(self.output, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def end(self):
+        """
+        Called once after the last warning has been formatted.
+        """
+        self.flush()
+
+
+class JSONFormatter(Formatter):
     """
     Formats warnings as JSON objects, each warning will be represented as an
     individual JSON object, objects will be separated by newlines in the given
     file-like `output`.
     """
-    def __init__(self, output):
-        self.output = output
+    #: Keyword arguments passed to :func:`json.dumps`.
+    dumps_options = {'ensure_ascii': False, 'sort_keys': True, 'indent': 4}
 
     def format(self, warning):
         """
@@ -32,21 +120,34 @@ class JSONFormatter(object):
         })
 
     def dump(self, d):
-        js = json.dumps(d, ensure_ascii=False, sort_keys=True, indent=4)
+        js = json.dumps(d, **self.dumps_options)
         if PYPY:
             # PyPy seems to have a bug that makes json.dumps produce bytes,
             # even if ensure_ascii=True is passed.
             js = js.decode('utf-8')
-        self.output.write(js)
-        self.output.write(u'\n')
+        self.write(js + u'\n')
+
+
+class JSONLinesFormatter(JSONFormatter):
+    """
+    Like :class:`JSONFormatter` but formats each warning as a compact JSON
+    object on a single line, as described by http://jsonlines.org.
+    """
+    dumps_options = {
+        'ensure_ascii': False, 'sort_keys': True, 'separators': (',', ':')
+    }
 
 
-class TextFormatter(object):
+class TextFormatter(Formatter):
     """
     Formats warnings as human readable text.
     """
     def __init__(self, output):
-        self.output = output
+        Formatter.__init__(self, output)
+
+        # Most warnings share their message with many others, wrapping is
+        # done only once for each message.
+        self._filled_messages = {}
 
     def format(self, warning):
         """
@@ -64,19 +165,10 @@ class TextFormatter(object):
             location = u'line {}'.format(warning.lineno)
         if hasattr(warning, 'lines'):
             lines = warning.lines
-            template = textwrap.dedent(u"""\
-                File "{file}", {location}
-                {lines}
-                {message}
-
-            """)
+            template = TEXT_TEMPLATE_WITH_LINES
         else:
             lines = []
-            template = textwrap.dedent(u"""\
-                File "{file}", {location}
-                {message}
-
-            """)
+            template = TEXT_TEMPLATE
         if len(lines) > 1:
             lineno_length = count_digits(warning.end.line)
             lines_with_lineno = []
@@ -90,11 +182,294 @@ class TextFormatter(object):
             lines = lines_with_lineno
         else:
             lines = [u' ' * 2 + line for line in lines]
-        self.output.write(
+        self.write(
             template.format(
                 file=warning.file,
                 location=location,
                 lines=u'\n'.join(lines),
-                message=textwrap.fill(warning.message)
+                message=self.fill(warning.message)
+            )
+        )
+
+    def fill(self, message):
+        """
+        Returns the given `message` wrapped with :func:`textwrap.fill`.
+        """
+        try:
+            return self._filled_messages[message]
+        except KeyError:
+            filled = textwrap.fill(message)
+            if len(self._filled_messages) < 1024:
+                self._filled_messages[message] = filled
+            return filled
+
+
+def get_rules():
+    """
+    Returns a list of tuples with the type of each concrete warning class in
+    :data:`pyalysis.warnings.WARNINGS`, the class and a sorted list of the
+    types of the abstract warnings it belongs to, ordered by type.
+    """
+    # Concrete warnings registered with an abstract warning are subclasses
+    # of AbstractWarning as well.
+    abstract_warnings = [
+        warning_cls for warning_cls in WARNINGS.values()
+        if issubclass(warning_cls, AbstractWarning) and
+        not issubclass(warning_cls, Warning)
+    ]
+    return [
+        (
+            warning_type, warning_cls,
+            sorted(
+                abstract_warning.type for abstract_warning in abstract_warnings
+                if issubclass(warning_cls, abstract_warning)
+            )
+        )
+        for warning_type, warning_cls in sorted(WARNINGS.items())
+        if issubclass(warning_cls, Warning)
+    ]
+
+
+def get_uri(path):
+    """
+    Returns a URI reference for the file at `path`, which is relative, if
+    `path` is.
+    """
+    if os.sep != '/':
+        path = path.replace(os.sep, '/')
+    uri = quote(path.encode('utf-8'))
+    if os.path.isabs(path):
+        return u'file://' + (u'' if uri.startswith(u'/') else u'/') + uri
+    return uri
+
+
+class SARIFFormatter(Formatter):
+    """
+    Formats warnings as a SARIF 2.1.0 log, as consumed by code review and CI
+    tools.
+
+    The log is written as warnings are formatted, only the metadata of each
+    type of warning is written once at the beginning.
+    """
+    #: The URI of the SARIF schema.
+    schema = u'https://json.schemastore.org/sarif-2.1.0.json'
+
+    def __init__(self, output):
+        Formatter.__init__(self, output)
+
+        self._rule_indices = {}
+        self._first_result = True
+
+    def begin(self):
+        from pyalysis import __version__
+        rules = []
+        for index, (warning_type, warning_cls, tags) in enumerate(
+            get_rules()
+        ):
+            self._rule_indices[warning_type] = index
+            rule = {'id': warning_type, 'name': warning_cls.__name__}
+            if tags:
+                rule['properties'] = {'tags': tags}
+            rules.append(rule)
+        tool = {
+            'driver': {
+                'name': u'Pyalysis',
+                'version': __version__,
+                'informationUri': u'https://github.com/DasIch/Pyalysis',
+                'rules': rules
+            }
+        }
+        # Everything but the results is written upfront, the results are
+        # written into the array that is left open.
+        self.write(
+            u'{{"$schema":{},"version":"2.1.0","runs":[{{"tool":{},'
+            u'"columnKind":"unicodeCodePoints","results":['.format(
+                self.dumps(self.schema), self.dumps(tool)
+            )
+        )
+
+    def format(self, warning):
+        """
+        Formats a single `warning`.
+        """
+        warning_type = getattr(warning, 'type', None)
+        result = {
+            'level': 'warning',
+            'message': {'text': warning.message}
+        }
+        if warning_type is not None:
+            result['ruleId'] = warning_type
+            if warning_type in self._rule_indices:
+                result['ruleIndex'] = self._rule_indices[warning_type]
+        physical_location = {
+            'artifactLocation': {'uri': get_uri(warning.file)}
+        }
+        if hasattr(warning, 'start') and hasattr(warning, 'end'):
+            # SARIF lines and columns start at 1.
+            physical_location['region'] = {
+                'startLine': warning.start.line,
+                'startColumn': warning.start.column + 1,
+                'endLine': warning.end.line,
+                'endColumn': warning.end.column + 1
+            }
+        result['locations'] = [{'physicalLocation': physical_location}]
+        if self._first_result:
+            self._first_result = False
+        else:
+            self.write(u',')
+        self.write(self.dumps(result))
+
+    def end(self):
+        self.write(u']}]}\n')
+        Formatter.end(self)
+
+    def dumps(self, obj):
+        js = json.dumps(
+            obj, ensure_ascii=False, sort_keys=True, separators=(',', ':')
+        )
+        if PYPY:
+            js = js.decode('utf-8')
+        return js
+
+
+#: Matches characters, that must not appear in XML documents.
+_invalid_xml_characters_re = re.compile(
+    u'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]'
+)
+
+
+# xml.sax.saxutils would provide these but imports urllib.request, which
+# noticeably slows down starting Pyalysis.
+def xml_text(string):
+    """
+    Returns `string` escaped for use as XML character data, characters XML
+    cannot represent at all are replaced with U+FFFD.
+    """
+    return _invalid_xml_characters_re.sub(u'\ufffd', string).replace(
+        u'&', u'&amp;'
+    ).replace(u'<', u'&lt;').replace(u'>', u'&gt;')
+
+
+def xml_attribute(string):
+    """
+    Returns `string` quoted and escaped for use as an XML attribute value.
+    """
+    return u'"{}"'.format(
+        xml_text(string).replace(u'"', u'&quot;').replace(
+            u'\n', u'&#10;'
+        ).replace(u'\r', u'&#13;').replace(u'\t', u'&#9;')
+    )
+
+
+class JUnitFormatter(Formatter):
+    """
+    Formats warnings as JUnit XML, as consumed by CI tools.
+
+    Every file is represented by a test suite with a failed test case for
+    each warning. Warnings are expected to be grouped by file, as Pyalysis
+    reports them. Only the warnings about the current file are kept in memory,
+    because the attributes of a test suite include the number of test cases.
+    """
+    def __init__(self, output):
+        Formatter.__init__(self, output)
+
+        self._file = None
+        self._test_cases = []
+
+    def begin(self):
+        self.write(
+            u'<?xml version="1.0" encoding="utf-8"?>\n'
+            u'<testsuites name="pyalysis">\n'
+        )
+
+    def format(self, warning):
+        """
+        Formats a single `warning`.
+        """
+        if warning.file != self._file:
+            self.write_test_suite()
+            self._file = warning.file
+        warning_type = getattr(warning, 'type', u'warning')
+        if hasattr(warning, 'start'):
+            location = u'{}:{}'.format(
+                warning.start.line, warning.start.column
+            )
+        else:
+            location = text_type(warning.lineno)
+        text = u'{}:{}: {}'.format(warning.file, location, warning.message)
+        lines = getattr(warning, 'lines', [])
+        if lines:
+            text += u'\n' + u'\n'.join(lines)
+        self._test_cases.append(
+            u'    <testcase classname={} name={}>\n'
+            u'      <failure type={} message={}>{}</failure>\n'
+            u'    </testcase>\n'.format(
+                xml_attribute(warning.file),
+                xml_attribute(u'{} ({})'.format(warning_type, location)),
+                xml_attribute(warning_type), xml_attribute(warning.message),
+                xml_text(text)
+            )
+        )
+
+    def write_test_suite(self):
+        """
+        Writes the test suite for the warnings about the current file.
+        """
+        if not self._test_cases:
+            return
+        self.write(
+            u'  <testsuite name={0} tests="{1}" failures="{1}">\n'.format(
+                xml_attribute(self._file), len(self._test_cases)
             )
         )
+        for test_case in self._test_cases:
+            self.write(test_case)
+        self.write(u'  </testsuite>\n')
+        del self._test_cases[:]
+
+    def end(self):
+        self.write_test_suite()
+        self.write(u'</testsuites>\n')
+        Formatter.end(self)
+
+
+class BinaryFormatter(Formatter):
+    """
+    Writes warnings in the binary format described in
+    :mod:`pyalysis.results`, which can be read with
+    :func:`pyalysis.results.read_results`. `output` has to be opened in
+    binary mode.
+    """
+    binary = True
+
+    def __init__(self, output):
+        Formatter.__init__(self, output)
+
+        #: A dictionary mapping file paths to their position among the files
+        #: of the entire run, if only some of them are analysed, see
+        #: :class:`pyalysis.results.ResultEncoder`.
+        self.positions = None
+
+        self._encoder = None
+
+    def begin(self):
+        self._encoder = ResultEncoder(self.positions)
+        self.write(HEADER)
+
+    def format(self, warning):
+        """
+        Formats a single `warning`.
+        """
+        self.write(self._encoder.encode(warning))
+
+
+#: A dictionary mapping the names of the formats, that can be chosen on the
+#: command line, to the corresponding formatter classes.
+FORMATTERS = {
+    'text': TextFormatter,
+    'json': JSONFormatter,
+    'jsonl': JSONLinesFormatter,
+    'sarif': SARIFFormatter,
+    'junit': JUnitFormatter,
+    'binary': BinaryFormatter
+}
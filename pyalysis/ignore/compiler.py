@@ -26,10 +26,71 @@ def compile(filters):
     Given a list of :class:`pyalysis.ignore.ast.Filter` instances as returned
     by :class:`pyalysis.ignore.verifier.verify`, returns a callable that called
     with a warning returns `True`, if the warning didn't match.
+
+    The callable is an :class:`IgnoreFilter` instance.
     """
     return Compiler(filters).compile()
 
 
+def allow(warning):
+    return True
+
+
+def ignore(warning):
+    return False
+
+
+class IgnoreFilter(object):
+    """
+    Calling an instance with a warning returns `True`, if the warning didn't
+    match any of the `filters`.
+
+    Only the first filter matching the type of a warning is relevant, so the
+    `predicates` of the filters are looked up by the class of the warning,
+    regardless of how many filters there are. `predicates` is a list of
+    the predicates of the `filters`, in the same order.
+    """
+    def __init__(self, filters, predicates):
+        self.filters = filters
+        self.predicates = predicates
+
+        #: A dictionary mapping warning classes to the predicate of the first
+        #: filter, that matches them. Classes are added as they are needed.
+        self.table = {}
+        for warning_cls in WARNINGS.values():
+            self.get_predicate(warning_cls)
+
+    def __call__(self, warning):
+        try:
+            predicate = self.table[warning.__class__]
+        except KeyError:
+            predicate = self.get_predicate(warning.__class__)
+        return predicate(warning)
+
+    def get_predicate(self, warning_cls):
+        """
+        Returns the predicate that decides, whether instances of
+        `warning_cls` are emitted.
+        """
+        try:
+            return self.table[warning_cls]
+        except KeyError:
+            predicate = allow
+            for filter, filter_predicate in zip(self.filters, self.predicates):
+                if issubclass(warning_cls, WARNINGS[filter.name]):
+                    predicate = filter_predicate
+                    break
+            self.table[warning_cls] = predicate
+            return predicate
+
+    def ignores(self, warning_cls):
+        """
+        Returns `True`, if all instances of `warning_cls` are filtered
+        regardless of their attributes.
+        """
+        return self.get_predicate(warning_cls) is ignore
+
+
 class Compiler(object):
     def __init__(self, filters):
         self.filters = filters
@@ -57,33 +118,33 @@ class Compiler(object):
         self.write_newline()
 
     def compile(self):
-        self.write_line(u'from pyalysis.warnings import WARNINGS')
-        self.write_line(u'def predicate(warning):')
-        with self.indented():
-            for filter in self.filters:
-                self.compile_filter(filter)
-            self.write_line(u'return True')
+        # Filters without expressions ignore every warning of their type and
+        # share a single predicate, which allows recognizing them. All other
+        # filters are compiled into a function each.
+        names = []
+        for i, filter in enumerate(self.filters):
+            if filter.expressions:
+                names.append(u'filter_{}'.format(i))
+                self.compile_filter(filter, names[-1])
+            else:
+                names.append(None)
         code = builtins.compile(self.source.getvalue(), '', 'exec')
         locals = {}
-        exec(code, {'WARNINGS': WARNINGS}, locals)
-        return locals['predicate']
+        exec(code, {}, locals)
+        return IgnoreFilter(self.filters, [
+            ignore if name is None else locals[name] for name in names
+        ])
 
-    def compile_filter(self, filter):
-        self.write_line(
-            u'if isinstance(warning, WARNINGS["{}"]):'.format(filter.name)
-        )
+    def compile_filter(self, filter, name):
+        self.write_line(u'def {}(warning):'.format(name))
         with self.indented():
             self.write_indentation()
-            self.write(u'return ')
-            if filter.expressions:
-                self.write(u'not (')
-                for expression in filter.expressions[:-1]:
-                    self.compile_expression(expression)
-                    self.write(u' or ')
-                self.compile_expression(filter.expressions[-1])
-                self.write(u')')
-            else:
-                self.write(u'False')
+            self.write(u'return not (')
+            for expression in filter.expressions[:-1]:
+                self.compile_expression(expression)
+                self.write(u' or ')
+            self.compile_expression(filter.expressions[-1])
+            self.write(u')')
             self.write_newline()
 
     def compile_expression(self, expression):
@@ -15,7 +15,7 @@ from pyalysis.ignore.tokens import (
 from pyalysis._compat import implements_iterator
 
 
-indentation_re = re.compile(r'\s+')
+indentation_re = re.compile(r'[ \t]+')
 
 
 TOKEN_DEFINITIONS = [
@@ -75,46 +75,60 @@ def lex(source):
 
 def _lex(source):
     indentation_stack = []
+    token = None
     for lineno, line in enumerate(source.splitlines(True), 1):
-        column = 0
-        token, lineno, column = lex_indentation(
-            lineno, column, line, indentation_stack
+        if not line.strip():
+            # Blank lines neither produce tokens nor change the indentation.
+            continue
+        indentation_tokens, column = lex_indentation(
+            lineno, line, indentation_stack, token
         )
-        if token:
+        for token in indentation_tokens:
             yield token
         for token in lex_line_content(lineno, column, line):
             yield token
-        column = token.end.column
-    for _ in indentation_stack:
-        yield Dedent(u'', Location(lineno, column), Location(lineno, column))
+    if indentation_stack:
+        for token in lex_indentation(
+            lineno, u'', indentation_stack, token
+        )[0]:
+            yield token
 
 
-def lex_indentation(lineno, column, line, indentation_stack):
+def lex_indentation(lineno, line, indentation_stack, previous):
+    """
+    Returns a list of the indentation tokens at the beginning of the given
+    `line` and the column at which the indentation ends. `previous` is the
+    last token before the line.
+    """
     match = indentation_re.match(line)
-    if match is None:
-        return (None, lineno, column)
-    lexeme = match.group(0)
-    column += len(lexeme)
+    lexeme = u'' if match is None else match.group(0)
+    column = len(lexeme)
     if len(lexeme) > sum(indentation_stack):
         indentation_stack.append(len(lexeme) - sum(indentation_stack))
-        token = Indent(
-            lexeme, Location(lineno, 0), Location(lineno, column)
-        )
-    elif len(lexeme) < sum(indentation_stack):
-        last_added = indentation_stack.pop()
-        if len(lexeme) - sum(indentation_stack) != last_added:
+        return [
+            Indent(lexeme, Location(lineno, 0), Location(lineno, column))
+        ], column
+    tokens = []
+    while len(lexeme) < sum(indentation_stack):
+        indentation_stack.pop()
+        if len(lexeme) > sum(indentation_stack):
             raise LexingError(
                 (
                     u'unindent does not match outer indentation level '
                     u'in line {}'
                 ).format(lineno)
             )
-        token = Dedent(
-            lexeme, Location(lineno, 0), Location(lineno, column)
-        )
-    else:
-        token = None
-    return token, lineno, column
+        if lexeme:
+            start, end = Location(lineno, 0), Location(lineno, column)
+        else:
+            # Dedents without indentation, including those at the end of
+            # the source, end the previous line.
+            start = end = (
+                previous.start if isinstance(previous, Newline) else
+                previous.end
+            )
+        tokens.append(Dedent(lexeme, start, end))
+    return tokens, column
 
 
 def lex_line_content(lineno, column, line):
@@ -19,7 +19,11 @@ def parse(tokens, filename='<unknown>'):
 
 def parse_filters(tokens):
     while True:
-        yield parse_filter(tokens)
+        # StopIteration must not propagate out of a generator (PEP 479).
+        try:
+            yield parse_filter(tokens)
+        except StopIteration:
+            return
 
 
 def parse_filter(token_stream):
@@ -9,38 +9,365 @@
     :license: BSD, see LICENSE.rst
 """
 from __future__ import print_function
-import os
 import sys
+import codecs
+import signal
+import socket
 
-from argvard import Argvard
+from argvard import Argvard, Command
+from argvard.exceptions import UsageError
 
-from pyalysis import __version__
-from pyalysis.application import Pyalysis
+from pyalysis.profiling import Profile
+from pyalysis.vcs import GitError, get_changed_files, get_changed_lines
+from pyalysis.discovery import DEFAULT_EXCLUDES, Finder, partition
+from pyalysis.watch import DEFAULT_SOCKET_PATH, Daemon, query
+from pyalysis._compat import stdout, stderr
 
 
-application = Argvard()
+application = Argvard(defaults={
+    'jobs': u'1',
+    'cache_directory': None,
+    'max_warnings': None,
+    'format': u'text',
+    'profile': False,
+    'profile_output': None,
+    'changed_since': None,
+    'staged': False,
+    'changed_lines': False,
+    'watch': False,
+    'client': False,
+    'socket_path': DEFAULT_SOCKET_PATH,
+    'excludes': [],
+    'shard': None
+})
 
 
 @application.option('--version')
 def version(context):
+    from pyalysis import __version__
     print(__version__)
     sys.exit(0)
 
 
-def iter_python_files(path):
-    for root, _, files in os.walk(path):
-        for file in files:
-            if file.endswith('.py'):
-                yield os.path.join(root, file)
+@application.option('--jobs n')
+def jobs(context, n):
+    """
+    Analyse files in parallel using n processes.
+    """
+    context['jobs'] = n
 
 
-@application.main('paths...')
-def main(context, paths):
-    pyalysis = Pyalysis()
-    files = []
-    for path in paths:
-        if os.path.isdir(path):
-            files.extend(iter_python_files(path))
-        else:
-            files.append(path)
-    pyalysis.analyse(files)
+@application.option('--cache')
+def cache(context):
+    """
+    Cache results in .pyalysis_cache and skip analysis of unchanged files.
+    """
+    context['cache_directory'] = '.pyalysis_cache'
+
+
+@application.option('--max-warnings n')
+def max_warnings(context, n):
+    """
+    Stop analysing a file after reporting n warnings for it.
+    """
+    context['max_warnings'] = n
+
+
+@application.option('--format name')
+def output_format(context, name):
+    """
+    Report warnings as text (default), json, jsonl (one JSON object per
+    line), sarif (SARIF 2.1.0), junit (JUnit XML) or binary (a compact format
+    for tools, see pyalysis.results).
+    """
+    context['format'] = name
+
+
+@application.option('--profile')
+def profile(context):
+    """
+    Print the time spent in each check and phase of the analysis to stderr.
+    """
+    context['profile'] = True
+
+
+@application.option('--profile-output path')
+def profile_output(context, path):
+    """
+    Write the time spent in each check and phase of the analysis as JSON to
+    path.
+    """
+    context['profile_output'] = path
+
+
+@application.option('--changed-since revision')
+def changed_since(context, revision):
+    """
+    Only analyse Python files, that have been changed since the given git
+    revision, including untracked files.
+    """
+    context['changed_since'] = revision
+
+
+@application.option('--staged')
+def staged(context):
+    """
+    Only analyse Python files with changes staged in git.
+    """
+    context['staged'] = True
+
+
+@application.option('--changed-lines')
+def changed_lines(context):
+    """
+    Together with --changed-since or --staged, only report warnings about
+    changed lines.
+    """
+    context['changed_lines'] = True
+
+
+@application.option('--exclude patterns')
+def exclude(context, patterns):
+    """
+    Skip files and directories matching one of the comma-separated
+    .gitignore-style patterns, in addition to those ignored by git.
+    """
+    context['excludes'] = context['excludes'] + [
+        pattern.strip() for pattern in patterns.split(u',') if pattern.strip()
+    ]
+
+
+@application.option('--watch')
+def watch(context):
+    """
+    Keep running, analyse files again when they change and serve the results
+    to --client.
+    """
+    context['watch'] = True
+
+
+@application.option('--client')
+def client(context):
+    """
+    Get the results for paths from a running --watch instead of analysing
+    them.
+    """
+    context['client'] = True
+
+
+@application.option('--socket path')
+def socket_path(context, path):
+    """
+    The Unix socket used by --watch and --client (default: .pyalysis.sock).
+    """
+    context['socket_path'] = path
+
+
+@application.option('--shard shard')
+def shard(context, shard):
+    """
+    Given i/n, split the files into n shards of roughly the same size and only
+    analyse the i-th, counting from 1. Use --format binary and the merge
+    command to combine the results of all shards.
+    """
+    context['shard'] = shard
+
+
+def parse_positive_integer(option, value):
+    try:
+        n = int(value)
+    except ValueError:
+        n = 0
+    if n < 1:
+        raise UsageError(
+            u'{} expects a positive integer, got "{}"'.format(option, value)
+        )
+    return n
+
+
+def parse_shard(value):
+    """
+    Returns the index, counting from 0, and the number of shards given as
+    `value` to --shard.
+    """
+    index, _, count = value.partition(u'/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        index = count = 0
+    if not 1 <= index <= count:
+        raise UsageError(
+            u'--shard expects i/n with 1 <= i <= n, got "{}"'.format(value)
+        )
+    return index - 1, count
+
+
+def find_changed_files(context, paths):
+    """
+    Returns the Python files within `paths` changed according to the
+    --changed-since or --staged option and the changed lines or `None`, if
+    --changed-lines isn't given.
+    """
+    revision = context['changed_since']
+    staged = context['staged']
+    try:
+        changed_files = get_changed_files(revision, staged, paths)
+        if context['changed_lines']:
+            return changed_files, get_changed_lines(
+                revision, staged, paths, changed_files
+            )
+        return changed_files, None
+    except GitError as error:
+        print(u'error: {}'.format(error), file=sys.stderr)
+        sys.exit(2)
+
+
+def run_client(context, paths):
+    try:
+        output, warned = query(context['socket_path'], paths)
+    except (socket.error, ValueError) as error:
+        print(
+            u'error: cannot query {}: {}'.format(
+                context['socket_path'], error
+            ),
+            file=sys.stderr
+        )
+        sys.exit(2)
+    stdout.write(output)
+    sys.exit(1 if warned else 0)
+
+
+def _exit(signum, frame):
+    sys.exit(0)
+
+
+def run_daemon(pyalysis, context, paths, finder):
+    daemon = Daemon(pyalysis, paths, context['socket_path'], finder=finder)
+    # Exit cleanly on SIGTERM, so that the socket is removed.
+    signal.signal(signal.SIGTERM, _exit)
+    try:
+        daemon.serve_forever()
+    except RuntimeError as error:
+        print(u'error: {}'.format(error), file=sys.stderr)
+        sys.exit(2)
+    except KeyboardInterrupt:
+        pass
+
+
+def create_pyalysis(context):
+    """
+    Returns a :class:`~pyalysis.application.Pyalysis` object configured
+    according to the options in `context`.
+    """
+    # The analysers take a while to import, so they are only imported once
+    # we know that files are going to be analysed.
+    from pyalysis.application import Pyalysis
+    from pyalysis.formatters import FORMATTERS
+    if context['format'] not in FORMATTERS:
+        raise UsageError(
+            u'--format expects one of {}, got "{}"'.format(
+                u', '.join(sorted(FORMATTERS)), context['format']
+            )
+        )
+    pyalysis = Pyalysis(
+        jobs=parse_positive_integer(u'--jobs', context['jobs']),
+        cache_directory=context['cache_directory'],
+        max_warnings=(
+            None if context['max_warnings'] is None else
+            parse_positive_integer(u'--max-warnings', context['max_warnings'])
+        ),
+        profile=(
+            Profile()
+            if context['profile'] or context['profile_output'] is not None
+            else None
+        )
+    )
+    pyalysis.formatter_class = FORMATTERS[context['format']]
+    if pyalysis.formatter_class.binary:
+        if context['watch']:
+            raise UsageError(
+                u'--watch cannot be used with --format {}'.format(
+                    context['format']
+                )
+            )
+        pyalysis.output = getattr(sys.stdout, 'buffer', sys.stdout)
+    return pyalysis
+
+
+@application.main('[paths...]')
+def main(context, paths=None):
+    use_git = context['changed_since'] is not None or context['staged']
+    if context['changed_since'] is not None and context['staged']:
+        raise UsageError(u'--changed-since and --staged are exclusive')
+    if context['changed_lines'] and not use_git:
+        raise UsageError(
+            u'--changed-lines requires --changed-since or --staged'
+        )
+    if context['watch'] and context['client']:
+        raise UsageError(u'--watch and --client are exclusive')
+    if context['client']:
+        run_client(context, paths or [])
+    if context['watch'] and use_git:
+        raise UsageError(
+            u'--watch cannot be used with --changed-since or --staged'
+        )
+    if context['watch'] and context['shard'] is not None:
+        raise UsageError(u'--watch cannot be used with --shard')
+    if context['shard'] is not None:
+        shard_index, shard_count = parse_shard(context['shard'])
+    if paths is None:
+        if not use_git:
+            raise UsageError(u'expected at least one path')
+        paths = []
+    pyalysis = create_pyalysis(context)
+    finder = Finder(DEFAULT_EXCLUDES + context['excludes'])
+    if context['watch']:
+        return run_daemon(pyalysis, context, paths, finder)
+    if use_git:
+        files, pyalysis.changed_lines = find_changed_files(context, paths)
+    else:
+        # Files are analysed as they are found.
+        files = finder.find(paths)
+    if context['shard'] is not None:
+        # Every file has to be found, before the files can be partitioned.
+        files = list(files)
+        if pyalysis.formatter.binary:
+            # Allows merge to report the warnings of all shards in the order
+            # of a single run.
+            pyalysis.formatter.positions = dict(
+                (path, position) for position, path in enumerate(files)
+            )
+        files = partition(files, shard_count)[shard_index]
+    try:
+        pyalysis.analyse(files)
+    finally:
+        # Pyalysis.analyse exits, if warnings have been reported.
+        if context['profile']:
+            pyalysis.profile.format_table(stderr)
+        if context['profile_output'] is not None:
+            with codecs.open(
+                context['profile_output'], 'w', encoding='utf-8'
+            ) as profile_file:
+                pyalysis.profile.dump(profile_file)
+
+
+merge = Command()
+merge.option('--format name')(output_format)
+
+
+@merge.main('paths...')
+def merge_main(context, paths):
+    """
+    Report the warnings in result files written with --format binary, for
+    example by runs with --shard, as if they were found by a single run.
+    """
+    from pyalysis.results import ResultFormatError
+    pyalysis = create_pyalysis(context)
+    try:
+        pyalysis.merge(paths)
+    except (IOError, ResultFormatError) as error:
+        print(u'error: {}'.format(error), file=sys.stderr)
+        sys.exit(2)
+
+
+application.register_command('merge', merge)
@@ -0,0 +1,182 @@
+# coding: utf-8
+"""
+    pyalysis.profiling
+    ~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import json
+import time
+from contextlib import contextmanager
+
+
+#: The function used to measure time.
+timer = getattr(time, 'perf_counter', time.time)
+
+
+#: The phases in which the analysis of a file is divided, in the order in
+#: which they occur.
+PHASES = ['read', 'tokenize', 'parse', 'dispatch', 'format']
+
+
+class Profile(object):
+    """
+    Collects the time spent in each phase of the analysis of a file as well
+    as the number of calls and the time spent in each check, that is each
+    receiver connected to an analyser signal.
+
+    Warnings are formatted as soon as they are found, so the time spent
+    formatting is also contained in the `dispatch` phase, just as the time
+    spent in the checks is.
+    """
+    def __init__(self):
+        #: A dictionary mapping file paths to dictionaries, that map the
+        #: names of phases to the time spent in them in seconds.
+        self.files = {}
+
+        #: A dictionary mapping the names of checks to a list with the number
+        #: of calls and the time spent in the check in seconds.
+        self.checks = {}
+
+    @contextmanager
+    def measure(self, file_path, phase):
+        """
+        A contextmanager that adds the time spent within it to the given
+        `phase` of the file at `file_path`.
+        """
+        start = timer()
+        try:
+            yield
+        finally:
+            phases = self.files.setdefault(file_path, {})
+            phases[phase] = phases.get(phase, 0.0) + timer() - start
+
+    def wrap(self, receiver):
+        """
+        Returns a function, that calls `receiver` and counts the call and the
+        time spent towards the check.
+        """
+        stats = self.checks.setdefault(get_check_name(receiver), [0, 0.0])
+
+        def profiled_receiver(*args, **kwargs):
+            start = timer()
+            try:
+                return receiver(*args, **kwargs)
+            finally:
+                stats[0] += 1
+                stats[1] += timer() - start
+        return profiled_receiver
+
+    def merge(self, other):
+        """
+        Adds the timings collected by the `other` profile to this one.
+        """
+        for file_path, other_phases in other.files.items():
+            phases = self.files.setdefault(file_path, {})
+            for phase, seconds in other_phases.items():
+                phases[phase] = phases.get(phase, 0.0) + seconds
+        for name, (calls, seconds) in other.checks.items():
+            stats = self.checks.setdefault(name, [0, 0.0])
+            stats[0] += calls
+            stats[1] += seconds
+
+    def get_phase_totals(self):
+        """
+        Returns a dictionary mapping each phase to the time spent in it for
+        all files.
+        """
+        totals = dict.fromkeys(PHASES, 0.0)
+        for phases in self.files.values():
+            for phase, seconds in phases.items():
+                totals[phase] += seconds
+        return totals
+
+    def to_dict(self):
+        """
+        Returns the collected timings as a dictionary, that can be serialized
+        as JSON.
+        """
+        return {
+            'phases': self.get_phase_totals(),
+            'files': self.files,
+            'checks': {
+                name: {'calls': calls, 'seconds': seconds}
+                for name, (calls, seconds) in self.checks.items()
+            }
+        }
+
+    def dump(self, file):
+        """
+        Writes the collected timings as JSON to the given `file`, opened in
+        text mode.
+        """
+        file.write(
+            json.dumps(self.to_dict(), sort_keys=True, indent=4)
+        )
+        file.write(u'\n')
+
+    def format_table(self, output, files=10):
+        """
+        Writes the checks sorted by the time spent in them, the time spent in
+        each phase and the given number of `files`, that took the longest to
+        analyse, to `output` as a human readable table.
+        """
+        output.write(
+            u'{:>10} {:>10} {:>10}  {}\n'.format(
+                u'ms', u'calls', u'us/call', u'check'
+            )
+        )
+        checks = sorted(
+            self.checks.items(), key=lambda item: item[1][1], reverse=True
+        )
+        for name, (calls, seconds) in checks:
+            per_call = seconds / calls if calls else 0.0
+            output.write(
+                u'{:>10.2f} {:>10} {:>10.2f}  {}\n'.format(
+                    seconds * 1e3, calls, per_call * 1e6, name
+                )
+            )
+        output.write(u'\n{:>10}  {}\n'.format(u'ms', u'phase'))
+        totals = self.get_phase_totals()
+        for phase in PHASES:
+            output.write(
+                u'{:>10.2f}  {}\n'.format(totals[phase] * 1e3, phase)
+            )
+        output.write(u'\n{:>10}  {}\n'.format(u'ms', u'file'))
+        slowest = sorted(
+            self.files.items(),
+            key=lambda item: sum(item[1].values()),
+            reverse=True
+        )[:files]
+        for file_path, phases in slowest:
+            output.write(
+                u'{:>10.2f}  {}\n'.format(
+                    sum(phases.values()) * 1e3, file_path
+                )
+            )
+
+
+@contextmanager
+def measure(profile, file_path, phase):
+    """
+    Like :meth:`Profile.measure`, if `profile` is not `None`, otherwise does
+    nothing.
+    """
+    if profile is None:
+        yield
+    else:
+        with profile.measure(file_path, phase):
+            yield
+
+
+def get_check_name(receiver):
+    """
+    Returns the qualified name of the given `receiver`.
+    """
+    return u'{}.{}'.format(
+        getattr(receiver, '__module__', None),
+        getattr(
+            receiver, '__qualname__', getattr(receiver, '__name__', receiver)
+        )
+    )
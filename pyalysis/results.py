@@ -0,0 +1,227 @@
+# coding: utf-8
+"""
+    pyalysis.results
+    ~~~~~~~~~~~~~~~~
+
+    A compact binary format for warnings, that is fast to write and read back,
+    so that results can be merged and formatted again without analysing the
+    modules again.
+
+    A result file starts with :data:`HEADER`, followed by records. Each record
+    is prefixed with its length as an unsigned 32-bit little-endian integer
+    and starts with a byte indicating its kind:
+
+    :data:`STRING`
+        Adds the UTF-8 encoded string, that makes up the rest of the record,
+        to the string table. Strings are numbered in the order in which they
+        appear, starting with 0.
+
+    :data:`WARNING`
+        A warning, described by the indices of its type, message and file in
+        the string table, the line and column of its start and end and the
+        number of lines, as unsigned 32-bit integers. Those are followed by
+        the lines, each prefixed with its length in bytes.
+
+    :data:`POSITION`
+        The position of a file, given by the index of its path in the string
+        table, among the files of the entire run, as unsigned 32-bit
+        integers. Runs, that only analyse some of the files, write this
+        before the first warning of each file, so that
+        :func:`merge_results` can restore the order of a single run.
+
+    File names, warning types and messages are each only written once, when
+    they are used for the first time.
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import heapq
+import struct
+
+from pyalysis.warnings import WARNINGS
+from pyalysis.utils import Location
+
+
+#: The bytes every result file starts with, including the version of the
+#: format.
+HEADER = b'PYALYSIS\x00\x01'
+
+#: The kind of records adding a string to the string table.
+STRING = 0
+
+#: The kind of records describing a warning.
+WARNING = 1
+
+#: The kind of records giving the position of a file.
+POSITION = 2
+
+
+_length = struct.Struct('<I')
+_string = struct.Struct('<IB')
+_warning = struct.Struct('<IB8I')
+_position = struct.Struct('<IB2I')
+
+
+class ResultFormatError(Exception):
+    """
+    Raised when reading something, that is not a valid result file.
+    """
+
+
+class ResultEncoder(object):
+    """
+    Encodes warnings as records, keeping track of the strings written so far.
+
+    If `positions` is given, it has to be a dictionary mapping file paths to
+    their position among the files of the entire run. The position of each
+    of those files is encoded along with its first warning.
+    """
+    def __init__(self, positions=None):
+        self.positions = {} if positions is None else positions
+        self.strings = {}
+
+        self._positioned = set()
+
+    def encode(self, warning):
+        """
+        Returns the records for `warning` as a byte string, including records
+        for strings, that have not been encoded before.
+        """
+        records = []
+        indices = [
+            self._intern(string, records)
+            for string in [warning.type, warning.message, warning.file]
+        ]
+        if (
+            warning.file in self.positions and
+            warning.file not in self._positioned
+        ):
+            self._positioned.add(warning.file)
+            records.append(
+                _position.pack(
+                    _position.size - _length.size, POSITION, indices[2],
+                    self.positions[warning.file]
+                )
+            )
+        lines = [line.encode('utf-8') for line in warning.lines]
+        encoded_lines = b''.join(
+            _length.pack(len(line)) + line for line in lines
+        )
+        records.append(
+            _warning.pack(
+                _warning.size - _length.size + len(encoded_lines), WARNING,
+                indices[0], indices[1], indices[2],
+                warning.start[0], warning.start[1],
+                warning.end[0], warning.end[1],
+                len(lines)
+            ) + encoded_lines
+        )
+        return b''.join(records)
+
+    def _intern(self, string, records):
+        try:
+            return self.strings[string]
+        except KeyError:
+            index = self.strings[string] = len(self.strings)
+            encoded = string.encode('utf-8')
+            records.append(
+                _string.pack(len(encoded) + 1, STRING) + encoded
+            )
+            return index
+
+
+def read_results(file, positions=None):
+    """
+    Yields the warnings stored in the given file-like object in binary mode,
+    as they are read.
+
+    If `positions` is a dictionary, the positions of files are added to it,
+    before the first warning of the respective file is yielded.
+
+    Raises :exc:`ResultFormatError`, if `file` is not a result file or
+    truncated.
+    """
+    if file.read(len(HEADER)) != HEADER:
+        raise ResultFormatError(u'not a result file')
+    strings = []
+    while True:
+        prefix = file.read(_length.size)
+        if not prefix:
+            return
+        if len(prefix) < _length.size:
+            raise ResultFormatError(u'truncated record')
+        length, = _length.unpack(prefix)
+        record = file.read(length)
+        if len(record) < length or not record:
+            raise ResultFormatError(u'truncated record')
+        kind = ord(record[:1])
+        if kind == STRING:
+            try:
+                strings.append(record[1:].decode('utf-8'))
+            except UnicodeDecodeError as error:
+                raise ResultFormatError(u'invalid string: {}'.format(error))
+        elif kind == WARNING:
+            try:
+                warning = _decode_warning(strings, prefix + record)
+            except (
+                IndexError, KeyError, struct.error, UnicodeDecodeError
+            ) as error:
+                raise ResultFormatError(
+                    u'invalid warning: {}'.format(error)
+                )
+            yield warning
+        elif kind == POSITION:
+            try:
+                _, _, file_index, position = _position.unpack(prefix + record)
+                file_path = strings[file_index]
+            except (IndexError, struct.error) as error:
+                raise ResultFormatError(
+                    u'invalid position: {}'.format(error)
+                )
+            if positions is not None:
+                positions[file_path] = position
+        else:
+            raise ResultFormatError(u'unknown record kind {}'.format(kind))
+
+
+def merge_results(files):
+    """
+    Yields the warnings stored in the given file-like objects in binary mode.
+
+    Warnings are ordered by the positions of their files, so that the results
+    of runs, that analysed different shards of the same files, are yielded in
+    the order in which a single run would have reported them. Warnings of
+    files without a position come first, in the order of `files`.
+    """
+    return (
+        warning for _, _, _, warning in heapq.merge(*[
+            _iter_positioned(index, file) for index, file in enumerate(files)
+        ])
+    )
+
+
+def _iter_positioned(index, file):
+    positions = {}
+    for count, warning in enumerate(read_results(file, positions)):
+        yield positions.get(warning.file, -1), index, count, warning
+
+
+def _decode_warning(strings, record):
+    (
+        _, _, type_index, message_index, file_index, start_line,
+        start_column, end_line, end_column, line_count
+    ) = _warning.unpack_from(record)
+    lines = []
+    offset = _warning.size
+    for _ in range(line_count):
+        line_length, = _length.unpack_from(record, offset)
+        offset += _length.size
+        lines.append(record[offset:offset + line_length].decode('utf-8'))
+        offset += line_length
+    if offset != len(record):
+        raise ResultFormatError(u'invalid warning: wrong length')
+    return WARNINGS[strings[type_index]](
+        strings[message_index], strings[file_index],
+        Location(start_line, start_column), Location(end_line, end_column),
+        lines
+    )
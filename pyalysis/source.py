@@ -0,0 +1,218 @@
+# coding: utf-8
+"""
+    pyalysis.source
+    ~~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+from __future__ import absolute_import
+import io
+import tokenize
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+from pyalysis.utils import detect_encoding, Location
+from pyalysis._compat import PY2
+
+
+# Characters str.splitlines() considers line boundaries, apart from \n.
+_OTHER_LINE_BOUNDARIES = u'\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+
+
+Token = namedtuple('Token', ['type', 'lexeme', 'start', 'end', 'logical_line'])
+
+
+class Source(object):
+    """
+    The source code of a module.
+
+    The source is read, decoded and tokenized exactly once, the results are
+    shared by all analysers that are given the same instance. Anything that
+    only some analysers need, like the lines, is created on first use.
+
+    :param name: The name of the module, usually a file path.
+    :param bytes: The contents of the module as a byte string.
+    """
+    @classmethod
+    def from_file(cls, file):
+        """
+        Creates a :class:`Source` from a file-like object opened in binary
+        mode, that has a `name` attribute.
+        """
+        file.seek(0)
+        return cls(file.name, file.read())
+
+    def __init__(self, name, bytes):
+        #: The name of the module.
+        self.name = name
+
+        #: The contents of the module as a byte string.
+        self.bytes = bytes
+
+        #: The encoding of the module.
+        self.encoding = detect_encoding(io.BytesIO(bytes))
+
+        #: The decoded contents of the module.
+        self.text = bytes.decode(self.encoding)
+
+        #: A list of :class:`Token` instances, as produced by the
+        #: :mod:`tokenize` module.
+        self.tokens = list(generate_tokens(io.BytesIO(bytes).readline))
+
+        #: The :class:`LineStore` with the logical lines of the module, shared
+        #: by the warnings about it.
+        self.line_store = LineStore(iter_logical_lines(self.tokens))
+
+        #: A list with the logical lines in the module.
+        self.logical_lines = self.line_store.logical_lines
+
+        self._lines = None
+        self._physical_lines = None
+
+    @property
+    def lines(self):
+        """
+        A list of the lines in :attr:`text` including line endings.
+        """
+        if self._lines is None:
+            self._lines = split_lines(self.text)
+        return self._lines
+
+    @property
+    def logical_line_linenos(self):
+        """
+        A list of tuples with the first and last line number of each logical
+        line.
+        """
+        return self.line_store.logical_line_linenos
+
+    @property
+    def physical_lines(self):
+        """
+        A list of the lines in the module without trailing whitespace.
+        """
+        if self._physical_lines is None:
+            self._physical_lines = [line.rstrip() for line in self.lines]
+        return self._physical_lines
+
+    def get_logical_lines(self, start, end):
+        """
+        Returns an iterator of the logical lines between the given `start` and
+        `end` location.
+        """
+        return iter(self.line_store.get_logical_lines(start, end))
+
+    def get_logical_line_range(self, lineno):
+        """
+        Returns a tuple containing the first and last line number of the
+        logical line in which the given `lineno` is contained.
+        """
+        return self.line_store.get_logical_line_range(lineno)
+
+
+class LineStore(object):
+    """
+    The logical lines of a module, as yielded by :func:`iter_logical_lines`
+    for its `tokens`.
+
+    Warnings look up the lines they refer to here, when they are needed, so
+    this holds nothing but the lines and the index required to find them.
+    """
+    def __init__(self, logical_lines):
+        #: A list with the logical lines.
+        self.logical_lines = []
+        # The first and last line number of each logical line, in ascending
+        # order. The logical line containing a line is found by bisecting the
+        # first line numbers, which needs only a machine integer per logical
+        # line instead of a Python integer per physical line. Lines not
+        # covered by any logical line, like those within a string spanning
+        # multiple lines, belong to the preceding logical line.
+        self._starts = array('i')
+        self._ends = array('i')
+        for start, end, line in logical_lines:
+            self._starts.append(start)
+            self._ends.append(end)
+            self.logical_lines.append(line)
+
+    @property
+    def logical_line_linenos(self):
+        """
+        A list of tuples with the first and last line number of each logical
+        line.
+        """
+        return list(zip(self._starts, self._ends))
+
+    def get_logical_line_index(self, lineno):
+        """
+        Returns the index of the logical line, that contains the given
+        `lineno`.
+        """
+        return max(bisect_right(self._starts, lineno) - 1, 0)
+
+    def get_logical_lines(self, start, end):
+        """
+        Returns a list of the logical lines between the given `start` and `end`
+        location.
+        """
+        first = self.get_logical_line_index(start.line)
+        if start.line == end.line:
+            last = first
+        else:
+            last = self.get_logical_line_index(end.line - 1)
+        return self.logical_lines[first:last + 1]
+
+    def get_logical_line_range(self, lineno):
+        """
+        Returns a tuple containing the first and last line number of the
+        logical line in which the given `lineno` is contained.
+        """
+        index = self.get_logical_line_index(lineno)
+        return self._starts[index], self._ends[index]
+
+
+def split_lines(text):
+    """
+    Splits `text` into lines at ``\\n``, keeping the line endings.
+    """
+    if not any(
+        character in text for character in _OTHER_LINE_BOUNDARIES
+    ):
+        # splitlines() is considerably faster, but also splits at other
+        # characters, which would be part of a line for us.
+        return text.splitlines(True)
+    return list(io.StringIO(text, newline=u'\n'))
+
+
+def generate_tokens(readline):
+    """
+    Generates tokens similar to :func:`tokenize.generate_tokens` but uses
+    namedtuples, see :class:`Token` and :class:`pyalysis.utils.Location`.
+
+    `readline` is expected to return bytes.
+    """
+    # tokenize.generate_tokens in Python 3.x does not work with bytes so we
+    # have to use tokenize.tokenize instead which works exactly like
+    # tokenize.generate_tokens does.
+    if PY2:
+        generate = tokenize.generate_tokens
+    else:
+        generate = tokenize.tokenize
+    for type, lexeme, start, end, logical_line in generate(readline):
+        yield Token(
+            type, lexeme, Location(*start), Location(*end), logical_line
+        )
+
+
+def iter_logical_lines(tokens):
+    """
+    Yields a tuple for each logical line in the given iterable of `tokens`,
+    containing the first and last line number as well as the logical line
+    itself.
+    """
+    seen = 0
+    for _, _, start, end, logical_line in tokens:
+        if start.line > seen:
+            yield start.line, end.line, logical_line.rstrip()
+            seen = end.line
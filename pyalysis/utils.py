@@ -11,9 +11,11 @@ import re
 import codecs
 import tokenize
 from collections import namedtuple
-from weakref import WeakKeyDictionary
+from weakref import WeakKeyDictionary, ref as weakref
 from contextlib import contextmanager
 
+from blinker import Signal
+
 from pyalysis._compat import PY2
 
 
@@ -86,6 +88,30 @@ def iter_subclasses(cls):
     yield cls
 
 
+def iter_signals(obj):
+    """
+    Yields tuples with the name and the :class:`blinker.Signal` instance of
+    every signal that is an attribute of `obj`, sorted by name.
+    """
+    for name in sorted(dir(obj)):
+        attribute = getattr(obj, name)
+        if isinstance(attribute, Signal):
+            yield name, attribute
+
+
+def iter_receivers(signal):
+    """
+    Yields the receivers connected to the given :class:`blinker.Signal`,
+    regardless of the sender they have been connected for.
+    """
+    for receiver in list(signal.receivers.values()):
+        if isinstance(receiver, weakref):
+            receiver = receiver()
+            if receiver is None:
+                continue
+        yield receiver
+
+
 def count_digits(n):
     """
     Returns the number of digits in the given integer `n`.
@@ -0,0 +1,165 @@
+# coding: utf-8
+"""
+    pyalysis.vcs
+    ~~~~~~~~~~~~
+
+    Determines the modules and lines that have been changed, by asking git.
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import os
+import re
+import subprocess
+
+
+_hunk_header_re = re.compile(br'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+_escape_re = re.compile(br'\\([0-7]{3}|.)')
+
+_escapes = {
+    b'a': b'\a', b'b': b'\b', b't': b'\t', b'n': b'\n', b'v': b'\v',
+    b'f': b'\f', b'r': b'\r', b'"': b'"', b'\\': b'\\'
+}
+
+
+class GitError(Exception):
+    """
+    Raised, if git cannot be run or fails.
+    """
+
+
+def git(*arguments):
+    """
+    Runs git with the given `arguments` and returns the output as bytes.
+    """
+    try:
+        process = subprocess.Popen(
+            ('git',) + arguments,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except OSError as error:
+        raise GitError(u'could not run git: {}'.format(error))
+    output, error_output = process.communicate()
+    if process.returncode != 0:
+        raise GitError(error_output.decode('utf-8', 'replace').strip())
+    return output
+
+
+def get_diff_arguments(revision=None, staged=False):
+    """
+    Returns the arguments for `git diff`, to compare the working tree to the
+    given `revision` or, if `staged` is `True`, the index to ``HEAD``.
+    """
+    if staged:
+        return ['--cached']
+    return [revision or 'HEAD']
+
+
+def _split_paths(output):
+    return [
+        path.decode('utf-8') for path in output.split(b'\0') if path
+    ]
+
+
+def get_changed_files(revision=None, staged=False, paths=()):
+    """
+    Returns a list of the paths, relative to the current working directory,
+    of the Python modules within `paths`, that have been added, copied,
+    modified or renamed compared to `revision`.
+
+    If `staged` is `True`, the modules changed in the index are returned
+    instead. Otherwise untracked modules, that are not ignored, are
+    considered changed as well.
+    """
+    toplevel = git('rev-parse', '--show-toplevel').decode('utf-8').strip()
+    changed = _split_paths(git(*(
+        ['diff', '--name-only', '--diff-filter=ACMR', '-z'] +
+        get_diff_arguments(revision, staged) + ['--'] + list(paths)
+    )))
+    if not staged:
+        changed.extend(_split_paths(git(*(
+            ['ls-files', '--others', '--exclude-standard', '-z', '--full-name',
+             '--'] + list(paths)
+        ))))
+    return sorted(set(
+        os.path.relpath(os.path.join(toplevel, path))
+        for path in changed if path.endswith('.py')
+    ))
+
+
+def _unquote(path):
+    """
+    Returns the given path, as it appears in the headers of a diff, without
+    the quotes and escapes git adds to paths with unusual characters.
+    """
+    if not path.startswith(b'"'):
+        return path
+
+    def replace(match):
+        escape = match.group(1)
+        if len(escape) == 3:
+            return bytes(bytearray([int(escape, 8)]))
+        return _escapes.get(escape, escape)
+    return _escape_re.sub(replace, path[1:-1])
+
+
+def get_changed_lines(revision=None, staged=False, paths=(),
+                      changed_files=None):
+    """
+    Returns a dictionary mapping the paths, as returned by
+    :func:`get_changed_files`, to a list of tuples with the first and last
+    line of each block of changed lines. If `changed_files` is given, it is
+    used instead of calling :func:`get_changed_files`.
+
+    Modules that are not tracked by git have only changed lines, so they are
+    mapped to `None` to indicate that every line is changed.
+    """
+    if changed_files is None:
+        changed_files = get_changed_files(revision, staged, paths)
+    if not changed_files:
+        return {}
+    toplevel = git('rev-parse', '--show-toplevel').decode('utf-8').strip()
+    changed_lines = dict.fromkeys(changed_files)
+    output = git(*(
+        ['-c', 'core.quotePath=false', 'diff', '--unified=0', '--no-color',
+         '--no-ext-diff',
+         '--src-prefix=a/', '--dst-prefix=b/', '--diff-filter=ACMR'] +
+        get_diff_arguments(revision, staged) + ['--'] + changed_files
+    ))
+    path = None
+    for line in output.splitlines():
+        if line.startswith(b'+++ '):
+            path = None
+            # Git ends the header with a tab, if the path contains a space.
+            header = _unquote(line[len(b'+++ '):].rstrip(b'\t'))
+            if header.startswith(b'b/'):
+                path = os.path.relpath(os.path.join(
+                    toplevel, header[len(b'b/'):].decode('utf-8')
+                ))
+                if path in changed_lines:
+                    changed_lines[path] = []
+                else:
+                    path = None
+        elif path is not None:
+            match = _hunk_header_re.match(line)
+            if match is not None:
+                start = int(match.group(1))
+                count = 1 if match.group(2) is None else int(match.group(2))
+                if count > 0:
+                    changed_lines[path].append((start, start + count - 1))
+    return changed_lines
+
+
+def touches(warning, line_ranges):
+    """
+    Returns `True`, if the lines of the given `warning` overlap with any of
+    the `line_ranges`, a list of tuples as returned by
+    :func:`get_changed_lines`. If `line_ranges` is `None`, every line is
+    considered to be touched.
+    """
+    if line_ranges is None:
+        return True
+    for start, end in line_ranges:
+        if warning.start.line <= end and start <= warning.end.line:
+            return True
+    return False
@@ -13,6 +13,10 @@ from pyalysis._compat import with_metaclass, text_type
 
 
 class Warning(object):
+    # Subclasses need to define __slots__ as well, otherwise instances get a
+    # __dict__ again.
+    __slots__ = ('message', 'file')
+
     attributes = [
         ('message', text_type),
         ('file', str)
@@ -32,17 +36,50 @@ class Warning(object):
 
 
 class AnalyserWarning(Warning):
+    """
+    A warning about the code between the :class:`pyalysis.utils.Location`
+    instances `start` and `end` in a module.
+
+    The logical `lines` containing the code are either given directly or
+    looked up lazily in a :class:`pyalysis.source.LineStore`, which is shared
+    by all warnings about the same module. Most warnings are filtered out or
+    never formatted, so this avoids creating a list of lines for each of
+    them.
+    """
+    __slots__ = ('start', 'end', '_lines', '_line_store')
+
     attributes = Warning.attributes + [
         ('start', (int, int)),
         ('end', (int, int))
     ]
 
-    def __init__(self, message, file, start, end, lines):
+    def __init__(self, message, file, start, end, lines=None,
+                 line_store=None):
         self.message = message
         self.file = file
         self.start = start
         self.end = end
-        self.lines = lines
+        self._lines = lines
+        self._line_store = line_store
+
+    @property
+    def lines(self):
+        """
+        A list of the logical lines containing the code being warned about.
+        """
+        if self._lines is None:
+            if self._line_store is None:
+                return []
+            return self._line_store.get_logical_lines(self.start, self.end)
+        return self._lines
+
+    def __getstate__(self):
+        # The line store is not pickled along with each warning, only the
+        # lines it needs.
+        return self.message, self.file, self.start, self.end, self.lines
+
+    def __setstate__(self, state):
+        self.__init__(*state)
 
 
 class AbstractWarningMeta(ABCMeta):
@@ -71,64 +108,74 @@ class Python3CompatibilityWarning(AbstractWarning):
 
 
 class LineWarning(AnalyserWarning):
-    pass
+    __slots__ = ()
 
 
 @PEP8Warning.register
 class LineTooLong(LineWarning):
+    __slots__ = ()
     type = 'line-too-long'
 
 
 class TokenWarning(AnalyserWarning):
-    pass
+    __slots__ = ()
 
 
 @PEP8Warning.register
 class WrongNumberOfIndentationSpaces(TokenWarning):
+    __slots__ = ()
     type = 'wrong-number-of-indentation-spaces'
 
 
 class MixedTabsAndSpaces(TokenWarning):
+    __slots__ = ()
     type = 'mixed-tabs-and-spaces'
 
 
 class ASTWarning(AnalyserWarning):
-    pass
+    __slots__ = ()
 
 
 @PEP8Warning.register
 class MultipleImports(ASTWarning):
+    __slots__ = ()
     type = 'multiple-imports'
 
 
 class StarImport(ASTWarning):
+    __slots__ = ()
     type = 'star-import'
 
 
 class IndiscriminateExcept(ASTWarning):
+    __slots__ = ()
     type = 'indiscriminate-except'
 
 
 class GlobalKeyword(ASTWarning):
+    __slots__ = ()
     type = 'global-keyword'
 
 
 @Python3CompatibilityWarning.register
 class PrintStatement(ASTWarning):
+    __slots__ = ()
     type = 'print-statement'
 
 
 @Python3CompatibilityWarning.register
 class DivStatement(ASTWarning):
+    __slots__ = ()
     type = 'div-statement'
 
 
 class CSTWarning(AnalyserWarning):
-    pass
+    __slots__ = ()
 
 
 @PEP8Warning.register
 class ExtraneousWhitespace(CSTWarning):
+    __slots__ = ()
     type = 'extraneous-whitespace'
 
 
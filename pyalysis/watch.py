@@ -0,0 +1,458 @@
+# coding: utf-8
+"""
+    pyalysis.watch
+    ~~~~~~~~~~~~~~
+
+    A long-lived daemon, that watches files and analyses them when they
+    change, and a client, that asks the daemon for the results over a Unix
+    socket.
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+from __future__ import absolute_import
+import io
+import os
+import sys
+import json
+import errno
+import socket
+import struct
+import select
+
+from pyalysis.discovery import Finder
+
+
+#: The path of the socket used, if no other path is given.
+DEFAULT_SOCKET_PATH = '.pyalysis.sock'
+
+
+# inotify constants, as defined in <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class Watcher(object):
+    """
+    A base class for watchers, that determine which files have changed.
+
+    `paths` is a list of paths of files and directories. Files are watched
+    if they are given explicitly or if they are Python modules within one of
+    the directories. Directories are searched for modules with the given
+    :class:`pyalysis.discovery.Finder`.
+    """
+    #: The file descriptor, that becomes readable when files have changed, or
+    #: `None`, if the watcher has to be polled.
+    fileno = None
+
+    #: The interval in seconds in which the watcher has to be polled or
+    #: `None`.
+    interval = None
+
+    def __init__(self, paths, finder=None):
+        self.finder = Finder() if finder is None else finder
+        self.directories = [
+            path for path in paths if os.path.isdir(path)
+        ]
+        self.files = set(
+            path for path in paths if not os.path.isdir(path)
+        )
+
+    def is_watched(self, path):
+        """
+        Returns `True`, if the file at `path` is watched.
+        """
+        return path in self.files or (
+            path.endswith('.py') and
+            any(
+                is_within(path, directory)
+                for directory in self.directories
+            )
+        )
+
+    def poll(self):
+        """
+        Returns a set of the paths of the watched files, that have been
+        changed, created or removed since the last call. `None` is returned,
+        if the changes are unknown and all files should be considered
+        changed.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class PollingWatcher(Watcher):
+    """
+    Determines changes by comparing the modification time and size of all
+    watched files every `interval` seconds.
+    """
+    def __init__(self, paths, finder=None, interval=1.0):
+        Watcher.__init__(self, paths, finder)
+        self.interval = interval
+        self.stats = self.scan()
+
+    def scan(self):
+        stats = {}
+        for path in self.finder.find(list(self.files) + self.directories):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            stats[os.path.normpath(path)] = stat.st_mtime, stat.st_size
+        return stats
+
+    def poll(self):
+        stats = self.scan()
+        changed = set(
+            path for path in set(stats) | set(self.stats)
+            if stats.get(path) != self.stats.get(path)
+        )
+        self.stats = stats
+        return changed
+
+
+class InotifyWatcher(Watcher):
+    """
+    Determines changes using inotify, which is only available on Linux.
+
+    Raises :exc:`OSError`, if inotify is not available.
+    """
+    mask = (
+        IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+        IN_DELETE
+    )
+
+    def __init__(self, paths, finder=None):
+        Watcher.__init__(self, paths, finder)
+        import ctypes
+        import ctypes.util
+        try:
+            self._libc = ctypes.CDLL(
+                ctypes.util.find_library('c') or 'libc.so.6', use_errno=True
+            )
+            inotify_init1 = self._libc.inotify_init1
+        except (OSError, AttributeError):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self.fileno = inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fileno < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        #: Maps watch descriptors to the directory being watched.
+        self.watches = {}
+        for directory in self.directories:
+            self.add_watches(directory)
+        for directory in set(
+            os.path.dirname(path) or os.curdir for path in self.files
+        ):
+            self.add_watch(directory)
+
+    def add_watch(self, directory):
+        watch = self._libc.inotify_add_watch(
+            self.fileno, directory.encode(sys.getfilesystemencoding()),
+            self.mask
+        )
+        if watch >= 0:
+            self.watches[watch] = directory
+
+    def add_watches(self, directory):
+        """
+        Watches the given `directory` and its subdirectories, returning the
+        Python modules within it.
+        """
+        modules = []
+        for path, is_directory in self.finder.walk([directory]):
+            if is_directory:
+                self.add_watch(path)
+            else:
+                modules.append(os.path.normpath(path))
+        return modules
+
+    def poll(self):
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fileno, 65536)
+            except OSError as error:
+                if error.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                watch, mask, _, length = _EVENT_HEADER.unpack_from(
+                    data, offset
+                )
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                directory = self.watches.get(watch)
+                if directory is None or not name:
+                    continue
+                path = os.path.normpath(os.path.join(
+                    directory, name.decode(sys.getfilesystemencoding())
+                ))
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and any(
+                        is_within(path, watched)
+                        for watched in self.directories
+                    ):
+                        changed.update(self.add_watches(path))
+                elif self.is_watched(path):
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fileno)
+
+
+def create_watcher(paths, finder=None):
+    """
+    Returns an :class:`InotifyWatcher`, if inotify is available, otherwise a
+    :class:`PollingWatcher`.
+    """
+    try:
+        return InotifyWatcher(paths, finder)
+    except OSError:
+        return PollingWatcher(paths, finder)
+
+
+def is_within(path, directory):
+    """
+    Returns `True`, if `path` is within `directory` or the same path.
+    """
+    relative_path = os.path.relpath(path, directory)
+    return relative_path != os.pardir and not relative_path.startswith(
+        os.pardir + os.sep
+    )
+
+
+class Daemon(object):
+    """
+    Analyses the files in `paths` with the given
+    :class:`pyalysis.application.Pyalysis` instance, keeping the warnings for
+    each file in memory and analysing files again whenever they change.
+
+    Clients get the results through a Unix socket at `socket_path`. If
+    `report` is `True`, warnings are also reported by `pyalysis` as files
+    are analysed. Modules within directories are found with the given
+    :class:`pyalysis.discovery.Finder`.
+    """
+    def __init__(self, pyalysis, paths, socket_path=DEFAULT_SOCKET_PATH,
+                 report=True, finder=None):
+        self.pyalysis = pyalysis
+        self.finder = Finder() if finder is None else finder
+        # Paths are normalized, so that the paths reported by the watcher
+        # match those of the files we analysed.
+        self.paths = [os.path.normpath(path) for path in paths]
+        self.socket_path = socket_path
+        self.report = report
+
+        #: A :class:`Watcher` watching `paths` and the ignore file.
+        self.watcher = create_watcher(
+            self.paths + [os.path.normpath(pyalysis.ignore_file_path)],
+            self.finder
+        )
+
+        #: A dictionary mapping file paths to the warnings found in them.
+        self.results = {}
+
+        self.server = None
+        self.running = False
+
+    def analyse(self, files):
+        """
+        Analyses the given `files`, updating the :attr:`results`.
+        """
+        # These are imported here, so that importing this module stays cheap
+        # for the command line interface.
+        from tokenize import TokenError
+        from lib2to3.pgen2.parse import ParseError
+        ignore_file_path = os.path.normpath(self.pyalysis.ignore_file_path)
+        for file_path in sorted(set(map(os.path.normpath, files))):
+            if file_path == ignore_file_path:
+                continue
+            if not os.path.isfile(file_path):
+                self.results.pop(file_path, None)
+                continue
+            try:
+                warnings = self.pyalysis.get_warnings(file_path)
+            except (
+                IOError, SyntaxError, ValueError, TokenError, ParseError
+            ) as error:
+                # Files are often saved while they are being edited.
+                sys.stderr.write(u'{}: {}\n'.format(file_path, error))
+                self.results.pop(file_path, None)
+                continue
+            self.results[file_path] = warnings
+            if self.report:
+                self.pyalysis.report(warnings)
+        if self.report:
+            self.pyalysis.formatter.flush()
+
+    def reset(self):
+        """
+        Discards everything, that depends on the ignore file and analyses all
+        files again.
+        """
+        self.pyalysis.reset()
+        self.results = {}
+        self.analyse(self.finder.find(self.paths))
+
+    def update(self):
+        """
+        Analyses the files, that have changed since the last update.
+        """
+        changed = self.watcher.poll()
+        ignore_file_path = os.path.normpath(self.pyalysis.ignore_file_path)
+        if changed is None or ignore_file_path in changed:
+            self.reset()
+        elif changed:
+            self.analyse(changed)
+
+    def format_results(self, paths):
+        """
+        Returns the formatted warnings of all files within the given `paths`
+        and whether there are any warnings.
+        """
+        output = io.StringIO()
+        formatter = self.pyalysis.formatter_class(output)
+        formatter.begin()
+        warned = False
+        for file_path in sorted(self.results):
+            if paths and not any(
+                is_within(file_path, os.path.normpath(path))
+                for path in paths
+            ):
+                continue
+            for warning in self.results[file_path]:
+                warned = True
+                formatter.format(warning)
+        formatter.end()
+        return output.getvalue(), warned
+
+    def handle(self, connection):
+        connection.settimeout(5)
+        try:
+            request = json.loads(_receive_line(connection).decode('utf-8'))
+            # Changes may have happened, that we haven't been notified about
+            # yet. Clients should never get outdated results.
+            self.update()
+            output, warned = self.format_results(request.get('paths', []))
+            connection.sendall(json.dumps({
+                'output': output,
+                'warned': warned
+            }).encode('utf-8') + b'\n')
+        except (socket.error, ValueError) as error:
+            sys.stderr.write(u'error handling client: {}\n'.format(error))
+        finally:
+            connection.close()
+
+    def listen(self):
+        if os.path.exists(self.socket_path):
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                connection.connect(self.socket_path)
+            except socket.error:
+                # Nobody is listening, the daemon didn't clean up.
+                os.remove(self.socket_path)
+            else:
+                raise RuntimeError(
+                    u'{} is already in use'.format(self.socket_path)
+                )
+            finally:
+                connection.close()
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        self.server.listen(8)
+
+    def serve_forever(self):
+        """
+        Analyses all files and serves the results, until interrupted.
+        """
+        self.listen()
+        self.running = True
+        if self.report:
+            self.pyalysis.formatter.begin()
+        try:
+            self.analyse(self.finder.find(self.paths))
+            while self.running:
+                readable = [self.server]
+                if self.watcher.fileno is not None:
+                    readable.append(self.watcher.fileno)
+                try:
+                    readable, _, _ = select.select(
+                        readable, [], [], self.watcher.interval
+                    )
+                except select.error as error:
+                    if error.args[0] == errno.EINTR:
+                        continue
+                    raise
+                if self.server in readable:
+                    connection, _ = self.server.accept()
+                    self.handle(connection)
+                else:
+                    self.update()
+        finally:
+            if self.report:
+                self.pyalysis.formatter.end()
+            self.close()
+
+    def stop(self):
+        """
+        Stops :meth:`serve_forever`, after the next client has been served or
+        change has been handled.
+        """
+        self.running = False
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+            os.remove(self.socket_path)
+        self.watcher.close()
+
+
+def _receive_line(connection):
+    chunks = []
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b'\n'):
+            break
+    return b''.join(chunks)
+
+
+def query(socket_path, paths):
+    """
+    Asks the daemon listening on `socket_path` for the warnings in the files
+    within `paths` or all files, if `paths` is empty. Returns the formatted
+    warnings and whether there are any.
+
+    Raises :exc:`socket.error`, if no daemon is listening.
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+        connection.sendall(
+            json.dumps({'paths': list(paths)}).encode('utf-8') + b'\n'
+        )
+        response = json.loads(_receive_line(connection).decode('utf-8'))
+    finally:
+        connection.close()
+    return response['output'], response['warned']
@@ -142,3 +142,53 @@ class TestDivStatement(ASTAnalyserTest):
         """
         warnings = self.analyse_source(source)
         assert not warnings
+
+
+class TestTraversal(object):
+    def create_analyser(self, source):
+        module = BytesIO(source.encode('utf-8'))
+        module.name = '<test>'
+        return ASTAnalyser(module)
+
+    def test_order(self):
+        analyser = self.create_analyser(u'a + b')
+        events = []
+
+        @ASTAnalyser.on_enter_BinOp.connect_via(analyser)
+        def enter_binop(analyser, node):
+            events.append(('enter', 'BinOp'))
+
+        @ASTAnalyser.on_BinOp.connect_via(analyser)
+        def leave_binop(analyser, node):
+            events.append(('leave', 'BinOp'))
+
+        @ASTAnalyser.on_enter_Name.connect_via(analyser)
+        def enter_name(analyser, node):
+            events.append(('enter', node.id))
+
+        @ASTAnalyser.on_Name.connect_via(analyser)
+        def leave_name(analyser, node):
+            events.append(('leave', node.id))
+
+        analyser.analyse()
+        assert events == [
+            ('enter', 'BinOp'),
+            ('enter', 'a'),
+            ('leave', 'a'),
+            ('enter', 'b'),
+            ('leave', 'b'),
+            ('leave', 'BinOp')
+        ]
+
+    def test_deeply_nested(self):
+        # deeper than the default recursion limit of 1000
+        depth = 1500
+        analyser = self.create_analyser(u' + '.join([u'a'] * depth))
+        names = []
+
+        @ASTAnalyser.on_Name.connect_via(analyser)
+        def leave_name(analyser, node):
+            names.append(node)
+
+        analyser.analyse()
+        assert len(names) == depth
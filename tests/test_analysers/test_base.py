@@ -0,0 +1,83 @@
+# coding: utf-8
+"""
+    tests.test_analysers.test_base
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+from blinker import Signal
+
+from pyalysis.source import Source
+from pyalysis.analysers.base import AnalyserBase, emits
+from pyalysis.warnings import AnalyserWarning, LineTooLong, StarImport
+from pyalysis.utils import Location
+
+
+def test_create_dispatch_table():
+    signals = {1: Signal(), 2: Signal(), 3: Signal()}
+    analyser = AnalyserBase(Source('<test>', b''))
+    other_analyser = AnalyserBase(Source('<test>', b''))
+
+    def receiver(analyser):
+        pass
+
+    def analyser_receiver(analyser):
+        pass
+
+    def other_analyser_receiver(analyser):
+        pass
+
+    signals[1].connect(receiver)
+    signals[1].connect(analyser_receiver, sender=analyser)
+    signals[2].connect(other_analyser_receiver, sender=other_analyser)
+
+    table = analyser.create_dispatch_table(signals)
+    assert list(table) == [1]
+    assert set(table[1]) == {receiver, analyser_receiver}
+
+
+def test_emit_sink():
+    analyser = AnalyserBase(Source('<test>', b'foo = 1\n'))
+    location = Location(1, 0)
+    analyser.emit(AnalyserWarning, u'foo', location, location)
+    assert len(analyser.warnings) == 1
+
+    sunk = []
+    analyser.sink = sunk.append
+    analyser.emit(AnalyserWarning, u'bar', location, location)
+    assert len(analyser.warnings) == 1
+    assert [warning.message for warning in sunk] == [u'bar']
+
+
+def test_ignores():
+    signal = Signal()
+    analyser = AnalyserBase(Source('<test>', b'foo = 1\n'))
+
+    @signal.connect
+    @emits(LineTooLong)
+    def ignored_receiver(analyser):
+        pass
+
+    @signal.connect
+    @emits(LineTooLong, StarImport)
+    def partially_ignored_receiver(analyser):
+        pass
+
+    @signal.connect
+    def receiver(analyser):
+        pass
+
+    assert len(analyser.get_receivers(signal)) == 3
+    analyser.ignores = lambda warning_cls: warning_cls is LineTooLong
+    assert set(analyser.get_receivers(signal)) == {
+        partially_ignored_receiver, receiver
+    }
+    assert set(analyser.create_dispatch_table({1: signal})[1]) == {
+        partially_ignored_receiver, receiver
+    }
+
+    location = Location(1, 0)
+    analyser.emit(LineTooLong, u'foo', location, location)
+    analyser.emit(StarImport, u'bar', location, location)
+    assert [warning.message for warning in analyser.warnings] == [u'bar']
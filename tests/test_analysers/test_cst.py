@@ -12,7 +12,13 @@ from io import BytesIO
 import pytest
 
 from pyalysis.analysers import CSTAnalyser
+from pyalysis.analysers.cst import (
+    CSTBackend, Lib2to3Backend, TokenStreamBackend, detect_future_features,
+    get_driver, get_grammar
+)
+from pyalysis.source import Source
 from pyalysis.warnings import ExtraneousWhitespace
+from pyalysis._compat import PY2
 
 
 class CSTAnalyserTest(object):
@@ -313,3 +319,73 @@ class TestExtraneousWhitespace(CSTAnalyserTest):
         )
         assert warning.start == (1, 0)
         assert warning.end == (1, len(source))
+
+
+class TestTokenStreamBackend(object):
+    def create_source(self, source):
+        return Source('<test>', textwrap.dedent(source).encode('utf-8'))
+
+    def get_leaves(self, tree):
+        leaves = [
+            (leaf.type, leaf.value, leaf.prefix) for leaf in tree.leaves()
+        ]
+        # lib2to3 parses the source with an additional newline, which ends up
+        # in the trailing leaves.
+        while leaves and leaves[-1][1] in (u'', u'\n'):
+            leaves.pop()
+        return leaves
+
+    @pytest.mark.parametrize('source', [
+        u'foo = 1\n',
+        u'foo = [1,  # comment\n       2]\n',
+        u'foo = 1 + \\\n    2\n',
+        u'def foo():\n    """bar"""\n\n    # baz\n    return 1\n',
+        u'foo[...]\n',
+        u'from __future__ import print_function\nprint(1, file=foo)\n',
+        u'async def foo():\n    await bar\n    async for x in y:\n'
+        u'        pass\nasync = 1\n',
+        u'',
+    ])
+    def test_same_as_lib2to3(self, source):
+        source = self.create_source(source)
+        expected = Lib2to3Backend().parse(source)
+        tree = TokenStreamBackend().parse(source)
+        assert str(tree) == source.text
+        assert self.get_leaves(tree) == self.get_leaves(expected)
+
+    @pytest.mark.skipif(PY2, reason='always falls back on Python 2.x')
+    def test_fallback(self):
+        class Fallback(CSTBackend):
+            def parse(self, source):
+                return 'fallback'
+
+        backend = TokenStreamBackend(Fallback())
+        assert backend.parse(self.create_source(u'foo = 1\n')) != 'fallback'
+        assert backend.parse(self.create_source(u'foo = 1 +\n')) == (
+            'fallback'
+        )
+
+
+@pytest.mark.parametrize(('source', 'features'), [
+    (u'foo = 1\n', set()),
+    (u'from __future__ import print_function\n', {u'print_function'}),
+    (
+        u'"""docstring"""\n# comment\n'
+        u'from __future__ import (print_function,\n    division)\n'
+        u'from __future__ import unicode_literals as foo\n',
+        {u'print_function', u'division', u'unicode_literals'}
+    ),
+    (u'import os\nfrom __future__ import print_function\n', set()),
+    (u'from os import path\n', set()),
+])
+def test_detect_future_features(source, features):
+    source = Source('<test>', source.encode('utf-8'))
+    assert detect_future_features(source.tokens) == features
+
+
+def test_get_driver():
+    grammar = get_grammar(set())
+    assert get_driver(grammar) is get_driver(grammar)
+    assert get_driver(grammar) is not get_driver(
+        get_grammar({u'print_function'})
+    )
@@ -6,10 +6,12 @@
     :copyright: 2014 by Daniel Neuhäuser and Contributors
     :license: BSD, see LICENSE.rst for details
 """
+import re
 import textwrap
 from io import BytesIO
 
 from pyalysis.analysers import LineAnalyser
+from pyalysis.analysers.raw import iter_matching_lines
 
 
 class LineAnalyserTest(object):
@@ -31,3 +33,36 @@ class TestLineLength(LineAnalyserTest):
         source = u'a' * 79 + u'\n'
         warnings = self.analyse_source(source)
         assert not warnings
+
+    def test_lines(self):
+        source = (
+            u'a' * 80 + u'\n' + u'a' * 79 + u' \t\n' + u'\n' + u'a' * 100
+        )
+        warnings = self.analyse_source(source)
+        assert [
+            (warning.start, warning.end) for warning in warnings
+        ] == [((1, 0), (1, 81)), ((4, 0), (4, 100))]
+
+
+class TestOnLine(LineAnalyserTest):
+    def test(self):
+        lines = []
+
+        @LineAnalyser.on_line.connect
+        def collect_line(analyser, lineno, line):
+            lines.append((lineno, line))
+        try:
+            self.analyse_source(u'foo\nbar')
+        finally:
+            LineAnalyser.on_line.disconnect(collect_line)
+        assert lines == [(1, u'foo\n'), (2, u'bar')]
+
+
+def test_iter_matching_lines():
+    text = u'foo\nbar baz\n\nbaz'
+    assert list(iter_matching_lines(re.compile(u'ba.'), text)) == [
+        (2, u'bar baz\n'), (2, u'bar baz\n'), (4, u'baz')
+    ]
+    assert list(iter_matching_lines(re.compile(u'\nb'), text)) == [
+        (2, u'bar baz\n'), (4, u'baz')
+    ]
@@ -0,0 +1,139 @@
+# coding: utf-8
+"""
+    tests.test_application
+    ~~~~~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import os
+import codecs
+
+from blinker import Signal
+
+from pyalysis.application import Pyalysis
+from pyalysis.analysers import (
+    LineAnalyser, TokenAnalyser, CSTAnalyser, ASTAnalyser, emits
+)
+from pyalysis.analysers.base import AnalyserBase
+from pyalysis.warnings import LineTooLong
+
+
+def write_ignore_file(source):
+    with codecs.open('.pyalysis.ignore', 'w', encoding='utf-8') as f:
+        f.write(source)
+
+
+class TestActiveAnalyserClasses(object):
+    def test_without_ignore_file(self, tmpcwd):
+        pyalysis = Pyalysis()
+        assert pyalysis.active_analyser_classes == [
+            LineAnalyser, TokenAnalyser, CSTAnalyser, ASTAnalyser
+        ]
+
+    def test_ignored(self, tmpcwd):
+        write_ignore_file(u'extraneous-whitespace\nline-too-long')
+        pyalysis = Pyalysis()
+        assert pyalysis.active_analyser_classes == [
+            TokenAnalyser, ASTAnalyser
+        ]
+
+    def test_partially_ignored(self, tmpcwd):
+        write_ignore_file(u'pep8')
+        pyalysis = Pyalysis()
+        assert pyalysis.active_analyser_classes == [
+            TokenAnalyser, ASTAnalyser
+        ]
+
+    def test_conditionally_ignored(self, tmpcwd):
+        write_ignore_file(u'extraneous-whitespace\n  message = "foo"')
+        pyalysis = Pyalysis()
+        assert CSTAnalyser in pyalysis.active_analyser_classes
+
+    def test_without_receivers(self, tmpcwd):
+        class Analyser(AnalyserBase):
+            pass
+
+        pyalysis = Pyalysis()
+        pyalysis.analyser_classes = [Analyser]
+        assert pyalysis.active_analyser_classes == []
+
+    def test_receivers_ignored(self, tmpcwd):
+        class Analyser(AnalyserBase):
+            on_foo = Signal()
+
+        @Analyser.on_foo.connect
+        @emits(LineTooLong)
+        def check(analyser):
+            pass
+
+        pyalysis = Pyalysis()
+        pyalysis.analyser_classes = [Analyser]
+        assert pyalysis.active_analyser_classes == [Analyser]
+
+        write_ignore_file(u'line-too-long')
+        pyalysis = Pyalysis()
+        pyalysis.analyser_classes = [Analyser]
+        assert pyalysis.active_analyser_classes == []
+
+
+class TestCheckFile(object):
+    def write_module(self):
+        with codecs.open('foo.py', 'w', encoding='utf-8') as f:
+            f.write(u'import os, sys\n' + u'#' * 80 + u'\n' * 2 + u'#' * 80)
+
+    def test_streaming(self, tmpcwd):
+        self.write_module()
+        pyalysis = Pyalysis()
+        pyalysis.analyser_classes = [LineAnalyser]
+        found = []
+        assert pyalysis.check_file('foo.py', found.append)
+        assert [warning.start.line for warning in found] == [2, 4]
+
+    def test_ignored(self, tmpcwd):
+        self.write_module()
+        write_ignore_file(u'multiple-imports')
+        pyalysis = Pyalysis()
+        warnings = pyalysis.get_warnings('foo.py')
+        assert [warning.type for warning in warnings] == [
+            u'line-too-long', u'line-too-long'
+        ]
+
+    def test_reset(self, tmpcwd):
+        self.write_module()
+        pyalysis = Pyalysis(cache_directory='cache')
+        assert len(pyalysis.get_warnings('foo.py')) == 3
+        write_ignore_file(u'line-too-long')
+        assert len(pyalysis.get_warnings('foo.py')) == 3
+        pyalysis.reset()
+        warnings = pyalysis.get_warnings('foo.py')
+        assert [warning.type for warning in warnings] == [u'multiple-imports']
+
+    def test_max_warnings(self, tmpcwd):
+        self.write_module()
+        write_ignore_file(u'multiple-imports')
+        pyalysis = Pyalysis(max_warnings=1)
+        found = []
+        assert not pyalysis.check_file('foo.py', found.append)
+        assert [warning.start.line for warning in found] == [2]
+
+    def test_max_warnings_reached(self, tmpcwd):
+        self.write_module()
+        pyalysis = Pyalysis(cache_directory='cache', max_warnings=3)
+        found = []
+        assert pyalysis.check_file('foo.py', found.append)
+        assert len(found) == 3
+        # All warnings have been found, so they are cached.
+        assert os.listdir('cache')
+
+    def test_max_warnings_cache(self, tmpcwd):
+        self.write_module()
+        pyalysis = Pyalysis(cache_directory='cache', max_warnings=2)
+        for _ in range(2):
+            found = []
+            assert not pyalysis.check_file('foo.py', found.append)
+            assert len(found) == 2
+
+        pyalysis = Pyalysis(cache_directory='cache')
+        assert len(pyalysis.get_warnings('foo.py')) == 3
+        assert len(pyalysis.get_warnings('foo.py')) == 3
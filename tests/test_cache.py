@@ -0,0 +1,125 @@
+# coding: utf-8
+"""
+    tests.test_cache
+    ~~~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import os
+import textwrap
+
+import pytest
+from blinker import Signal
+
+from pyalysis.cache import ResultCache, get_fingerprint
+from pyalysis.analysers import LineAnalyser, TokenAnalyser
+from pyalysis.warnings import LineTooLong
+from pyalysis.utils import Location
+
+
+def test_get_set(tmpdir):
+    cache = ResultCache(str(tmpdir), [LineAnalyser])
+    key = cache.get_key(b'foo = 1\n')
+    assert cache.get(key, 'foo.py') is None
+
+    cache.set(key, [
+        LineTooLong(
+            u'message', 'bar.py', Location(1, 0), Location(1, 80), [u'line']
+        )
+    ])
+    warnings = cache.get(key, 'foo.py')
+    assert len(warnings) == 1
+    warning = warnings[0]
+    assert isinstance(warning, LineTooLong)
+    assert warning.message == u'message'
+    assert warning.file == 'foo.py'
+    assert warning.start == Location(1, 0)
+    assert warning.end == Location(1, 80)
+    assert warning.lines == [u'line']
+
+
+def test_get_corrupt(tmpdir):
+    cache = ResultCache(str(tmpdir), [LineAnalyser])
+    key = cache.get_key(b'foo = 1\n')
+    cache.set(key, [])
+    with open(cache.get_path(key), 'wb') as entry_file:
+        entry_file.write(b'{')
+    assert cache.get(key, 'foo.py') is None
+
+
+def test_get_key(tmpdir):
+    cache = ResultCache(str(tmpdir), [LineAnalyser])
+    assert cache.get_key(b'foo = 1\n') == cache.get_key(b'foo = 1\n')
+    assert cache.get_key(b'foo = 1\n') != cache.get_key(b'foo = 2\n')
+    other_cache = ResultCache(str(tmpdir), [LineAnalyser, TokenAnalyser])
+    assert cache.get_key(b'foo = 1\n') != other_cache.get_key(b'foo = 1\n')
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_fingerprint_checks():
+    class Analyser(object):
+        on_foo = Signal()
+
+    before = get_fingerprint([Analyser])
+
+    @Analyser.on_foo.connect
+    def check(analyser):
+        pass
+
+    assert get_fingerprint([Analyser]) != before
+
+
+def get_check_fingerprint(source):
+    namespace = {}
+    exec(textwrap.dedent(source), namespace)
+
+    class Analyser(object):
+        on_foo = Signal()
+
+    Analyser.on_foo.connect(namespace['check'])
+    return get_fingerprint([Analyser])
+
+
+@pytest.mark.parametrize('changed', [
+    u"""
+    def check(analyser):
+        return len(analyser.line) > 80
+    """,
+    u"""
+    def check(analyser):
+        return len(analyser.line) > 79, u'Line is too long'
+    """,
+    u"""
+    def check(analyser):
+        return len(analyser.line) > 79 and analyser.line.strip()
+    """,
+    u"""
+    def check(analyser):
+        return [line for line in analyser.lines if len(line) > 80]
+    """
+])
+def test_fingerprint_check_constants(changed):
+    source = u"""
+    def check(analyser):
+        return len(analyser.line) > 79, u'Line is long'
+    """
+    nested = u"""
+    def check(analyser):
+        return [line for line in analyser.lines if len(line) > 79]
+    """
+    for original in [source, nested]:
+        assert get_check_fingerprint(original) == get_check_fingerprint(
+            original
+        )
+    assert get_check_fingerprint(changed) not in [
+        get_check_fingerprint(source), get_check_fingerprint(nested)
+    ]
+
+
+def test_fingerprint_ignored():
+    fingerprint = get_fingerprint([LineAnalyser])
+    assert get_fingerprint([LineAnalyser], lambda cls: False) == fingerprint
+    assert get_fingerprint(
+        [LineAnalyser], lambda cls: cls is LineTooLong
+    ) != fingerprint
@@ -0,0 +1,179 @@
+# coding: utf-8
+"""
+    tests.test_discovery
+    ~~~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import os
+import codecs
+
+import pytest
+
+from pyalysis.discovery import (
+    Pattern, Finder, find_files, is_excluded, partition
+)
+
+
+def write(path, content=u''):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with codecs.open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+@pytest.mark.parametrize(('pattern', 'path', 'is_directory', 'expected'), [
+    ('foo.py', '/base/foo.py', False, True),
+    ('foo.py', '/base/bar/foo.py', False, True),
+    ('foo.py', '/other/foo.py', False, True),
+    ('*.py', '/base/bar/foo.py', False, True),
+    ('*.py', '/base/foo.pyc', False, False),
+    ('*.py[co]', '/base/foo.pyc', False, True),
+    ('*.py[!co]', '/base/foo.pyc', False, False),
+    ('fo?.py', '/base/foo.py', False, True),
+    ('foo/', '/base/foo', False, False),
+    ('foo/', '/base/foo', True, True),
+    ('/foo.py', '/base/foo.py', False, True),
+    ('/foo.py', '/base/bar/foo.py', False, False),
+    ('bar/foo.py', '/base/bar/foo.py', False, True),
+    ('bar/foo.py', '/base/spam/bar/foo.py', False, False),
+    ('bar/*.py', '/base/bar/spam/foo.py', False, False),
+    ('**/foo.py', '/base/foo.py', False, True),
+    ('**/foo.py', '/base/bar/spam/foo.py', False, True),
+    ('bar/**/foo.py', '/base/bar/foo.py', False, True),
+    ('bar/**/foo.py', '/base/bar/spam/eggs/foo.py', False, True),
+    ('bar/**', '/base/bar/spam/foo.py', False, True),
+    ('bar/**', '/base/bar', True, False),
+    ('\\!foo.py', '/base/!foo.py', False, True)
+])
+def test_pattern(pattern, path, is_directory, expected):
+    assert Pattern(pattern, '/base').matches(path, is_directory) == expected
+
+
+def test_is_excluded():
+    patterns = [
+        Pattern('*.py', '/base'),
+        Pattern('!foo.py', '/base'),
+        Pattern('/foo.py', '/base')
+    ]
+    assert is_excluded(patterns, '/base/bar.py', False)
+    assert not is_excluded(patterns, '/base/spam/foo.py', False)
+    assert is_excluded(patterns, '/base/foo.py', False)
+    assert not is_excluded(patterns, '/base/README', False)
+
+
+def test_find_files(tmpcwd):
+    write('foo.py')
+    write('foo.txt')
+    write('bar/bar.py')
+    write('bar/spam/spam.py')
+    write('.git/hooks/hook.py')
+    write('node_modules/foo/foo.py')
+    write('build/lib/foo.py')
+    write('bar/build/build.py')
+    write('foo.egg-info/foo.py')
+    write('venv/pyvenv.cfg')
+    write('venv/lib/foo.py')
+    assert list(find_files(['.'])) == [
+        os.path.join('.', 'foo.py'),
+        os.path.join('.', 'bar', 'bar.py'),
+        os.path.join('.', 'bar', 'build', 'build.py'),
+        os.path.join('.', 'bar', 'spam', 'spam.py')
+    ]
+    # Explicitly given paths are never excluded.
+    assert list(find_files(['venv', 'foo.txt'])) == [
+        os.path.join('venv', 'lib', 'foo.py'), 'foo.txt'
+    ]
+
+
+def test_find_files_excludes(tmpcwd):
+    write('foo.py')
+    write('bar/bar.py')
+    write('bar/spam.py')
+    assert list(find_files(['.'], excludes=['bar/', '!bar/'])) == [
+        os.path.join('.', 'foo.py'),
+        os.path.join('.', 'bar', 'bar.py'),
+        os.path.join('.', 'bar', 'spam.py')
+    ]
+    assert list(find_files(['.'], excludes=['/bar/spam.py'])) == [
+        os.path.join('.', 'foo.py'), os.path.join('.', 'bar', 'bar.py')
+    ]
+
+
+def test_find_files_gitignore(tmpcwd):
+    os.mkdir('.git')
+    write('.gitignore', u'# comment\n\ngenerated_*.py\n/spam/\n')
+    write('foo.py')
+    write('generated_foo.py')
+    write('spam/spam.py')
+    write('bar/spam/spam.py')
+    write('bar/.gitignore', u'eggs.py\n!generated_bar.py\n')
+    write('bar/eggs.py')
+    write('bar/generated_bar.py')
+    write('eggs.py')
+    assert list(find_files(['.'])) == [
+        os.path.join('.', 'eggs.py'),
+        os.path.join('.', 'foo.py'),
+        os.path.join('.', 'bar', 'generated_bar.py'),
+        os.path.join('.', 'bar', 'spam', 'spam.py')
+    ]
+    # .gitignore files in parent directories within the repository apply.
+    assert list(find_files(['bar'])) == [
+        os.path.join('bar', 'generated_bar.py'),
+        os.path.join('bar', 'spam', 'spam.py')
+    ]
+    assert len(list(find_files(['.'], use_gitignore=False))) == 7
+
+
+def test_find_files_duplicates(tmpcwd):
+    write('foo/foo.py')
+    write('foo/bar/bar.py')
+    assert list(find_files(['foo', 'foo/bar', 'foo/foo.py'])) == [
+        os.path.join('foo', 'foo.py'), os.path.join('foo', 'bar', 'bar.py')
+    ]
+
+
+@pytest.mark.skipif(
+    not hasattr(os, 'symlink'), reason='requires symbolic links'
+)
+def test_find_files_symlink_loop(tmpcwd):
+    write('foo/foo.py')
+    os.symlink(os.path.abspath('foo'), os.path.join('foo', 'loop'))
+    assert list(find_files(['foo'])) == [os.path.join('foo', 'foo.py')]
+
+
+def test_finder_walk(tmpcwd):
+    write('foo/foo.py')
+    write('foo/bar/bar.py')
+    assert list(Finder().walk(['foo'])) == [
+        ('foo', True),
+        (os.path.join('foo', 'foo.py'), False),
+        (os.path.join('foo', 'bar'), True),
+        (os.path.join('foo', 'bar', 'bar.py'), False)
+    ]
+
+
+def test_partition(tmpcwd):
+    sizes = {
+        'a.py': 50, 'b.py': 40, 'c.py': 30, 'd.py': 20, 'e.py': 10,
+        'f.py': 10
+    }
+    for path, size in sizes.items():
+        write(path, u'x' * size)
+    paths = sorted(sizes)
+    partitions = partition(paths, 2)
+    assert partitions == [['a.py', 'd.py', 'e.py'], ['b.py', 'c.py', 'f.py']]
+    # The partition does not depend on the order of the paths, within each
+    # partition the paths keep their order.
+    assert partition(reversed(paths), 2) == [
+        list(reversed(files)) for files in partitions
+    ]
+
+
+def test_partition_more_partitions_than_files(tmpcwd):
+    write('foo.py', u'foo')
+    assert partition(['foo.py', 'missing.py'], 3) == [
+        ['foo.py'], ['missing.py'], []
+    ]
@@ -6,11 +6,18 @@
     :copyright: 2014 by Daniel Neuhäuser and Contributors
     :license: BSD, see LICENSE.rst for details
 """
+import json
 import textwrap
 from io import StringIO
+from xml.etree import ElementTree
 
-from pyalysis.formatters import JSONFormatter, TextFormatter
-from pyalysis.warnings import TokenWarning, ASTWarning, CSTWarning
+from pyalysis.formatters import (
+    JSONFormatter, JSONLinesFormatter, TextFormatter, SARIFFormatter,
+    JUnitFormatter, get_rules
+)
+from pyalysis.warnings import (
+    TokenWarning, ASTWarning, CSTWarning, LineTooLong, MultipleImports
+)
 from pyalysis.ignore.verifier import IgnoreVerificationWarning
 from pyalysis.analysers.token import Location
 
@@ -37,6 +44,7 @@ class TestJSONFormatter(object):
                 [u'01234567890123456789']
             )
         )
+        formatter.end()
         assert output.getvalue() == textwrap.dedent(u"""\
         {
             "end": [
@@ -91,6 +99,7 @@ class TestJSONFormatter(object):
                 [u'0123456789']
             )
         )
+        formatter.end()
         assert output.getvalue() == textwrap.dedent(u"""\
         {
             "end": [
@@ -133,6 +142,7 @@ class TestJSONFormatter(object):
                 [u'0123456789']
             )
         )
+        formatter.end()
         assert output.getvalue() == textwrap.dedent(u"""\
         {
             "end": [
@@ -161,7 +171,143 @@ class TestJSONFormatter(object):
         """)
 
 
+class TestJSONLinesFormatter(object):
+    def test_token_warning(self):
+        output = StringIO()
+        formatter = JSONLinesFormatter(output)
+        formatter.begin()
+        for message in [u'a message', u'b message']:
+            formatter.format(
+                TokenWarning(
+                    message, '<test>', Location(1, 0), Location(1, 10),
+                    [u'0123456789']
+                )
+            )
+        formatter.end()
+        assert output.getvalue() == (
+            u'{"end":[1,10],"file":"<test>","message":"a message",'
+            u'"start":[1,0]}\n'
+            u'{"end":[1,10],"file":"<test>","message":"b message",'
+            u'"start":[1,0]}\n'
+        )
+
+
+def test_get_rules():
+    rules = get_rules()
+    types = [warning_type for warning_type, _, _ in rules]
+    assert types == sorted(set(types))
+    assert u'pep8' not in types
+    assert (u'line-too-long', LineTooLong, [u'pep8']) in rules
+
+
+class TestSARIFFormatter(object):
+    def test(self):
+        output = StringIO()
+        formatter = SARIFFormatter(output)
+        formatter.begin()
+        for warning_cls in [LineTooLong, MultipleImports, LineTooLong]:
+            formatter.format(
+                warning_cls(
+                    u'a message', 'foo/bar baz.py', Location(1, 0),
+                    Location(2, 10), [u'0123456789']
+                )
+            )
+        formatter.end()
+        log = json.loads(output.getvalue())
+        assert log['version'] == u'2.1.0'
+        run, = log['runs']
+        rules = run['tool']['driver']['rules']
+        # Each rule is described once.
+        assert len(rules) == len(set(rule['id'] for rule in rules))
+        assert [result['ruleId'] for result in run['results']] == [
+            u'line-too-long', u'multiple-imports', u'line-too-long'
+        ]
+        for result in run['results']:
+            assert rules[result['ruleIndex']]['id'] == result['ruleId']
+        assert run['results'][0]['message'] == {u'text': u'a message'}
+        assert run['results'][0]['locations'] == [
+            {
+                u'physicalLocation': {
+                    u'artifactLocation': {u'uri': u'foo/bar%20baz.py'},
+                    u'region': {
+                        u'startLine': 1,
+                        u'startColumn': 1,
+                        u'endLine': 2,
+                        u'endColumn': 11
+                    }
+                }
+            }
+        ]
+
+    def test_without_warnings(self):
+        output = StringIO()
+        formatter = SARIFFormatter(output)
+        formatter.begin()
+        formatter.end()
+        run, = json.loads(output.getvalue())['runs']
+        assert run['results'] == []
+
+
+class TestJUnitFormatter(object):
+    def test(self):
+        output = StringIO()
+        formatter = JUnitFormatter(output)
+        formatter.begin()
+        for file, warning_cls in [
+            ('foo.py', LineTooLong),
+            ('foo.py', MultipleImports),
+            ('<bar>.py', LineTooLong)
+        ]:
+            formatter.format(
+                warning_cls(
+                    u'a "message"', file, Location(1, 0), Location(1, 10),
+                    [u'01234\x0c56789']
+                )
+            )
+        formatter.end()
+        test_suites = ElementTree.fromstring(
+            output.getvalue().encode('utf-8')
+        )
+        assert [
+            (
+                test_suite.get('name'), test_suite.get('tests'),
+                test_suite.get('failures')
+            )
+            for test_suite in test_suites
+        ] == [(u'foo.py', u'2', u'2'), (u'<bar>.py', u'1', u'1')]
+        test_case = test_suites[0][0]
+        assert test_case.get('classname') == u'foo.py'
+        assert test_case.get('name') == u'line-too-long (1:0)'
+        failure, = test_case
+        assert failure.get('type') == u'line-too-long'
+        assert failure.get('message') == u'a "message"'
+        assert failure.text == (
+            u'foo.py:1:0: a "message"\n01234\ufffd56789'
+        )
+
+
 class TestTextFormatter(object):
+    def test_buffering(self):
+        output = StringIO()
+        formatter = TextFormatter(output)
+        formatter.buffer_size = 100
+        formatter.begin()
+        warning = TokenWarning(
+            u'a message', '<test>', Location(1, 0), Location(1, 10),
+            [u'0123456789']
+        )
+        formatter.format(warning)
+        assert output.getvalue() == u''
+        formatter.flush()
+        formatted = output.getvalue()
+        assert formatted
+        # Once buffer_size characters are buffered, they are written.
+        for _ in range(100 // len(formatted) + 1):
+            formatter.format(warning)
+        assert len(output.getvalue()) > len(formatted)
+        formatter.end()
+        assert output.getvalue() == formatted * (100 // len(formatted) + 2)
+
     def test_token_warning(self):
         output = StringIO()
         formatter = TextFormatter(output)
@@ -183,6 +329,7 @@ class TestTextFormatter(object):
                 [u'01234567890123456789', u'01234567890123456789']
             )
         )
+        formatter.end()
         assert output.getvalue() == textwrap.dedent(u"""\
         File "<test>", line 1
           0123456789
@@ -214,6 +361,7 @@ class TestTextFormatter(object):
                 [u'0123456789']
             )
         )
+        formatter.end()
         assert output.getvalue() == textwrap.dedent(u"""\
         File "<test>", line 1
           0123456789
@@ -240,6 +388,7 @@ class TestTextFormatter(object):
                 [u'0123456789']
             )
         )
+        formatter.end()
         assert output.getvalue() == textwrap.dedent(u"""\
         File "<test>", line 1
           0123456789
@@ -281,6 +430,7 @@ class TestTextFormatter(object):
                 [u'spam', u'eggs']
             )
         )
+        formatter.end()
         assert output.getvalue() == textwrap.dedent(u"""\
             File "<test>", line 1
               abcdefghij
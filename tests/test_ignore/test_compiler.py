@@ -10,7 +10,7 @@ from io import StringIO
 
 import pytest
 
-from pyalysis.warnings import PrintStatement, DivStatement
+from pyalysis.warnings import PrintStatement, DivStatement, StarImport
 from pyalysis.ignore.lexer import lex
 from pyalysis.ignore.parser import parse
 from pyalysis.ignore.verifier import verify
@@ -49,3 +49,41 @@ def test_compile(source, warning, allowed):
     file.name = '<test>'
     filter = compile(verify(file, parse(lex(file.read())))[0])
     assert filter(warning) == allowed
+
+
+@pytest.mark.parametrize(('source', 'warning_cls', 'ignored'), [
+    (u'print-statement', PrintStatement, True),
+    (u'print-statement', DivStatement, False),
+    (u'python3-compatibility', PrintStatement, True),
+    (u'print-statement \n message = "foo"', PrintStatement, False),
+    (u'print-statement\npython3-compatibility', PrintStatement, True)
+])
+def test_compile_ignores(source, warning_cls, ignored):
+    file = StringIO(source)
+    file.name = '<test>'
+    filter = compile(verify(file, parse(lex(file.read())))[0])
+    assert filter.ignores(warning_cls) == ignored
+
+
+def test_compile_multiple_filters():
+    file = StringIO(
+        u'print-statement\n'
+        u'  message = "foo"\n'
+        u'\n'
+        u'python3-compatibility\n'
+        u'star-import\n'
+        u'  file = "spam.py"\n'
+    )
+    file.name = '<test>'
+    filter = compile(verify(file, parse(lex(file.read())))[0])
+    location = Location(1, 0), Location(1, 10)
+    assert not filter(PrintStatement(u'foo', '<test>', *location))
+    # The first filter matching the type of a warning decides, whether it is
+    # ignored.
+    assert filter(PrintStatement(u'bar', '<test>', *location))
+    assert not filter(DivStatement(u'foo', '<test>', *location))
+    assert not filter(StarImport(u'foo', 'spam.py', *location))
+    assert filter(StarImport(u'foo', 'eggs.py', *location))
+    assert not filter.ignores(PrintStatement)
+    assert filter.ignores(DivStatement)
+    assert not filter.ignores(StarImport)
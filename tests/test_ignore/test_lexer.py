@@ -73,6 +73,17 @@ from pyalysis.ignore.lexer import lex
         tokens.Operator(u'>=', Location(2, 9), Location(2, 11)),
         tokens.Integer(u'1', Location(2, 12), Location(2, 13)),
         tokens.Dedent(u'', Location(2, 13), Location(2, 13))
+    ]),
+    (u'foo\n  spam = 1\n\nbar', [
+        tokens.Name(u'foo', Location(1, 0), Location(1, 3)),
+        tokens.Newline(u'\n', Location(1, 3), Location(2, 0)),
+        tokens.Indent(u'  ', Location(2, 0), Location(2, 2)),
+        tokens.Name(u'spam', Location(2, 2), Location(2, 6)),
+        tokens.Operator(u'=', Location(2, 7), Location(2, 8)),
+        tokens.Integer(u'1', Location(2, 9), Location(2, 10)),
+        tokens.Newline(u'\n', Location(2, 10), Location(3, 0)),
+        tokens.Dedent(u'', Location(2, 10), Location(2, 10)),
+        tokens.Name(u'bar', Location(4, 0), Location(4, 3))
     ])
 ])
 def test_lexer(source, tokens):
@@ -7,13 +7,18 @@
     :license: BSD, see LICENSE.rst for details
 """
 import os
+import sys
+import json
 import codecs
 import subprocess
 import textwrap
+from io import BytesIO
 
 import pytest
 
 from pyalysis import __version__
+from pyalysis.results import read_results
+from pyalysis.vcs import GitError, git
 
 
 def check_output(command):
@@ -94,3 +99,278 @@ def test_main_directory(tmpcwd):
     File "foo/eggs.py", line 2
        pass
     Indented by 1 spaces instead of 4 as demanded by PEP 8""") in messages
+
+
+def test_main_exclude(tmpcwd):
+    os.mkdir('foo')
+    for path in ['foo/spam.py', 'foo/eggs.py']:
+        with codecs.open(path, 'w', encoding='utf-8') as module:
+            module.write(u'def foo():\n pass')
+
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        check_output(['pyalysis', '--exclude', 'spam.py', 'foo'])
+    assert exc_info.value.output.decode('utf-8').startswith(
+        u'File "foo/eggs.py"'
+    )
+    assert check_output(
+        ['pyalysis', '--exclude', 'spam.py, eggs.py', 'foo']
+    ) == u''
+
+
+def test_main_jobs(tmpcwd):
+    os.mkdir('foo')
+    for i in range(10):
+        with codecs.open(
+            'foo/module{}.py'.format(i), 'w', encoding='utf-8'
+        ) as module:
+            module.write(u'def foo():\n pass\nimport os, sys\n')
+
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        check_output(['pyalysis', 'foo'])
+    serial_error = exc_info.value
+
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        check_output(['pyalysis', '--jobs', '4', 'foo'])
+    parallel_error = exc_info.value
+
+    assert parallel_error.returncode == serial_error.returncode == 1
+    assert parallel_error.output == serial_error.output
+
+
+def test_main_cache(tmpcwd):
+    with codecs.open('foo.py', 'w', encoding='utf-8') as foo:
+        foo.write(u'def foo():\n pass\n')
+
+    outputs = []
+    for _ in range(2):
+        with pytest.raises(subprocess.CalledProcessError) as exc_info:
+            check_output(['pyalysis', '--cache', 'foo.py'])
+        assert exc_info.value.returncode == 1
+        outputs.append(exc_info.value.output)
+    assert os.path.isdir('.pyalysis_cache')
+    assert outputs[0] == outputs[1]
+
+
+def test_main_max_warnings(tmpcwd):
+    os.mkdir('foo')
+    for i in range(10):
+        with codecs.open(
+            'foo/module{}.py'.format(i), 'w', encoding='utf-8'
+        ) as module:
+            module.write(u'def foo():\n pass\n' * 3)
+
+    outputs = []
+    for jobs in [u'1', u'4']:
+        process = subprocess.Popen(
+            ['pyalysis', '--jobs', jobs, '--max-warnings', '2', 'foo'],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        stdout, stderr = process.communicate()
+        assert process.returncode == 1
+        assert stdout.decode('utf-8').count(u'Indented by 1 spaces') == 20
+        assert stderr.decode('utf-8').count(u'Stopped after 2 warnings') == 10
+        outputs.append(stdout)
+    assert outputs[0] == outputs[1]
+
+
+def test_main_max_warnings_reached(tmpcwd):
+    with codecs.open('foo.py', 'w', encoding='utf-8') as foo:
+        foo.write(u'def foo():\n pass\n' * 2)
+    process = subprocess.Popen(
+        ['pyalysis', '--cache', '--max-warnings', '2', 'foo.py'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    stdout, stderr = process.communicate()
+    assert process.returncode == 1
+    assert stdout.decode('utf-8').count(u'Indented by 1 spaces') == 2
+    assert u'Stopped after' not in stderr.decode('utf-8')
+    assert os.listdir('.pyalysis_cache')
+
+
+def test_main_format(tmpcwd):
+    with codecs.open('foo.py', 'w', encoding='utf-8') as foo:
+        foo.write(u'import os, sys\n')
+    process = subprocess.Popen(
+        ['pyalysis', '--format', 'jsonl', 'foo.py'], stdout=subprocess.PIPE
+    )
+    stdout, _ = process.communicate()
+    assert process.returncode == 1
+    assert [
+        json.loads(line) for line in stdout.decode('utf-8').splitlines()
+    ] == [
+        {
+            u'file': u'foo.py',
+            u'message': (
+                u'Multiple imports on one line. Should be on separate ones.'
+            ),
+            u'start': [1, 0],
+            u'end': [1, 14]
+        }
+    ]
+
+    process = subprocess.Popen(
+        ['pyalysis', '--format', 'xml', 'foo.py'], stderr=subprocess.PIPE
+    )
+    _, stderr = process.communicate()
+    assert process.returncode == 1
+    assert u'--format expects one of' in stderr.decode('utf-8')
+
+
+def test_main_format_binary(tmpcwd):
+    with codecs.open('foo.py', 'w', encoding='utf-8') as foo:
+        foo.write(u'import os, sys\n')
+    process = subprocess.Popen(
+        ['pyalysis', '--format', 'binary', 'foo.py'], stdout=subprocess.PIPE
+    )
+    stdout, _ = process.communicate()
+    assert process.returncode == 1
+    warning, = read_results(BytesIO(stdout))
+    assert warning.type == u'multiple-imports'
+    assert warning.lines == [u'import os, sys']
+
+
+def test_main_shard_merge(tmpcwd):
+    for name in ['foo', 'bar', 'baz']:
+        with codecs.open(name + '.py', 'w', encoding='utf-8') as module:
+            module.write(u'import os, sys\n' + u'#' * len(name) * 10)
+    for i in range(1, 3):
+        with open('shard-{}.bin'.format(i), 'wb') as output:
+            subprocess.call(
+                [
+                    'pyalysis', '--format', 'binary', '--shard',
+                    '{}/2'.format(i), '.'
+                ],
+                stdout=output
+            )
+    files = []
+    for path in ['shard-1.bin', 'shard-2.bin']:
+        with open(path, 'rb') as results:
+            files.append([warning.file for warning in read_results(results)])
+    assert sorted(files[0] + files[1]) == [
+        os.path.join('.', name + '.py') for name in ['bar', 'baz', 'foo']
+    ]
+    assert not set(files[0]) & set(files[1])
+
+    process = subprocess.Popen(
+        ['pyalysis', 'merge', '--format', 'jsonl'] +
+        ['shard-1.bin', 'shard-2.bin'],
+        stdout=subprocess.PIPE
+    )
+    merged, _ = process.communicate()
+    assert process.returncode == 1
+    # The warnings are reported in the order of a single run.
+    process = subprocess.Popen(
+        ['pyalysis', '--format', 'jsonl', '.'], stdout=subprocess.PIPE
+    )
+    single, _ = process.communicate()
+    assert merged == single
+
+
+@pytest.mark.parametrize('shard', ['0/2', '3/2', '1', 'a/b'])
+def test_main_shard_invalid(shard):
+    process = subprocess.Popen(
+        ['pyalysis', '--shard', shard, '.'], stderr=subprocess.PIPE
+    )
+    _, stderr = process.communicate()
+    assert process.returncode == 1
+    assert u'--shard expects i/n' in stderr.decode('utf-8')
+
+
+def test_main_merge_invalid(tmpcwd):
+    with codecs.open('foo.py', 'w', encoding='utf-8') as foo:
+        foo.write(u'import os, sys\n')
+    process = subprocess.Popen(
+        ['pyalysis', 'merge', 'foo.py'], stderr=subprocess.PIPE
+    )
+    _, stderr = process.communicate()
+    assert process.returncode == 2
+    assert u'not a result file' in stderr.decode('utf-8')
+
+
+def test_main_profile(tmpcwd):
+    with codecs.open('foo.py', 'w', encoding='utf-8') as foo:
+        foo.write(u'def foo():\n    pass\n')
+
+    process = subprocess.Popen(
+        [
+            'pyalysis', '--profile', '--profile-output', 'profile.json',
+            'foo.py'
+        ],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    _, stderr = process.communicate()
+    assert process.returncode == 0
+    assert u'check_line_length' in stderr.decode('utf-8')
+    with codecs.open('profile.json', 'r', encoding='utf-8') as profile_file:
+        profile = json.load(profile_file)
+    assert list(profile['files']) == [u'foo.py']
+    assert profile['checks']
+
+
+def test_main_changed_since(tmpcwd):
+    try:
+        git('init', '--quiet')
+    except GitError:
+        pytest.skip('git is not available')
+    git('config', 'user.name', 'Pyalysis')
+    git('config', 'user.email', 'pyalysis@example.com')
+    with codecs.open('foo.py', 'w', encoding='utf-8') as foo:
+        foo.write(u'def foo():\n pass\n')
+    with codecs.open('bar.py', 'w', encoding='utf-8') as bar:
+        bar.write(u'def bar():\n pass\n')
+    git('add', '.')
+    git('commit', '--quiet', '-m', 'Initial commit')
+
+    assert check_output(['pyalysis', '--changed-since', 'HEAD']) == u''
+
+    with codecs.open('foo.py', 'a', encoding='utf-8') as foo:
+        foo.write(u'\n\ndef spam():\n  pass\n')
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        check_output(['pyalysis', '--changed-since', 'HEAD'])
+    messages = exc_info.value.output.decode('utf-8').rstrip().split(u'\n\n')
+    assert [message.splitlines()[0] for message in messages] == [
+        u'File "foo.py", line 2', u'File "foo.py", line 6'
+    ]
+
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        check_output([
+            'pyalysis', '--changed-since', 'HEAD', '--changed-lines'
+        ])
+    messages = exc_info.value.output.decode('utf-8').rstrip().split(u'\n\n')
+    assert [message.splitlines()[0] for message in messages] == [
+        u'File "foo.py", line 6'
+    ]
+
+    assert check_output(['pyalysis', '--staged']) == u''
+
+
+def test_main_client_without_daemon(tmpcwd):
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        check_output(['pyalysis', '--client', '--socket', 'missing.sock'])
+    assert exc_info.value.returncode == 2
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason='requires python -X importtime'
+)
+def test_main_import_time():
+    process = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', 'import pyalysis.main'],
+        stderr=subprocess.PIPE
+    )
+    _, output = process.communicate()
+    assert process.returncode == 0
+    imported = set(
+        line.rsplit(u'|', 1)[1].strip()
+        for line in output.decode('utf-8').splitlines()
+        if line.startswith(u'import time:') and u'|' in line
+    )
+    assert u'pyalysis.main' in imported
+    # Starting the client, for example, shouldn't have to wait for any of
+    # these.
+    for module in [
+        u'pyalysis.application', u'pyalysis.analysers', u'lib2to3',
+        u'blinker', u'multiprocessing', u'pkg_resources',
+        u'importlib.metadata'
+    ]:
+        assert module not in imported
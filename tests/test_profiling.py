@@ -0,0 +1,91 @@
+# coding: utf-8
+"""
+    tests.test_profiling
+    ~~~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import io
+import json
+
+from pyalysis.profiling import Profile, PHASES, get_check_name
+from pyalysis.source import Source
+from pyalysis.analysers import LineAnalyser
+from pyalysis.analysers.raw import check_line_length
+
+
+def test_measure():
+    profile = Profile()
+    with profile.measure('foo.py', 'read'):
+        pass
+    with profile.measure('foo.py', 'read'):
+        pass
+    assert list(profile.files) == ['foo.py']
+    assert list(profile.files['foo.py']) == ['read']
+    assert profile.files['foo.py']['read'] >= 0
+
+
+def test_wrap():
+    profile = Profile()
+
+    def check(analyser):
+        return analyser
+
+    wrapped = profile.wrap(check)
+    assert wrapped(1) == 1
+    assert wrapped(2) == 2
+    calls, seconds = profile.checks[get_check_name(check)]
+    assert calls == 2
+    assert seconds >= 0
+
+
+def test_analyser_profile():
+    profile = Profile()
+    analyser = LineAnalyser(Source('<test>', b'foo = 1\nbar = 2\n'))
+    analyser.profile = profile
+    analyser.analyse()
+    # check_line_length looks at the text as a whole.
+    assert profile.checks[get_check_name(check_line_length)][0] == 1
+
+
+def test_merge():
+    profile = Profile()
+    profile.files = {'foo.py': {'read': 1.0}}
+    profile.checks = {'check': [1, 1.0]}
+    other = Profile()
+    other.files = {'foo.py': {'read': 1.0}, 'bar.py': {'parse': 2.0}}
+    other.checks = {'check': [2, 0.5], 'other_check': [1, 1.0]}
+    profile.merge(other)
+    assert profile.files == {
+        'foo.py': {'read': 2.0},
+        'bar.py': {'parse': 2.0}
+    }
+    assert profile.checks == {'check': [3, 1.5], 'other_check': [1, 1.0]}
+
+
+def test_dump():
+    profile = Profile()
+    profile.files = {'foo.py': {'read': 1.0, 'parse': 2.0}}
+    profile.checks = {'check': [2, 0.5]}
+    output = io.StringIO()
+    profile.dump(output)
+    assert json.loads(output.getvalue()) == {
+        'phases': dict(dict.fromkeys(PHASES, 0.0), read=1.0, parse=2.0),
+        'files': {'foo.py': {'read': 1.0, 'parse': 2.0}},
+        'checks': {'check': {'calls': 2, 'seconds': 0.5}}
+    }
+
+
+def test_format_table():
+    profile = Profile()
+    profile.files = {'foo.py': {'read': 1.0}, 'bar.py': {'read': 2.0}}
+    profile.checks = {'fast_check': [2, 0.5], 'slow_check': [1, 1.0]}
+    output = io.StringIO()
+    profile.format_table(output)
+    lines = output.getvalue().splitlines()
+    checks = [line.split()[-1] for line in lines[1:3]]
+    assert checks == [u'slow_check', u'fast_check']
+    assert lines[1].split()[:3] == [u'1000.00', u'1', u'1000000.00']
+    files = [line.split()[-1] for line in lines[-2:]]
+    assert files == [u'bar.py', u'foo.py']
@@ -0,0 +1,149 @@
+# coding: utf-8
+"""
+    tests.test_results
+    ~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+from io import BytesIO
+
+import pytest
+
+from pyalysis.formatters import BinaryFormatter
+from pyalysis.results import (
+    HEADER, ResultFormatError, read_results, merge_results
+)
+from pyalysis.warnings import LineTooLong, MultipleImports
+from pyalysis.utils import Location
+
+
+def write_results(warnings, positions=None):
+    output = BytesIO()
+    formatter = BinaryFormatter(output)
+    formatter.positions = positions
+    formatter.begin()
+    for warning in warnings:
+        formatter.format(warning)
+    formatter.end()
+    return output.getvalue()
+
+
+def test_read_results():
+    warnings = [
+        LineTooLong(
+            u'a message', u'foo.py', Location(1, 0), Location(1, 80),
+            [u'ä' * 80]
+        ),
+        MultipleImports(
+            u'a message', u'foo.py', Location(2, 0), Location(3, 8),
+            [u'import os, \\', u'    sys']
+        ),
+        LineTooLong(
+            u'another message', u'bar.py', Location(1, 0), Location(1, 80),
+            []
+        )
+    ]
+    results = write_results(warnings)
+    # Strings are only stored once.
+    assert results.count(b'foo.py') == 1
+    assert results.count(b'a message') == 1
+
+    read = list(read_results(BytesIO(results)))
+    assert [warning.__class__ for warning in read] == [
+        LineTooLong, MultipleImports, LineTooLong
+    ]
+    for warning, read_warning in zip(warnings, read):
+        assert read_warning.message == warning.message
+        assert read_warning.file == warning.file
+        assert read_warning.start == warning.start
+        assert read_warning.end == warning.end
+        assert read_warning.lines == warning.lines
+
+
+def test_read_results_empty():
+    assert list(read_results(BytesIO(write_results([])))) == []
+
+
+@pytest.mark.parametrize('results', [
+    b'',
+    b'{"message": "a message"}',
+    HEADER + b'\x01\x00',
+    HEADER + b'\x05\x00\x00\x00\x00foo',
+    HEADER + b'\x01\x00\x00\x00\x07',
+    HEADER + b'\x05\x00\x00\x00\x01\x00\x00\x00\x00',
+    HEADER + b'\x03\x00\x00\x00\x00\xff\xfe',
+    HEADER + b'\x09\x00\x00\x00\x02' + b'\x00' * 8
+])
+def test_read_results_invalid(results):
+    with pytest.raises(ResultFormatError):
+        list(read_results(BytesIO(results)))
+
+
+def test_read_results_invalid_line():
+    results = write_results([
+        LineTooLong(
+            u'a message', u'foo.py', Location(1, 0), Location(1, 80),
+            [u'a' * 80]
+        )
+    ])
+    with pytest.raises(ResultFormatError):
+        list(read_results(BytesIO(results[:-2] + b'\xff\xfe')))
+
+
+def test_read_results_positions():
+    warnings = [
+        LineTooLong(
+            u'a message', path, Location(1, 0), Location(1, 80), []
+        )
+        for path in [u'foo.py', u'bar.py', u'foo.py']
+    ]
+    results = write_results(warnings, {u'foo.py': 2})
+    positions = {}
+    for warning in read_results(BytesIO(results), positions):
+        if warning.file == u'foo.py':
+            assert positions == {u'foo.py': 2}
+    assert positions == {u'foo.py': 2}
+
+
+def make_warnings(paths):
+    return [
+        LineTooLong(
+            u'a message', path, Location(line, 0), Location(line, 80), []
+        )
+        for path in paths for line in [1, 2]
+    ]
+
+
+def test_merge_results():
+    paths = [u'a.py', u'b.py', u'c.py', u'd.py']
+    positions = dict((path, index) for index, path in enumerate(paths))
+    shards = [[u'b.py', u'c.py'], [u'a.py', u'd.py']]
+    merged = list(merge_results([
+        BytesIO(write_results(make_warnings(shard), positions))
+        for shard in shards
+    ]))
+    assert [(warning.file, warning.start.line) for warning in merged] == [
+        (path, line) for path in paths for line in [1, 2]
+    ]
+
+
+def test_merge_results_without_positions():
+    shards = [[u'b.py', u'c.py'], [u'a.py']]
+    merged = list(merge_results([
+        BytesIO(write_results(make_warnings(shard))) for shard in shards
+    ]))
+    assert [warning.file for warning in merged] == [
+        u'b.py', u'b.py', u'c.py', u'c.py', u'a.py', u'a.py'
+    ]
+
+
+def test_read_results_truncated():
+    results = write_results([
+        LineTooLong(
+            u'a message', u'foo.py', Location(1, 0), Location(1, 80),
+            [u'a' * 80]
+        )
+    ])
+    with pytest.raises(ResultFormatError):
+        list(read_results(BytesIO(results[:-1])))
@@ -0,0 +1,123 @@
+# coding: utf-8
+"""
+    tests.test_source
+    ~~~~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import codecs
+import textwrap
+from io import BytesIO
+
+import pytest
+
+from pyalysis.source import Source, split_lines
+from pyalysis.analysers import (
+    LineAnalyser, TokenAnalyser, CSTAnalyser, ASTAnalyser
+)
+from pyalysis.utils import Location
+
+
+def create_source(source, encoding='utf-8'):
+    return Source('<test>', textwrap.dedent(source).encode(encoding))
+
+
+def test_from_file():
+    file = BytesIO(b'foo = 1\n')
+    file.name = '<test>'
+    file.read()
+    source = Source.from_file(file)
+    assert source.name == '<test>'
+    assert source.bytes == b'foo = 1\n'
+
+
+def test_lines():
+    source = create_source(u"""\
+    foo = 1
+    bar = (1,
+           2)
+    """)
+    assert source.lines == [u'foo = 1\n', u'bar = (1,\n', u'       2)\n']
+    assert source.physical_lines == [u'foo = 1', u'bar = (1,', u'       2)']
+
+
+def test_lines_lazy():
+    source = create_source(u'foo = 1\n')
+    assert source._lines is None
+    assert source.lines == [u'foo = 1\n']
+    assert source.lines is source.lines
+
+
+@pytest.mark.parametrize(('text', 'expected'), [
+    (u'', []),
+    (u'foo', [u'foo']),
+    (u'foo\nbar\n', [u'foo\n', u'bar\n']),
+    (u'foo\n\n', [u'foo\n', u'\n']),
+    (u'foo\r\nbar', [u'foo\r\n', u'bar']),
+    (u'foo\rbar\n', [u'foo\rbar\n']),
+    (u'foo\x0cbar\u2028\n', [u'foo\x0cbar\u2028\n'])
+])
+def test_split_lines(text, expected):
+    assert split_lines(text) == expected
+
+
+def test_encoding():
+    source = Source('<test>', codecs.BOM_UTF8 + u'ä = 1'.encode('utf-8'))
+    assert source.encoding == 'utf-8-sig'
+    assert source.text == u'ä = 1'
+
+
+def test_logical_lines():
+    source = create_source(u'''\
+    foo = 1
+    """spam
+    eggs"""
+    ''')
+    assert source.logical_lines == [
+        u'foo = 1', u'"""spam\neggs"""', u''
+    ]
+    assert source.logical_line_linenos == [(1, 1), (2, 3), (4, 4)]
+    assert source.get_logical_line_range(3) == (2, 3)
+    assert list(
+        source.get_logical_lines(Location(1, 0), Location(3, 7))
+    ) == [u'foo = 1', u'"""spam\neggs"""']
+
+
+def test_shared_by_analysers():
+    source = create_source(u'import os, sys\n')
+    for analyser_class in [
+        LineAnalyser, TokenAnalyser, CSTAnalyser, ASTAnalyser
+    ]:
+        analyser = analyser_class(source)
+        assert analyser.source is source
+        assert analyser.logical_lines is source.logical_lines
+        analyser.analyse()
+
+
+def test_line_store():
+    source = create_source(u'import os, sys\nfoo = 1\n')
+    warnings = ASTAnalyser(source).analyse()
+    assert len(warnings) == 1
+    warning = warnings[0]
+    assert warning._line_store is source.line_store
+    assert warning.lines == [u'import os, sys']
+
+
+def test_logical_lines_within_string():
+    # The line within the string isn't the start of any logical line.
+    source = create_source(u'''\
+    foo = """spam
+    eggs
+    """
+    bar = 1
+    ''')
+    assert source.logical_line_linenos == [(1, 1), (3, 3), (4, 4), (5, 5)]
+    assert source.get_logical_line_range(2) == (1, 1)
+    assert source.get_logical_line_range(4) == (4, 4)
+    assert list(
+        source.get_logical_lines(Location(4, 0), Location(4, 7))
+    ) == [u'bar = 1']
+    assert list(
+        source.get_logical_lines(Location(2, 0), Location(5, 0))
+    ) == [u'foo = """spam', u'"""', u'bar = 1']
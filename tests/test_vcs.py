@@ -0,0 +1,115 @@
+# coding: utf-8
+"""
+    tests.test_vcs
+    ~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import os
+import codecs
+
+import pytest
+
+from pyalysis.vcs import (
+    GitError, git, get_changed_files, get_changed_lines, touches
+)
+from pyalysis.warnings import LineTooLong
+from pyalysis.utils import Location
+
+
+def write(path, content):
+    with codecs.open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+@pytest.fixture
+def repository(tmpcwd):
+    try:
+        git('init', '--quiet')
+    except GitError:
+        pytest.skip('git is not available')
+    git('config', 'user.name', 'Pyalysis')
+    git('config', 'user.email', 'pyalysis@example.com')
+    write('foo.py', u'a = 1\nb = 2\nc = 3\n')
+    write('bar.py', u'a = 1\n')
+    write('README', u'')
+    git('add', '.')
+    git('commit', '--quiet', '-m', 'Initial commit')
+    return tmpcwd
+
+
+def test_get_changed_files(repository):
+    write('foo.py', u'a = 1\nb = 4\nc = 3\n')
+    write('README', u'changed')
+    write('spam.py', u'')
+    os.mkdir('eggs')
+    write('eggs/eggs.py', u'')
+    assert get_changed_files() == [
+        os.path.join('eggs', 'eggs.py'), 'foo.py', 'spam.py'
+    ]
+    assert get_changed_files(paths=['eggs']) == [
+        os.path.join('eggs', 'eggs.py')
+    ]
+    assert get_changed_files(staged=True) == []
+    git('add', 'foo.py')
+    assert get_changed_files(staged=True) == ['foo.py']
+
+
+def test_get_changed_files_revision(repository):
+    write('bar.py', u'a = 2\n')
+    git('commit', '--quiet', '-am', 'Change bar')
+    assert get_changed_files() == []
+    assert get_changed_files('HEAD~1') == ['bar.py']
+
+
+def test_get_changed_files_subdirectory(repository):
+    os.mkdir('eggs')
+    os.chdir('eggs')
+    write('eggs.py', u'')
+    write('../foo.py', u'')
+    assert get_changed_files(paths=['..']) == [
+        os.path.join('..', 'foo.py'), 'eggs.py'
+    ]
+
+
+def test_get_changed_lines(repository):
+    write('foo.py', u'a = 0\na = 1\nb = 2\nc = 4\n')
+    write('bar.py', u'')
+    write('spam.py', u'')
+    assert get_changed_lines() == {
+        'foo.py': [(1, 1), (4, 4)],
+        'bar.py': [],
+        'spam.py': None
+    }
+
+
+def test_get_changed_lines_quoted(repository):
+    for path in [u'a b.py', u'\xf6.py', u'"c\\.py']:
+        write(path, u'a = 1\nb = 2\n')
+    git('add', '.')
+    git('commit', '--quiet', '-m', 'Add quoted paths')
+    for path in [u'a b.py', u'\xf6.py', u'"c\\.py']:
+        write(path, u'a = 1\nb = 3\n')
+    assert get_changed_lines() == {
+        u'a b.py': [(2, 2)],
+        u'\xf6.py': [(2, 2)],
+        u'"c\\.py': [(2, 2)]
+    }
+
+
+def test_not_a_repository(tmpcwd):
+    with pytest.raises(GitError):
+        get_changed_files()
+
+
+def test_touches():
+    warning = LineTooLong(
+        u'message', 'foo.py', Location(3, 0), Location(5, 0), []
+    )
+    assert touches(warning, None)
+    assert not touches(warning, [])
+    assert not touches(warning, [(1, 2), (6, 10)])
+    assert touches(warning, [(1, 3)])
+    assert touches(warning, [(4, 4)])
+    assert touches(warning, [(5, 10)])
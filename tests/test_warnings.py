@@ -0,0 +1,56 @@
+# coding: utf-8
+"""
+    tests.test_warnings
+    ~~~~~~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import pickle
+
+import pytest
+
+from pyalysis.warnings import WARNINGS, AnalyserWarning, LineTooLong
+from pyalysis.source import LineStore
+from pyalysis.utils import Location
+
+
+@pytest.mark.parametrize('warning_class', [
+    warning_class for warning_class in WARNINGS.values()
+    if issubclass(warning_class, AnalyserWarning)
+])
+def test_slots(warning_class):
+    warning = warning_class(
+        u'message', 'foo.py', Location(1, 0), Location(1, 1), []
+    )
+    assert not hasattr(warning, '__dict__')
+
+
+def test_lines():
+    line_store = LineStore([(1, 1, u'foo = 1'), (2, 3, u'bar = (1,\n2)')])
+    warning = LineTooLong(
+        u'message', 'foo.py', Location(2, 0), Location(3, 2),
+        line_store=line_store
+    )
+    assert warning.lines == [u'bar = (1,\n2)']
+    warning = LineTooLong(
+        u'message', 'foo.py', Location(2, 0), Location(3, 2), [u'line']
+    )
+    assert warning.lines == [u'line']
+
+
+def test_pickle():
+    line_store = LineStore([(1, 1, u'foo = 1')])
+    warning = LineTooLong(
+        u'message', 'foo.py', Location(1, 0), Location(1, 7),
+        line_store=line_store
+    )
+    unpickled = pickle.loads(pickle.dumps(warning, pickle.HIGHEST_PROTOCOL))
+    assert unpickled.__class__ is LineTooLong
+    assert unpickled.message == u'message'
+    assert unpickled.file == 'foo.py'
+    assert unpickled.start == Location(1, 0)
+    assert unpickled.end == Location(1, 7)
+    assert unpickled.lines == [u'foo = 1']
+    # The line store is replaced with the lines the warning needs.
+    assert unpickled._line_store is None
@@ -0,0 +1,159 @@
+# coding: utf-8
+"""
+    tests.test_watch
+    ~~~~~~~~~~~~~~~~
+
+    :copyright: 2014 by Daniel Neuhäuser and Contributors
+    :license: BSD, see LICENSE.rst for details
+"""
+import os
+import time
+import codecs
+import socket
+import threading
+
+import pytest
+
+from pyalysis.application import Pyalysis
+from pyalysis.watch import (
+    PollingWatcher, InotifyWatcher, Daemon, query, is_within
+)
+
+
+def write(path, content):
+    with codecs.open(path, 'w', encoding='utf-8') as file:
+        file.write(content)
+
+
+def test_is_within():
+    assert is_within('foo.py', '.')
+    assert is_within('foo/bar.py', 'foo')
+    assert is_within('foo.py', 'foo.py')
+    assert not is_within('foo.py', 'foo')
+    assert not is_within('../foo.py', '.')
+
+
+def test_polling_watcher(tmpcwd):
+    os.mkdir('foo')
+    write('foo/spam.py', u'')
+    write('foo/eggs.txt', u'')
+    write('bar.py', u'')
+    watcher = PollingWatcher(['foo', 'bar.py'])
+    assert watcher.poll() == set()
+    write('foo/spam.py', u'a = 1\n')
+    write('foo/eggs.py', u'')
+    write('foo/eggs.txt', u'changed')
+    os.remove('bar.py')
+    assert watcher.poll() == set([
+        os.path.join('foo', 'spam.py'), os.path.join('foo', 'eggs.py'),
+        'bar.py'
+    ])
+    assert watcher.poll() == set()
+
+
+def test_inotify_watcher(tmpcwd):
+    os.mkdir('foo')
+    write('foo/spam.py', u'')
+    write('bar.py', u'')
+    write('baz.py', u'')
+    try:
+        watcher = InotifyWatcher(['foo', 'bar.py'])
+    except OSError:
+        pytest.skip('inotify is not available')
+    try:
+        assert watcher.poll() == set()
+        write('foo/spam.py', u'a = 1\n')
+        write('foo/eggs.txt', u'')
+        write('baz.py', u'a = 1\n')
+        os.mkdir('foo/eggs')
+        write('foo/eggs/eggs.py', u'')
+        os.remove('bar.py')
+        changed = watcher.poll()
+        assert os.path.join('foo', 'spam.py') in changed
+        assert 'bar.py' in changed
+        assert os.path.join('foo', 'eggs.txt') not in changed
+        assert 'baz.py' not in changed
+        # Whether the module in the new directory is seen depends on whether
+        # it was created before or after we started watching the directory,
+        # either way changes to it are noticed afterwards.
+        write('foo/eggs/eggs.py', u'a = 1\n')
+        assert os.path.join('foo', 'eggs', 'eggs.py') in watcher.poll()
+    finally:
+        watcher.close()
+
+
+@pytest.yield_fixture
+def daemon(tmpcwd):
+    write('foo.py', u'import os, sys\n')
+    write('bar.py', u'a = 1\n')
+    pyalysis = Pyalysis()
+    daemon = Daemon(pyalysis, ['.'], 'test.sock', report=False)
+    thread = threading.Thread(target=daemon.serve_forever)
+    thread.daemon = True
+    thread.start()
+    for _ in range(100):
+        if os.path.exists('test.sock'):
+            break
+        time.sleep(0.05)
+    yield daemon
+    daemon.stop()
+    try:
+        # Wake the daemon up, unless it has stopped already.
+        query('test.sock', [])
+    except socket.error:
+        pass
+    thread.join(5)
+    assert not os.path.exists('test.sock')
+
+
+def test_daemon(daemon):
+    output, warned = query('test.sock', [])
+    assert warned
+    assert u'foo.py' in output
+    assert u'Multiple imports on one line' in output
+
+    output, warned = query('test.sock', ['bar.py'])
+    assert not warned
+    assert output == u''
+
+    write('bar.py', u'import os, sys\n')
+    output, warned = query('test.sock', ['bar.py'])
+    assert warned
+    assert u'bar.py' in output
+
+    os.remove('foo.py')
+    output, warned = query('test.sock', ['foo.py'])
+    assert not warned
+
+
+def test_daemon_ignore_file(daemon):
+    assert query('test.sock', [])[1]
+    write('.pyalysis.ignore', u'multiple-imports')
+    assert query('test.sock', []) == (u'', False)
+
+
+def test_daemon_invalid_syntax(daemon):
+    for source in [u'x = (1,\n', u'x = = 1\n']:
+        write('bar.py', source)
+        output, warned = query('test.sock', [])
+        assert warned
+        assert u'foo.py' in output
+        assert u'bar.py' not in output
+    write('bar.py', u'import os, sys\n')
+    output, warned = query('test.sock', ['bar.py'])
+    assert warned
+    assert u'bar.py' in output
+
+
+def test_daemon_stale_socket(tmpcwd):
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind('test.sock')
+    server.close()
+    daemon = Daemon(Pyalysis(), ['.'], 'test.sock')
+    daemon.listen()
+    try:
+        with pytest.raises(RuntimeError):
+            Daemon(Pyalysis(), ['.'], 'test.sock').listen()
+    finally:
+        daemon.close()
+    assert not os.path.exists('test.sock')